@@ -17,6 +17,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__))+"/../../../")
 from RTXConfiguration import RTXConfiguration
 
 from QueryMeSH import QueryMeSH
+from RTXQueryExecutor import RTXQueryExecutor
 from swagger_server.models.response import Response
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__))+"/../../../reasoningtool/QuestionAnswering/")
@@ -115,17 +116,12 @@ class RTXQuery:
     else:
 
       txltr = ParseQuestion()
-      command = "python3 " + txltr.get_execution_string(id,terms)
+      execution_string = txltr.get_execution_string(id,terms)
 
-      #### Set CWD to the QuestioningAnswering area and then invoke from the shell the Q1Solution code
-      cwd = os.getcwd()
-      os.chdir(os.path.dirname(os.path.abspath(__file__))+"/../../../reasoningtool/QuestionAnswering")
-      eprint(command)
-      returnedText = subprocess.run( [ command ], stdout=subprocess.PIPE, shell=True )
-      os.chdir(cwd)
-
-      #### reformat the stdout result of the shell command into a string
-      reformattedText = returnedText.stdout.decode('utf-8')
+      #### Hand the question to the pool of pre-warmed solution workers (falls back to a subprocess if needed)
+      eprint(execution_string)
+      executor = RTXQueryExecutor.get_instance()
+      reformattedText = executor.execute(execution_string)
       #eprint(reformattedText)
 
       #### Try to decode that string into a response object
@@ -0,0 +1,170 @@
+""" This module defines the class RTXQueryExecutor, which keeps a pool of
+pre-warmed worker processes for answering the reasoner questions that
+RTXQuery used to hand off to a fresh `python3 <solution script>` subprocess.
+
+Each worker imports the QuestionAnswering solution modules once at startup
+(which pulls in NLTK, networkx, KGNodeIndex and opens the Neo4j driver) and
+then runs the `main()` entry point of the requested script in-process, with
+`sys.argv` set from the execution string and stdout captured, so that the
+JSON text returned to RTXQuery is exactly what the script would have printed.
+The modules are never reloaded, so their Neo4j drivers and models are created
+once per worker; a script's main() must therefore start its per-question state
+afresh (as Q1Solution does with its FormatResponse). Scripts that cannot be run
+in-process, and help requests (which close the shared Neo4j session), fall back
+to the old subprocess path. An exception raised by a script's main() is
+re-raised by execute(), rather than being hidden by a second run in a
+subprocess.
+"""
+
+__author__ = ""
+__copyright__ = ""
+__credits__ = []
+__license__ = ""
+__version__ = ""
+__maintainer__ = ""
+__email__ = ""
+__status__ = "Prototype"
+
+import os
+import sys
+import io
+import shlex
+import importlib
+import contextlib
+import subprocess
+import threading
+import multiprocessing
+
+QUESTION_ANSWERING_DIR = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + "/../../../reasoningtool/QuestionAnswering")
+
+#### Solution modules imported by every worker before it accepts requests
+WARM_MODULES = ['Q1Solution', 'Q2Solution', 'Q4Solution', 'SimilarNodesInCommon', 'SMEDrugRepurposingFisher',
+                'Q3Solution', 'SimilarityQuestionSolution']
+
+#### Arguments that make a script close the module-global Neo4j session and driver that later questions still use
+SUBPROCESS_ONLY_ARGS = ['-h', '--help']
+
+def eprint(*args, **kwargs):
+  print(*args, file=sys.stderr, **kwargs)
+
+
+def _init_worker():
+  """Runs once in each worker process: move to the QuestionAnswering area and import the solution modules"""
+  os.chdir(QUESTION_ANSWERING_DIR)
+  if QUESTION_ANSWERING_DIR not in sys.path:
+    sys.path.insert(0, QUESTION_ANSWERING_DIR)
+  for module_name in WARM_MODULES:
+    try:
+      importlib.import_module(module_name)
+    except Exception as e:
+      eprint("RTXQueryExecutor: unable to pre-load " + module_name + ": " + repr(e))
+
+
+def _run_in_worker(argv):
+  """
+  Run the `main()` of the solution script named in argv[0] with the given argv and return what it printed
+
+  :param argv: the argument vector, e.g. ['Q1Solution.py', '-i', 'DOID:8398', '-j']
+  :return: the captured stdout text, or None if the script has no in-process entry point
+  """
+  if any(arg in SUBPROCESS_ONLY_ARGS for arg in argv[1:]):
+    return None
+  module_name = os.path.splitext(os.path.basename(argv[0]))[0]
+  try:
+    module = importlib.import_module(module_name)
+  except Exception as e:
+    eprint("RTXQueryExecutor: unable to import " + module_name + ": " + repr(e))
+    return None
+  main = getattr(module, 'main', None)
+  if main is None:
+    return None
+
+  saved_argv = sys.argv
+  captured = io.StringIO()
+  sys.argv = list(argv)
+  try:
+    with contextlib.redirect_stdout(captured):
+      try:
+        main()
+      except SystemExit:
+        pass
+  finally:
+    sys.argv = saved_argv
+  return captured.getvalue()
+
+
+class RTXQueryExecutor:
+
+  #### Singleton instance shared by all RTXQuery objects in this server process
+  _instance = None
+  _instance_lock = threading.Lock()
+
+  def __init__(self, num_workers=None, max_tasks_per_worker=200, timeout=600):
+    """
+    :param num_workers: number of pre-warmed worker processes (default: number of CPUs)
+    :param max_tasks_per_worker: recycle a worker after this many questions so module-level state cannot pile up
+    :param timeout: seconds to wait for an answer before giving up on a request
+    """
+    if num_workers is None:
+      num_workers = int(os.environ.get("RTX_QUERY_WORKERS", multiprocessing.cpu_count()))
+    self.num_workers = num_workers
+    self.max_tasks_per_worker = max_tasks_per_worker
+    self.timeout = timeout
+    self.pool = None
+
+  @classmethod
+  def get_instance(cls):
+    with cls._instance_lock:
+      if cls._instance is None:
+        cls._instance = RTXQueryExecutor()
+        cls._instance.start()
+      return cls._instance
+
+  def start(self):
+    """Create the worker pool; the workers begin importing the solution modules immediately"""
+    if self.pool is None:
+      context = multiprocessing.get_context("spawn")
+      self.pool = context.Pool(processes=self.num_workers, initializer=_init_worker,
+                               maxtasksperchild=self.max_tasks_per_worker)
+
+  def shutdown(self):
+    if self.pool is not None:
+      self.pool.terminate()
+      self.pool.join()
+      self.pool = None
+
+  def execute(self, execution_string):
+    """
+    Answer a question given the execution string from ParseQuestion.get_execution_string()
+
+    :param execution_string: e.g. "Q1Solution.py -i 'DOID:8398' -j"
+    :return: the stdout text of the solution script (JSON when -j is given)
+    :raises: the exception raised by the script's main(), if any
+    """
+    argv = shlex.split(execution_string)
+    if self.pool is not None and len(argv) > 0:
+      try:
+        text = self.pool.apply_async(_run_in_worker, (argv,)).get(self.timeout)
+        if text is not None:
+          return text
+      except multiprocessing.TimeoutError:
+        eprint("RTXQueryExecutor: timed out after " + str(self.timeout) + " s on: " + execution_string)
+        return ""
+    return self.execute_subprocess(execution_string)
+
+  def execute_subprocess(self, execution_string):
+    """The original behaviour: run the script in a fresh interpreter from the QuestionAnswering area"""
+    command = "python3 " + execution_string
+    eprint(command)
+    returnedText = subprocess.run([command], stdout=subprocess.PIPE, shell=True, cwd=QUESTION_ANSWERING_DIR)
+    return returnedText.stdout.decode('utf-8')
+
+
+def main():
+  executor = RTXQueryExecutor(num_workers=1)
+  executor.start()
+  print(executor.execute("Q1Solution.py -i 'DOID:8398' -j"))
+  executor.shutdown()
+
+
+if __name__ == "__main__": main()
@@ -0,0 +1,75 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import RTXQueryExecutor
+
+#### A solution script that, like Q1Solution, starts a fresh module-level response in main() and counts its imports
+SOLUTION_SCRIPT = '''
+import sys
+num_imports = globals().get('num_imports', 0) + 1
+answers = []
+
+def main():
+  global answers
+  answers = []
+  if sys.argv[-1] == 'fail':
+    raise ValueError('no answer')
+  answers.append(sys.argv[-1])
+  print(answers, num_imports)
+'''
+
+
+class FakePool:
+  """Runs the task in this process, as a worker of the real pool would"""
+  def apply_async(self, func, args):
+    return FakeResult(func, args)
+
+
+class FakeResult:
+  def __init__(self, func, args):
+    self.func = func
+    self.args = args
+
+  def get(self, timeout):
+    return self.func(*self.args)
+
+
+class TestRTXQueryExecutor(unittest.TestCase):
+
+  def setUp(self):
+    self.script_dir = tempfile.TemporaryDirectory()
+    with open(os.path.join(self.script_dir.name, 'StatefulSolution.py'), 'w') as script_file:
+      script_file.write(SOLUTION_SCRIPT)
+    sys.path.insert(0, self.script_dir.name)
+
+  def tearDown(self):
+    sys.path.remove(self.script_dir.name)
+    sys.modules.pop('StatefulSolution', None)
+    self.script_dir.cleanup()
+
+  def test_module_is_not_reloaded(self):
+    first = RTXQueryExecutor._run_in_worker(['StatefulSolution.py', '-i', 'DOID:8398'])
+    second = RTXQueryExecutor._run_in_worker(['StatefulSolution.py', '-i', 'DOID:9352'])
+    self.assertEqual(first, "['DOID:8398'] 1\n")
+    self.assertEqual(second, "['DOID:9352'] 1\n")
+
+  def test_exception_propagates(self):
+    executor = RTXQueryExecutor.RTXQueryExecutor(num_workers=1)
+    executor.pool = FakePool()
+    with self.assertRaises(ValueError):
+      executor.execute('StatefulSolution.py -i fail')
+
+  def test_help_runs_in_subprocess(self):
+    self.assertIsNone(RTXQueryExecutor._run_in_worker(['Q1Solution.py', '-h']))
+
+
+if __name__ == '__main__':
+  unittest.main()
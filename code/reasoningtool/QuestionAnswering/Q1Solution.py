@@ -271,6 +271,10 @@ def answerQ1(doid, directed=True, max_path_len=3, verbose=False, use_json=False)
 
 
 def main():
+	# Start a fresh response for each question, so that a process that answers several questions does not collect the
+	# answers of the earlier ones
+	global response
+	response = FormatOutput.FormatResponse(1)
 	parser = argparse.ArgumentParser(description="Runs the reasoning tool on Question 1",
 									formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 	parser.add_argument('-i', '--input_disease', type=str, help="Input disease", default="DOID:12365")
@@ -2,8 +2,6 @@ import numpy as np
 np.warnings.filterwarnings('ignore')
 import os
 import ReasoningUtilities as RU
-import requests_cache
-requests_cache.install_cache('orangeboard')
 import argparse
 from itertools import compress
 import sys
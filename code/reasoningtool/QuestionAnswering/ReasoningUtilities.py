@@ -10,7 +10,6 @@ import sys
 from collections import namedtuple
 from neo4j.v1 import GraphDatabase, basic_auth
 from collections import Counter
-import requests_cache
 from itertools import islice
 import itertools
 import functools
@@ -47,8 +46,6 @@ QueryNCBIeUtils = QueryNCBIeUtils.QueryNCBIeUtils()
 import fisher_exact
 
 
-requests_cache.install_cache('orangeboard')
-
 sys.path.append(os.path.dirname(os.path.abspath(__file__))+"/../../")  # code directory
 from RTXConfiguration import RTXConfiguration
 RTXConfiguration = RTXConfiguration()
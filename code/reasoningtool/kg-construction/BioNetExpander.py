@@ -25,6 +25,10 @@ from operator import methodcaller
 import timeit
 import argparse
 import sys
+import copy
+import heapq
+import itertools
+import concurrent.futures
 
 from Orangeboard import Orangeboard
 from QueryOMIM import QueryOMIM
@@ -43,6 +47,9 @@ from QueryChEMBL import QueryChEMBL
 from QueryKEGG import QueryKEGG
 from QueryUniprot import QueryUniprot
 from DrugMapper import DrugMapper
+from RateLimiter import HostRateLimiter
+from HTTPClient import HTTPClient, UncachedRequestError
+from UpstreamStats import UpstreamStats
 
 
 class BioNetExpander:
@@ -94,12 +101,36 @@ class BioNetExpander:
                                 "cellular_component": "expressed_in",
                                 "molecular_function": "capable_of"}
 
-    def __init__(self, orangeboard):
+    # node types in the order in which the 'node_type' expansion priority expands them (other types last)
+    NODE_TYPE_EXPANSION_ORDER = ("protein", "disease", "genetic_condition", "chemical_substance", "pathway",
+                                 "microRNA", "phenotypic_feature", "anatomical_entity", "metabolite",
+                                 "biological_process", "molecular_function", "cellular_component")
+
+    EXPANSION_PRIORITIES = ("seed_distance", "node_type")
+
+    # with prefetching, `expand_with_budget` takes this many nodes per worker thread off the queue at a time
+    BUDGET_PREFETCH_NODES_PER_WORKER = 4
+
+    def __init__(self, orangeboard, num_workers=1, host_rate_limiter=None):
+        """
+        :param orangeboard: the ``Orangeboard`` to expand into
+        :param num_workers: number of threads used to prefetch upstream data for a frontier in
+                            `expand_all_nodes` (1 means fully serial expansion)
+        :param host_rate_limiter: a ``HostRateLimiter`` with the per-upstream request rates to respect while
+                                  prefetching (default: ``HostRateLimiter()``)
+        """
         orangeboard.set_dict_reltype_dirs(self.MASTER_REL_IS_DIRECTED)
         self.orangeboard = orangeboard
         self.query_omim_obj = QueryOMIM()
         self.query_mygene_obj = QueryMyGene(debug=False)
         self.gene_symbols_to_protein_nodes = dict()
+        self.num_workers = num_workers
+        if host_rate_limiter is None:
+            host_rate_limiter = HostRateLimiter()
+        self.host_rate_limiter = host_rate_limiter
+        # created on the first prefetch and reused for the whole build, so that each worker thread keeps its
+        # `HTTPClient` sessions (and their pooled connections); see `shutdown_prefetch`
+        self.prefetch_executor = None
 
     def add_node_smart(self, simple_node_type, name, seed_node_bool=False, desc=''):
         if name.endswith("PHENOTYPE") or name.startswith("MP:"):
@@ -181,8 +212,9 @@ class BioNetExpander:
             for ec_id in ec_ids:
                 uniprot_ids = QueryUniprot.map_enzyme_commission_id_to_uniprot_ids(ec_id)
                 if len(uniprot_ids) > 0:
+                    uniprot_ids_to_gene_symbols = self.query_mygene_obj.convert_uniprot_ids_to_gene_symbols(uniprot_ids)
                     for uniprot_id in uniprot_ids:
-                        gene_symbols = self.query_mygene_obj.convert_uniprot_id_to_gene_symbol(uniprot_id)
+                        gene_symbols = uniprot_ids_to_gene_symbols.get(uniprot_id, set())
                         if len(gene_symbols) > 0:
                             gene_symbol = ";".join(list(gene_symbols))
                             prot_node = self.add_node_smart("protein", uniprot_id, desc=gene_symbol)
@@ -194,10 +226,12 @@ class BioNetExpander:
         compound_desc = node.desc
         target_uniprot_ids = QueryChEMBL.get_target_uniprot_ids_for_drug(compound_desc)
         if target_uniprot_ids is not None:
+            target_uniprot_ids_to_gene_names = self.query_mygene_obj.convert_uniprot_ids_to_gene_symbols(
+                [target_uniprot_id_curie.replace("UniProtKB:", "") for target_uniprot_id_curie in target_uniprot_ids.keys()])
             for target_uniprot_id_curie in target_uniprot_ids.keys():
                 target_uniprot_id = target_uniprot_id_curie.replace("UniProtKB:", "")
                 probability = target_uniprot_ids[target_uniprot_id]
-                gene_names = self.query_mygene_obj.convert_uniprot_id_to_gene_symbol(target_uniprot_id)
+                gene_names = target_uniprot_ids_to_gene_names.get(target_uniprot_id, set())
                 node_desc = ';'.join(list(gene_names))
                 target_node = self.add_node_smart('protein', target_uniprot_id, desc=node_desc)
                 if target_node is not None:
@@ -299,8 +333,10 @@ class BioNetExpander:
             mature_mir_ids = QueryMiRBase.convert_mirbase_id_to_mature_mir_ids(mirbase_id)
             for mature_mir_id in mature_mir_ids:
                 target_gene_symbols = QueryMiRGate.get_gene_symbols_regulated_by_microrna(mature_mir_id)
+                target_gene_symbols_to_uniprot_ids = self.query_mygene_obj.convert_gene_symbols_to_uniprot_ids(
+                    target_gene_symbols)
                 for target_gene_symbol in target_gene_symbols:
-                    uniprot_ids = self.query_mygene_obj.convert_gene_symbol_to_uniprot_id(target_gene_symbol)
+                    uniprot_ids = target_gene_symbols_to_uniprot_ids.get(target_gene_symbol, set())
                     for uniprot_id in uniprot_ids:
                         assert '-' not in uniprot_id
                         target_prot_node = self.add_node_smart('protein', uniprot_id, desc=target_gene_symbol)
@@ -371,8 +407,10 @@ class BioNetExpander:
         for gene_symbol in gene_symbols_set:
             # protein-DNA (i.e., gene regulatory) interactions:
             regulator_gene_symbols_set = QueryGeneProf.gene_symbol_to_transcription_factor_gene_symbols(gene_symbol)
+            reg_gene_symbols_to_uniprot_ids = self.query_mygene_obj.convert_gene_symbols_to_uniprot_ids(
+                regulator_gene_symbols_set)
             for reg_gene_symbol in regulator_gene_symbols_set:
-                reg_uniprot_ids_set = self.query_mygene_obj.convert_gene_symbol_to_uniprot_id(reg_gene_symbol)
+                reg_uniprot_ids_set = reg_gene_symbols_to_uniprot_ids.get(reg_gene_symbol, set())
                 for reg_uniprot_id in reg_uniprot_ids_set:
                     assert '-' not in reg_uniprot_id
                     node2 = self.add_node_smart('protein', reg_uniprot_id, desc=reg_gene_symbol)
@@ -614,16 +652,71 @@ class BioNetExpander:
         expand_method = methodcaller(method_name, node=node)
         # Call this method on the orangeboard instance
         # Identical to `self.expand_xxx(node=node)` given `nodetype = "xxx"`
-        expand_method(self)
+        with UpstreamStats.get_instance().context(method_name):
+            expand_method(self)
 
         node.expanded = True
 
+    def make_scratch_expander(self):
+        """returns a copy of this expander that shares the query objects but writes into an empty Orangeboard"""
+        scratch = copy.copy(self)
+        scratch.orangeboard = Orangeboard(debug=False)
+        scratch.orangeboard.set_dict_reltype_dirs(self.orangeboard.dict_reltype_dirs)
+        scratch.gene_symbols_to_protein_nodes = dict()
+        return scratch
+
+    def prefetch_node(self, node):
+        """expands a copy of `node` into a throwaway Orangeboard, so that the upstream responses that
+        `expand_node(node)` needs are in the HTTP and `CachedMethods` caches before the real expansion runs; the
+        prefetch stops at the first request whose response would not be cached, which only the real expansion sends"""
+        scratch = self.make_scratch_expander()
+        scratch_node = scratch.orangeboard.add_node(node.nodetype, node.name, seed_node_bool=True, desc=node.desc)
+        scratch_node.extra_props = dict(node.extra_props)
+        try:
+            with HTTPClient.get_instance().cached_requests_only():
+                scratch.expand_node(scratch_node)
+        except UncachedRequestError:
+            pass
+        except Exception as e:
+            # not fatal here; the serial expansion of the real node will run into (and report) the same problem
+            print('Prefetch failed for node ' + node.nodetype + ' ' + node.name + ': ' + repr(e), file=sys.stderr)
+
+    def prefetch_identifiers(self, nodes):
+        """resolves, in batch queries, the identifier conversions that `expand_protein` looks up one protein at a time,
+        for the distinct proteins among `nodes`; the results land in the single-identifier `CachedMethods` caches"""
+        uniprot_ids = sorted(set(node.name for node in nodes if node.nodetype == "protein" and not node.expanded))
+        if len(uniprot_ids) > 1:
+            self.query_mygene_obj.convert_uniprot_ids_to_gene_symbols(uniprot_ids)
+            self.query_mygene_obj.convert_uniprot_ids_to_entrez_gene_IDs(uniprot_ids)
+
+    def prefetch_nodes(self, nodes):
+        """prefetches upstream data for all of `nodes` concurrently, using `num_workers` threads and
+        respecting the per-host request rates of `host_rate_limiter`"""
+        num_nodes = len(nodes)
+        if self.prefetch_executor is None:
+            self.prefetch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.num_workers)
+        with HTTPClient.get_instance().throttle_requests(self.host_rate_limiter):
+            for num_done, _ in enumerate(self.prefetch_executor.map(self.prefetch_node, nodes), 1):
+                if num_done % 100 == 0:
+                    print('Number of nodes prefetched in this iteration: ' + str(num_done) + ' of ' + str(num_nodes))
+
+    def shutdown_prefetch(self):
+        """stops the prefetch worker threads; call when the build is done with this expander"""
+        if self.prefetch_executor is not None:
+            self.prefetch_executor.shutdown()
+            self.prefetch_executor = None
+
     def expand_all_nodes(self):
         nodes = self.orangeboard.get_all_nodes_for_current_seed_node()
         num_nodes_to_expand = sum([not mynode.expanded for mynode in nodes])
         print('----------------------------------------------------')
         print('Number of nodes to expand: ' + str(num_nodes_to_expand))
         print('----------------------------------------------------')
+        self.prefetch_identifiers(nodes)
+        if self.num_workers > 1:
+            # Fetch the whole frontier concurrently, then expand it serially (in the same order as a serial
+            # build) from the warm caches, so that the resulting graph is identical to the serial build
+            self.prefetch_nodes([node for node in nodes if not node.expanded])
         for node in nodes:
             if not node.expanded:
                 self.expand_node(node)
@@ -631,6 +724,83 @@ class BioNetExpander:
                 if (num_nodes_to_expand % 100 == 0):
                     print('Number of nodes left to expand in this iteration: ' + str(num_nodes_to_expand))
 
+    def get_expansion_priority(self, priority, node, seed_distance):
+        if priority == "seed_distance":
+            return (seed_distance,)
+        if priority == "node_type":
+            if node.nodetype in self.NODE_TYPE_EXPANSION_ORDER:
+                node_type_rank = self.NODE_TYPE_EXPANSION_ORDER.index(node.nodetype)
+            else:
+                node_type_rank = len(self.NODE_TYPE_EXPANSION_ORDER)
+            return (node_type_rank, seed_distance)
+        return priority(node, seed_distance)
+
+    def expand_with_budget(self, budget, priority="seed_distance", max_seed_distance=None):
+        """expands the unexpanded nodes of the current seed node, and the nodes that their expansions add, highest
+        priority first, until no nodes within `max_seed_distance` are left or `budget` is exhausted
+
+        :param budget: an ``ExpansionBudget``
+        :param priority: ``"seed_distance"`` (breadth-first, like repeated `expand_all_nodes`), ``"node_type"``
+                         (in the order of `NODE_TYPE_EXPANSION_ORDER`, then by seed distance), or a function of
+                         ``(node, seed_distance)`` that returns a sort key (lowest first)
+        :param max_seed_distance: nodes that are this many expansions away from the nodes that were unexpanded at
+                                  the start are not expanded (e.g., 3 for the equivalent of three `expand_all_nodes`
+                                  calls; default: no limit)
+        :returns: the reason the expansion stopped, if the budget was exhausted; otherwise ``None``
+
+        With `num_workers` > 1, the nodes are prefetched in batches of at most ``num_workers *
+        BUDGET_PREFETCH_NODES_PER_WORKER`` nodes, and of at most as many nodes as there are API calls left in
+        `budget`; see `ExpansionBudget` for how far a batch may overshoot the budget.
+        """
+        list_nodes = self.orangeboard.dict_seed_uuid_to_list_nodes[self.orangeboard.seed_node.uuid]
+        queue = []
+        queue_order = itertools.count()
+
+        def push_node(node, seed_distance):
+            if max_seed_distance is None or seed_distance < max_seed_distance:
+                heapq.heappush(queue, (self.get_expansion_priority(priority, node, seed_distance), next(queue_order),
+                                       node, seed_distance))
+
+        for node in list(list_nodes):
+            if not node.expanded:
+                push_node(node, 0)
+        batch_size = 1
+        if self.num_workers > 1:
+            batch_size = self.num_workers * self.BUDGET_PREFETCH_NODES_PER_WORKER
+        budget.start()
+        exhausted_reason = None
+        num_nodes_expanded = 0
+        while len(queue) > 0 and exhausted_reason is None:
+            exhausted_reason = budget.get_exhausted_reason(self.orangeboard)
+            if exhausted_reason is not None:
+                break
+            # a prefetch calls upstream at least once per node, so a batch is no larger than the API calls left
+            remaining_api_calls = budget.get_remaining_api_calls()
+            max_batch_size = batch_size if remaining_api_calls is None else min(batch_size, remaining_api_calls)
+            batch = []
+            while len(queue) > 0 and len(batch) < max_batch_size:
+                batch.append(heapq.heappop(queue)[2:])
+            if len(batch) > 1:
+                self.prefetch_identifiers([node for node, _ in batch])
+                self.prefetch_nodes([node for node, _ in batch if not node.expanded])
+            for node, seed_distance in batch:
+                exhausted_reason = budget.get_exhausted_reason(self.orangeboard)
+                if exhausted_reason is not None:
+                    break
+                if node.expanded:
+                    continue
+                num_nodes_before = len(list_nodes)
+                self.expand_node(node)
+                for new_node in list_nodes[num_nodes_before:]:
+                    push_node(new_node, seed_distance + 1)
+                num_nodes_expanded += 1
+                if num_nodes_expanded % 100 == 0:
+                    print('Number of nodes expanded: ' + str(num_nodes_expanded) + '; number of nodes queued: ' +
+                          str(len(queue)))
+        if exhausted_reason is not None:
+            print('Stopping the expansion after ' + str(num_nodes_expanded) + ' nodes: ' + exhausted_reason)
+        return exhausted_reason
+
     def test_go_bp_protein():
         ob = Orangeboard(debug=False)
         ob.set_dict_reltype_dirs({'targets': True})
@@ -12,89 +12,206 @@ __maintainer__ = ''
 __email__ = ''
 __status__ = 'Prototype'
 
-import requests_cache
 import sys
 import pandas
 import timeit
 import argparse
+import contextlib
+import os
+import tempfile
+import multiprocessing
+import concurrent.futures
 
 from Orangeboard import Orangeboard
 from BioNetExpander import BioNetExpander
 from QueryDGIdb import QueryDGIdb
+from DGIdbSnapshot import DGIdbSnapshot
+import CachedMethods
+from HTTPClient import HTTPClient
+from ResponseCache import ResponseCache
+from UpstreamStats import UpstreamStats
+from ExpansionBudget import ExpansionBudget
+from RateLimiter import HostRateLimiter
+from Neo4jStore import Neo4jStore
+from UpstreamStandIn import FixtureArchive, StandInServer, record_requests, route_requests
 
-# configure requests package to use the "orangeboard.sqlite" cache
-requests_cache.install_cache('orangeboard')
+
+SEED_NODES_FILE = '../../../data/seed_nodes_filtered.tsv'
+PC2_SIF_FILE = '../../../data/pc2/PathwayCommons9.All.hgnc.sif'
+# generated by get_gene_symbols_to_uniprot_ids (not tracked in git)
+PC2_UNIPROT_MAPPING_FILE = 'PathwayCommons9.All.hgnc.uniprot.tsv'
+
+# PC2 interaction type -> (reltype, extended_reltype)
+PC2_INTERACTION_TYPES = {'interacts-with': ('physically_interacts_with', 'physically_interacts_with'),
+                         'controls-expression-of': ('regulates', 'regulates_expression_of'),
+                         'controls-state-change-of': ('regulates', 'regulates_activity_of'),
+                         'controls-phosphorylation-of': ('regulates', 'regulates_activity_of')}
+
+# number of expansion rounds out from the seed nodes
+NUM_EXPANSIONS = 3
+
+
+def get_gene_symbols_to_uniprot_ids(gene_symbols, mapping_file_name):
+    """maps gene symbols to UniProt IDs, using a local TSV mapping table and resolving only the symbols that are not
+    in it yet (in one batch query to MyGene); the symbols that resolved to UniProt IDs are added to the table, so
+    that symbols whose query failed (or that MyGene did not map) are queried again on the next run
+
+    :param gene_symbols: a ``set`` of gene symbols
+    :param mapping_file_name: the TSV mapping table (gene symbol, ';'-separated UniProt IDs); it is created if it
+    does not exist
+    :returns: a ``dict`` from gene symbol to a ``set`` of UniProt IDs
+    """
+    symbols_to_uniprot_ids = dict()
+    if os.path.exists(mapping_file_name):
+        mapping_data = pandas.read_csv(mapping_file_name, sep='\t', names=['gene_symbol', 'uniprot_ids'],
+                                       dtype=str, keep_default_na=False)
+        symbols_to_uniprot_ids = {gene_symbol: set(filter(None, uniprot_ids.split(';')))
+                                  for gene_symbol, uniprot_ids in zip(mapping_data['gene_symbol'],
+                                                                      mapping_data['uniprot_ids'])}
+    missing_gene_symbols = gene_symbols - symbols_to_uniprot_ids.keys()
+    if len(missing_gene_symbols) > 0:
+        print('converting ' + str(len(missing_gene_symbols)) + ' gene names not in ' + mapping_file_name)
+        symbols_to_uniprot_ids.update(bne.query_mygene_obj.convert_gene_symbols_to_uniprot_ids(missing_gene_symbols))
+        resolved_symbols = [gene_symbol for gene_symbol, uniprot_ids in symbols_to_uniprot_ids.items()
+                            if len(uniprot_ids) > 0]
+        mapping_data = pandas.DataFrame({'gene_symbol': resolved_symbols,
+                                         'uniprot_ids': [';'.join(sorted(symbols_to_uniprot_ids[gene_symbol]))
+                                                         for gene_symbol in resolved_symbols]})
+        mapping_data.to_csv(mapping_file_name, sep='\t', header=False, index=False)
+    return symbols_to_uniprot_ids
 
 
 def add_pc2_to_kg():
-    sif_data = pandas.read_csv('../../../data/pc2/PathwayCommons9.All.hgnc.sif',
-                               sep='\t', names=['gene1', 'interaction_type', 'gene2'])
-    interaction_types = set(['interacts-with',
-                             'controls-expression-of',
-                             'controls-state-change-of',
-                             'controls-phosphorylation-of'])
-    sif_data = sif_data[sif_data.interaction_type.isin(interaction_types)]
-    genes = set(sif_data['gene1'].tolist() + sif_data['gene2'].tolist())
-    genes_uniprot_dict = dict()
-    print('converting gene names')
-    for gene in genes:
-        genes_uniprot_dict[gene] = bne.query_mygene_obj.convert_gene_symbol_to_uniprot_id(gene)
+    sif_data = pandas.read_csv(PC2_SIF_FILE, sep='\t', names=['gene1', 'interaction_type', 'gene2'])
+    sif_data = sif_data[sif_data.interaction_type.isin(PC2_INTERACTION_TYPES.keys())]
+    genes = set(sif_data['gene1']) | set(sif_data['gene2'])
+    genes_uniprot_dict = get_gene_symbols_to_uniprot_ids(genes, PC2_UNIPROT_MAPPING_FILE)
+    # only gene symbols that map to exactly one UniProt ID are used
+    gene_to_unique_uniprot = pandas.Series({gene: next(iter(uniprots))
+                                            for gene, uniprots in genes_uniprot_dict.items() if len(uniprots) == 1})
     print('testing interactions to see if nodes are in the orangeboard')
-    for index, row in sif_data.iterrows():
-        interaction_type = row['interaction_type']
-        gene1 = row['gene1']
-        gene2 = row['gene2']
-        uniprots1 = genes_uniprot_dict.get(gene1, None)
-        uniprots2 = genes_uniprot_dict.get(gene2, None)
-        if uniprots1 is not None and len(uniprots1) == 1 and \
-           uniprots2 is not None and len(uniprots2) == 1:
-            uniprot1 = next(iter(uniprots1))
-            uniprot2 = next(iter(uniprots2))
-            node1 = ob.get_node('protein', uniprot1)
-            node2 = ob.get_node('protein', uniprot2)
-            if node1 is not None and node2 is not None and node1.uuid != node2.uuid:
-                if interaction_type == 'interacts-with':
-                    ob.add_rel('physically_interacts_with', 'PC2', node1, node2, extended_reltype="physically_interacts_with")
-                else:
-                    if interaction_type == 'controls-expression-of':
-                        ob.add_rel("regulates", 'PC2', node1, node2, extended_reltype="regulates_expression_of")
-                    else:
-                        if interaction_type == 'controls-state-change-of' or \
-                           interaction_type == 'controls-phosphorylation-of':
-                            ob.add_rel("regulates", 'PC2', node1, node2, extended_reltype="regulates_activity_of")
-                        else:
-                            assert False
+    protein_nodes = ob.dict_nodetype_to_dict_name_to_node.get('protein', dict())
+    sif_data = sif_data.assign(uniprot1=sif_data['gene1'].map(gene_to_unique_uniprot),
+                               uniprot2=sif_data['gene2'].map(gene_to_unique_uniprot))
+    sif_data = sif_data[sif_data['uniprot1'].isin(protein_nodes.keys()) &
+                        sif_data['uniprot2'].isin(protein_nodes.keys()) &
+                        (sif_data['uniprot1'] != sif_data['uniprot2'])]
+    print('adding ' + str(len(sif_data)) + ' interactions')
+    for interaction_type, uniprot1, uniprot2 in zip(sif_data['interaction_type'],
+                                                    sif_data['uniprot1'],
+                                                    sif_data['uniprot2']):
+        reltype, extended_reltype = PC2_INTERACTION_TYPES[interaction_type]
+        ob.add_rel(reltype, 'PC2', protein_nodes[uniprot1], protein_nodes[uniprot2], extended_reltype=extended_reltype)
 
 
-def seed_nodes_from_master_tsv_file():
-    seed_node_data = pandas.read_csv('../../../data/seed_nodes_filtered.tsv',
+def push_kg():
+    if args.export_csv is not None:
+        print('to load the exported KG into an empty database, run: ' + ob.export_neo4j_import_csv(args.export_csv))
+    elif args.incremental:
+        ob.neo4j_push_incremental()
+    else:
+        ob.neo4j_push()
+
+
+def read_seed_rows():
+    """returns the seed nodes in the master TSV file, as a ``list`` of ``(type, rtx_name, term)`` tuples"""
+    seed_node_data = pandas.read_csv(SEED_NODES_FILE,
                                      sep="\t",
                                      names=['type', 'rtx_name', 'term', 'purpose'],
                                      header=0,
                                      dtype={'rtx_name': str})
+    return [(row['type'], row['rtx_name'], row['term']) for index, row in seed_node_data.iterrows()]
+
+
+def add_seed_nodes(expander, seed_rows):
     first_row = True
-    for index, row in seed_node_data.iterrows():
-        bne.add_node_smart(row['type'], row['rtx_name'], seed_node_bool=first_row, desc=row['term'])
+    for node_type, rtx_name, term in seed_rows:
+        expander.add_node_smart(node_type, rtx_name, seed_node_bool=first_row, desc=term)
         if first_row:
             first_row = False
 
 
+def seed_nodes_from_master_tsv_file():
+    add_seed_nodes(bne, read_seed_rows())
+
+
+def build_shard(seed_rows, snapshot_file_name, num_workers, rate_factor, budget, priority):
+    """builds one shard of the KG in a worker process: seeds a new Orangeboard with `seed_rows`, expands it, and
+    saves it to a snapshot file for `merge_shard`
+
+    :param rate_factor: the fraction of the default per-host request rates that the shard may use
+    :param budget: an ``ExpansionBudget`` for the shard, or ``None`` to expand `NUM_EXPANSIONS` times in full
+    :param priority: the expansion priority, if there is a budget
+    """
+    shard_ob = Orangeboard(debug=False)
+    # the shard's requests are all throttled here, so the prefetch threads need no limiter of their own
+    shard_bne = BioNetExpander(shard_ob, num_workers=num_workers, host_rate_limiter=HostRateLimiter.unlimited())
+    with HTTPClient.get_instance().throttle_requests(HostRateLimiter().scaled(rate_factor)):
+        add_seed_nodes(shard_bne, seed_rows)
+        if budget is None:
+            for _ in range(NUM_EXPANSIONS):
+                shard_bne.expand_all_nodes()
+        else:
+            shard_bne.expand_with_budget(budget, priority=priority, max_seed_distance=NUM_EXPANSIONS)
+    shard_bne.shutdown_prefetch()
+    shard_ob.save_snapshot(snapshot_file_name,
+                           {'gene_symbols_to_protein_nodes': shard_bne.gene_symbols_to_protein_nodes})
+    print('shard ' + snapshot_file_name + ': ' + str(shard_ob.count_nodes()) + ' nodes, ' +
+          str(shard_ob.count_rels()) + ' rels')
+    return snapshot_file_name
+
+
+def merge_shard(snapshot_file_name):
+    """merges a shard saved by `build_shard` into the KG"""
+    shard_ob = Orangeboard(debug=False)
+    shard_state = shard_ob.load_snapshot(snapshot_file_name)
+    node_map = ob.merge(shard_ob)
+    for gene_symbol, node in shard_state['gene_symbols_to_protein_nodes'].items():
+        if gene_symbol not in bne.gene_symbols_to_protein_nodes and node in node_map:
+            bne.gene_symbols_to_protein_nodes[gene_symbol] = node_map[node]
+
+
+def build_and_merge_shards():
+    """partitions the seed nodes among `args.shards` worker processes, each of which builds its part of the KG into
+    its own Orangeboard, and then merges the parts, in shard order, into `ob`"""
+    num_shards = args.shards
+    seed_rows = read_seed_rows()
+    shard_budget = None
+    if expansion_budget is not None:
+        shard_budget = expansion_budget.scaled(1.0 / num_shards)
+    with tempfile.TemporaryDirectory(prefix='BuildMasterKG-shards-', dir=args.shard_dir) as shard_dir:
+        # forked workers inherit the HTTP client and response cache settings (and any stand-in server routing)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=num_shards,
+                                                    mp_context=multiprocessing.get_context('fork')) as executor:
+            # the pool forks all of its workers on the first submit, which must not happen while the periodic
+            # summary thread might hold a lock
+            with UpstreamStats.get_instance().paused_periodic_summary():
+                futures = [executor.submit(build_shard, seed_rows[shard_index::num_shards],
+                                           os.path.join(shard_dir, 'shard' + str(shard_index) + '.pickle'),
+                                           # the per-host request rates are shared among the shards
+                                           args.workers, 1.0 / num_shards, shard_budget, args.expansion_priority)
+                           for shard_index in range(num_shards)]
+            snapshot_file_names = [future.result() for future in futures]
+        for snapshot_file_name in snapshot_file_names:
+            merge_shard(snapshot_file_name)
+
+
 def add_dgidb_to_kg():
-    tuple_list = QueryDGIdb.read_interactions()
-    for tuple_dict in tuple_list:
-        drug_node = bne.add_node_smart('chemical_substance', tuple_dict['drug_chembl_id'],
-                                       seed_node_bool=True,
-                                       desc=tuple_dict['drug_name'])
-        prot_node = bne.add_node_smart('protein', tuple_dict['protein_uniprot_id'],
-                                       seed_node_bool=True,
-                                       desc=tuple_dict['protein_gene_symbol'])
-        pmids = tuple_dict['pmids']
-        ob.add_rel(tuple_dict['predicate'],
-                   ';'.join(['DGIdb', tuple_dict['sourcedb']]),
-                   drug_node,
-                   prot_node,
-                   extended_reltype=tuple_dict['predicate_extended'].replace(' ', '_'),
-                   publications=pmids)
+    for tuple_list in QueryDGIdb.read_interactions_in_batches():
+        for tuple_dict in tuple_list:
+            drug_node = bne.add_node_smart('chemical_substance', tuple_dict['drug_chembl_id'],
+                                           seed_node_bool=True,
+                                           desc=tuple_dict['drug_name'])
+            prot_node = bne.add_node_smart('protein', tuple_dict['protein_uniprot_id'],
+                                           seed_node_bool=True,
+                                           desc=tuple_dict['protein_gene_symbol'])
+            pmids = tuple_dict['pmids']
+            ob.add_rel(tuple_dict['predicate'],
+                       ';'.join(['DGIdb', tuple_dict['sourcedb']]),
+                       drug_node,
+                       prot_node,
+                       extended_reltype=tuple_dict['predicate_extended'].replace(' ', '_'),
+                       publications=pmids)
 
 
 def make_master_kg_dili():
@@ -103,7 +220,7 @@ def make_master_kg_dili():
     bne.expand_all_nodes()
     bne.expand_all_nodes()
     # ob.neo4j_set_url("bolt://0.0.0.0:7687")
-    ob.neo4j_push()
+    push_kg()
     print("count(Node) = {}".format(ob.count_nodes()))
     print("count(Rel) = {}".format(ob.count_rels()))
 
@@ -111,18 +228,50 @@ def make_master_kg_dili():
 def test_dgidb():
 #    seed_nodes_from_master_tsv_file()
     add_dgidb_to_kg()
-    ob.neo4j_push()
+    push_kg()
+
+
+def run_stages(stages):
+    """runs the build stages in order; if a checkpoint file was given, saves a snapshot of the KG after each stage,
+    and if resuming, first loads the snapshot and skips the stages that it says are complete
+
+    :param stages: a ``list`` of ``(stage_name, stage_function)`` tuples
+    """
+    completed_stage_names = []
+    if args.resume:
+        checkpoint_state = ob.load_snapshot(args.checkpoint)
+        completed_stage_names = checkpoint_state['completed_stage_names']
+        bne.gene_symbols_to_protein_nodes = checkpoint_state['gene_symbols_to_protein_nodes']
+        print('resuming after stage: ' + completed_stage_names[-1])
+    for stage_name, stage_function in stages:
+        if stage_name in completed_stage_names:
+            continue
+        print('running stage: ' + stage_name)
+        stage_function()
+        completed_stage_names.append(stage_name)
+        if args.checkpoint is not None:
+            ob.save_snapshot(args.checkpoint,
+                             {'completed_stage_names': completed_stage_names,
+                              'gene_symbols_to_protein_nodes': bne.gene_symbols_to_protein_nodes})
+
+
+def expand_within_budget():
+    bne.expand_with_budget(expansion_budget, priority=args.expansion_priority, max_seed_distance=NUM_EXPANSIONS)
 
 
 def make_master_kg():
-    seed_nodes_from_master_tsv_file()
-    bne.expand_all_nodes()
-    bne.expand_all_nodes()
-    bne.expand_all_nodes()
-    add_pc2_to_kg()
-    add_dgidb_to_kg()
+    if args.shards > 1:
+        seed_and_expand_stages = [('shards', build_and_merge_shards)]
+    elif expansion_budget is None:
+        seed_and_expand_stages = [('seed', seed_nodes_from_master_tsv_file)] + \
+                                 [('expand' + str(i), bne.expand_all_nodes) for i in range(1, NUM_EXPANSIONS + 1)]
+    else:
+        seed_and_expand_stages = [('seed', seed_nodes_from_master_tsv_file), ('expand', expand_within_budget)]
+    run_stages(seed_and_expand_stages +
+               [('pc2', add_pc2_to_kg),
+                ('dgidb', add_dgidb_to_kg)])
     # ob.neo4j_set_url('bolt://0.0.0.0:7687')
-    ob.neo4j_push()
+    push_kg()
     print("count(Node) = {}".format(ob.count_nodes()))
     print("count(Rel) = {}".format(ob.count_rels()))
 
@@ -137,22 +286,129 @@ if __name__ == '__main__':
     parser.add_argument("-p", "--password", help="The password used to connect to the neo4j instance. (default: )",
                         default='')
     parser.add_argument('--runfunc', dest='runfunc')
+    parser.add_argument("-w", "--workers", type=int, help="number of threads used to fetch upstream data for each "
+                                                           "expansion frontier (default: 1, i.e., serial)", default=1)
+    parser.add_argument("--incremental", action="store_true", help="update the Neo4j database in place, writing only the "
+                                                                   "nodes and relationships that changed, instead of "
+                                                                   "clearing and re-creating it", default=False)
+    parser.add_argument("--export-csv", dest="export_csv", help="instead of pushing to Neo4j, write the KG to this "
+                                                               "directory as CSV files for neo4j-admin import",
+                        default=None)
+    parser.add_argument("--push-batch-size", dest="push_batch_size", type=int,
+                        help="number of nodes or relationships per Neo4j transaction when pushing (default: 10000)",
+                        default=10000)
+    parser.add_argument("--push-sessions", dest="push_sessions", type=int,
+                        help="number of Neo4j sessions writing concurrently when pushing (default: 4)", default=4)
+    parser.add_argument("--recreate-store", dest="recreate_store",
+                        help="clear the Neo4j database before pushing by stopping Neo4j, deleting this store directory "
+                             "(e.g., .../data/databases/graph.db) and starting Neo4j again, instead of deleting the "
+                             "graph in batches; must run on the Neo4j host (default: delete in batches)", default=None)
+    parser.add_argument("--neo4j-command", dest="neo4j_command",
+                        help="command that stops or starts Neo4j when followed by 'stop' or 'start', for "
+                             "--recreate-store (default: " + Neo4jStore.DEFAULT_NEO4J_COMMAND + ")",
+                        default=Neo4jStore.DEFAULT_NEO4J_COMMAND)
+    parser.add_argument("--cachedb", help="sqlite file for the CachedMethods results shared across runs and workers "
+                                          "(default: keep the cache in memory)", default=None)
+    parser.add_argument("--checkpoint", help="file where a snapshot of the KG is saved after each build stage "
+                                             "(default: no snapshots)", default=None)
+    parser.add_argument("--resume", action="store_true", help="load the --checkpoint snapshot and continue the build "
+                                                              "after its last completed stage", default=False)
+    parser.add_argument("--response-cache", dest="response_cache",
+                        help="sqlite file for the cached upstream HTTP responses (default: " +
+                             ResponseCache.DEFAULT_PATH + ", or $RTX_RESPONSE_CACHE_DB)", default=None)
+    parser.add_argument("--dgidb-snapshot", dest="dgidb_snapshot",
+                        help="sqlite file for the local snapshot of the DGIdb interactions (default: " +
+                             DGIdbSnapshot.DEFAULT_PATH + ", or $RTX_DGIDB_SNAPSHOT_DB)", default=None)
+    parser.add_argument("--refresh-dgidb", dest="refresh_dgidb", action="store_true",
+                        help="check whether the DGIdb interactions file has changed upstream even if the snapshot was "
+                             "checked less than a day ago", default=False)
+    parser.add_argument("--record-fixtures", dest="record_fixtures",
+                        help="record every upstream HTTP response into this fixture archive (the response cache is "
+                             "bypassed so that every response is recorded)", default=None)
+    parser.add_argument("--replay-fixtures", dest="replay_fixtures",
+                        help="serve the upstream HTTP responses from this fixture archive via a local stand-in server "
+                             "instead of the live services", default=None)
+    parser.add_argument("--replay-latency", dest="replay_latency", type=float,
+                        help="seconds of latency the stand-in server adds to each response (default: 0)", default=0.0)
+    parser.add_argument("--replay-error-rate", dest="replay_error_rate", type=float,
+                        help="fraction of requests that the stand-in server answers with a 503 (default: 0)",
+                        default=0.0)
+    parser.add_argument("--stats-interval", dest="stats_interval", type=float,
+                        help="print a summary of the upstream calls every this many seconds (default: only at the end)",
+                        default=None)
+    parser.add_argument("--stats-report", dest="stats_report",
+                        help="write a JSON report of the upstream call counts, latencies, cache hit ratios, errors, "
+                             "and bytes to this file at the end of the build (default: no report)", default=None)
+    parser.add_argument("--max-nodes", dest="max_nodes", type=int,
+                        help="stop expanding when the KG has this many nodes (default: no limit)", default=None)
+    parser.add_argument("--max-rels", dest="max_rels", type=int,
+                        help="stop expanding when the KG has this many relationships (default: no limit)", default=None)
+    parser.add_argument("--max-api-calls", dest="max_api_calls", type=int,
+                        help="stop expanding after this many upstream API calls over the network (default: no limit)",
+                        default=None)
+    parser.add_argument("--max-seconds", dest="max_seconds", type=float,
+                        help="stop expanding after this many seconds (default: no limit)", default=None)
+    parser.add_argument("--expansion-priority", dest="expansion_priority",
+                        choices=BioNetExpander.EXPANSION_PRIORITIES, default="seed_distance",
+                        help="order in which nodes are expanded when a --max-* budget is given (default: "
+                             "seed_distance)")
+    parser.add_argument("--shards", type=int, help="number of worker processes among which the seed nodes are "
+                                                   "partitioned; each builds its part of the KG, and the parts are "
+                                                   "merged (default: 1, i.e., one process)", default=1)
+    parser.add_argument("--shard-dir", dest="shard_dir", help="directory for the temporary snapshots of the shards "
+                                                              "(default: the system temporary directory)", default=None)
     args = parser.parse_args()
 
+    if args.recreate_store is not None and args.incremental:
+        parser.error('--recreate-store and --incremental are mutually exclusive')
+    if args.resume and args.checkpoint is None:
+        parser.error('--resume requires --checkpoint')
+    if args.record_fixtures is not None and args.replay_fixtures is not None:
+        parser.error('--record-fixtures and --replay-fixtures are mutually exclusive')
+
     if args.username == '' or args.password == '':
         print('usage: BuildMasterKG.py [-h] [-a URL] [-u USERNAME] [-p PASSWORD] [--runfunc RUNFUNC]')
         print('BuildMasterKG.py: error: invalid username or password')
         exit(0)
 
+    if args.cachedb is not None:
+        CachedMethods.use_backend(CachedMethods.SqliteBackend(args.cachedb))
+
+    upstream_context = contextlib.ExitStack()
+    if args.record_fixtures is not None:
+        HTTPClient.set_instance(HTTPClient(response_cache=None))
+        upstream_context.enter_context(record_requests(FixtureArchive(args.record_fixtures)))
+    elif args.replay_fixtures is not None:
+        HTTPClient.set_instance(HTTPClient(response_cache=None))
+        stand_in_server = upstream_context.enter_context(StandInServer(FixtureArchive(args.replay_fixtures),
+                                                                       latency=args.replay_latency,
+                                                                       error_rate=args.replay_error_rate))
+        upstream_context.enter_context(route_requests(stand_in_server.url))
+    elif args.response_cache is not None:
+        HTTPClient.set_instance(HTTPClient(response_cache=ResponseCache(args.response_cache)))
+
+    if args.dgidb_snapshot is not None:
+        DGIdbSnapshot.set_instance(DGIdbSnapshot(args.dgidb_snapshot))
+    if args.refresh_dgidb:
+        DGIdbSnapshot.get_instance().check_interval = 0
+
     # create an Orangeboard object
     ob = Orangeboard(debug=True)
 
     # configure the Orangeboard for Neo4j connectivity
     ob.neo4j_set_url(args.address)
     ob.neo4j_set_auth(user=args.username, password=args.password)
+    ob.neo4j_set_push_options(batch_size=args.push_batch_size, num_sessions=args.push_sessions)
+    if args.recreate_store is not None:
+        ob.neo4j_set_store(Neo4jStore(args.recreate_store, neo4j_command=args.neo4j_command))
     ob.neo4j_connect()
 
-    bne = BioNetExpander(ob)
+    bne = BioNetExpander(ob, num_workers=args.workers)
+
+    expansion_budget = None
+    if any(limit is not None for limit in (args.max_nodes, args.max_rels, args.max_api_calls, args.max_seconds)):
+        expansion_budget = ExpansionBudget(max_nodes=args.max_nodes, max_rels=args.max_rels,
+                                           max_api_calls=args.max_api_calls, max_seconds=args.max_seconds)
 
     args_dict = vars(args)
     if args_dict.get('runfunc', None) is not None:
@@ -163,5 +419,18 @@ if __name__ == '__main__':
         run_function = globals()[run_function_name]
     except KeyError:
         sys.exit('In module BuildMasterKG.py, unable to find function named: ' + run_function_name)
-    running_time = timeit.timeit(lambda: run_function(), number=1)
+    upstream_stats = UpstreamStats.get_instance()
+    if args.stats_interval is not None:
+        upstream_stats.start_periodic_summary(args.stats_interval)
+    with upstream_context:
+        running_time = timeit.timeit(lambda: run_function(), number=1)
+    bne.shutdown_prefetch()
+    upstream_stats.stop_periodic_summary()
     print('running time for function: ' + str(running_time))
+    print(upstream_stats.summary())
+    if args.stats_report is not None:
+        upstream_stats.write_report(args.stats_report)
+    if HTTPClient.get_instance().response_cache is not None:
+        print('HTTP response cache: ' + str(HTTPClient.get_instance().response_cache.cache_info()))
+    if args.replay_fixtures is not None:
+        print('stand-in server: ' + str(stand_in_server.stats))
@@ -1,4 +1,26 @@
 """ This module keeps track of all cacheable methods (or functions) for NCATS project.
+
+Cached results are kept in a pluggable backend.  The default `MemoryBackend` is
+process-local, like the `functools.lru_cache` this module used to wrap; the
+`SqliteBackend` keeps results in an on-disk store that several processes (KG
+build workers, API workers) can share across runs.  Select the backend with
+`use_backend()`, or by setting the environment variable `RTX_CACHED_METHODS_DB`
+to the path of the sqlite file before this module is imported.
+
+Concurrent calls of a method with the same arguments, made before its result
+is cached, share one call (see `RequestCoalescer`).
+
+Empty results (``None``, or an empty set, list, dict or string) are what the
+Query* classes return when an upstream request fails, so they are cached for
+only `empty_ttl` seconds and are then fetched again.
+
+Usage:
+
+    @CachedMethods.register
+    def f(x): ...
+
+    @CachedMethods.register(ttl=86400, maxsize=100000)
+    def g(x): ...
 """
 __author__ = ""
 __copyright__ = ""
@@ -9,33 +31,319 @@ __maintainer__ = ""
 __email__ = ""
 __status__ = "Prototype"
 
-from functools import lru_cache
+import os
+import sys
+import time
+import json
+import pickle
+import hashlib
+import sqlite3
+import threading
+import functools
+from collections import namedtuple, OrderedDict
+from RequestCoalescer import RequestCoalescer
 
-__all__ = ['register', 'cache_info', 'cache_clear']
+__all__ = ['register', 'cache_info', 'cache_clear', 'use_backend', 'MemoryBackend', 'SqliteBackend']
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
 
 # all methods (or function) decorated with `@CachedMethod.register` will be added to this list
 cached_methods = []
 
 enabled = True
 
-lru_cache_setting = {
+# default settings for every registered method; `ttl` and `empty_ttl` (the `ttl` of empty results) are in seconds,
+# `None` means never expire
+default_setting = {
     "maxsize": 1024,
-    "typed": False
+    "ttl": None,
+    "empty_ttl": 3600
 }
 
+# per-method overrides of `default_setting`, keyed by the method's `__qualname__`
+method_settings = dict()
+
+# concurrent calls of a method with the same arguments, while its result is not cached yet, share one call
+coalescer = RequestCoalescer()
 
-def register(method):
+
+def is_empty(value):
+    """
+    :return: ``True`` if `value` is ``None`` or an empty container or string (but not ``0`` or ``False``)
     """
-    Put the lru_cache enabled method (or function) into `cached_methods`
+    if value is None:
+        return True
+    try:
+        return len(value) == 0
+    except TypeError:
+        return False
+
+
+def is_expired(created, value, ttl, empty_ttl):
+    age = time.time() - created
+    if ttl is not None and age > ttl:
+        return True
+    return empty_ttl is not None and age > empty_ttl and is_empty(value)
+
+
+class MemoryBackend:
+    """Process-local LRU store, one `OrderedDict` per cached method"""
+
+    def __init__(self):
+        self._stores = dict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key, ttl, empty_ttl=None):
+        """
+        :return: a ``(hit, value)`` pair
+        """
+        with self._lock:
+            store = self._stores.get(namespace, None)
+            if store is None or key not in store:
+                return False, None
+            created, value = store[key]
+            if is_expired(created, value, ttl, empty_ttl):
+                del store[key]
+                return False, None
+            store.move_to_end(key)
+            return True, value
+
+    def set(self, namespace, key, value, maxsize):
+        """
+        :return: the number of entries evicted to stay within `maxsize`
+        """
+        with self._lock:
+            store = self._stores.setdefault(namespace, OrderedDict())
+            store[key] = (time.time(), value)
+            store.move_to_end(key)
+            evictions = 0
+            if maxsize is not None:
+                while len(store) > maxsize:
+                    store.popitem(last=False)
+                    evictions += 1
+            return evictions
+
+    def size(self, namespace):
+        return len(self._stores.get(namespace, ()))
+
+    def clear(self, namespace):
+        with self._lock:
+            self._stores.pop(namespace, None)
+
+
+class SqliteBackend:
+    """On-disk store shared between processes; values are pickled, entries are evicted least-recently-used first"""
+
+    # a hit records its access time (for least-recently-used eviction) only if the recorded one is older than this,
+    # so that most hits do not write to the database
+    ACCESS_TIME_RESOLUTION_SEC = 3600
+
+    def __init__(self, path='CachedMethods.sqlite', timeout=60):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connect(self):
+        # sqlite connections must not be shared across a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (namespace TEXT NOT NULL, key TEXT NOT NULL, '
+                         'value BLOB, created REAL, accessed REAL, PRIMARY KEY (namespace, key))')
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (namespace, accessed)')
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, namespace, key, ttl, empty_ttl=None):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute('SELECT value, created, accessed FROM cache WHERE namespace=? AND key=?',
+                               (namespace, key)).fetchone()
+            if row is None:
+                return False, None
+            value = pickle.loads(row[0])
+            if is_expired(row[1], value, ttl, empty_ttl):
+                conn.execute('DELETE FROM cache WHERE namespace=? AND key=?', (namespace, key))
+                conn.commit()
+                return False, None
+            now = time.time()
+            if now - row[2] > self.ACCESS_TIME_RESOLUTION_SEC:
+                conn.execute('UPDATE cache SET accessed=? WHERE namespace=? AND key=?', (now, namespace, key))
+                conn.commit()
+        return True, value
+
+    def set(self, namespace, key, value, maxsize):
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print('CachedMethods: unable to store result for ' + namespace + ': ' + repr(e), file=sys.stderr)
+            return 0
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute('INSERT OR REPLACE INTO cache (namespace, key, value, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                         (namespace, key, sqlite3.Binary(blob), now, now))
+            evictions = 0
+            if maxsize is not None:
+                count = conn.execute('SELECT COUNT(*) FROM cache WHERE namespace=?', (namespace,)).fetchone()[0]
+                if count > maxsize:
+                    evictions = conn.execute('DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache WHERE namespace=? '
+                                             'ORDER BY accessed LIMIT ?)', (namespace, count - maxsize)).rowcount
+            conn.commit()
+        return evictions
+
+    def size(self, namespace):
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM cache WHERE namespace=?', (namespace,)).fetchone()[0]
+
+    def clear(self, namespace):
+        with self._lock:
+            conn = self._connect()
+            conn.execute('DELETE FROM cache WHERE namespace=?', (namespace,))
+            conn.commit()
+
 
-    :param method: the method (or function) wrapped by `@functools.lru_cache`
-                   that you want to be managed by this module
+backend = MemoryBackend()
+if os.environ.get('RTX_CACHED_METHODS_DB', None) is not None:
+    backend = SqliteBackend(os.environ['RTX_CACHED_METHODS_DB'])
+
+
+def use_backend(new_backend):
+    """
+    Switch every registered method to `new_backend` (a `MemoryBackend` or `SqliteBackend`)
+    """
+    global backend
+    backend = new_backend
+
+
+def _canonical(obj):
+    """
+    Convert an argument into a JSON-serializable form that is equal for equal values, so that
+    unhashable arguments (lists, dicts, sets) can be used as cache keys
+
+    :raises TypeError: if `obj` has the default repr, which tells nothing about its state (e.g., `self`)
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return [type(obj).__name__, [_canonical(x) for x in obj]]
+    if isinstance(obj, (set, frozenset)):
+        return ['set', sorted((_canonical(x) for x in obj), key=repr)]
+    if isinstance(obj, dict):
+        return ['dict', sorted(([_canonical(k), _canonical(v)] for k, v in obj.items()), key=repr)]
+    if type(obj).__repr__ is object.__repr__:
+        # the default repr holds the object's address, which differs between processes, and keying on the class
+        # alone would share results between instances with different state
+        raise TypeError('CachedMethods: cannot make a cache key from a ' + type(obj).__qualname__ + ' object; '
+                        'register an instance method with skip_self=True if its result does not depend on self')
+    return [type(obj).__qualname__, repr(obj)]
+
+
+def make_key(args, kwargs):
+    """
+    Build the canonical cache key for a call with positional `args` and keyword `kwargs`
+    """
+    key_str = json.dumps([_canonical(args), _canonical(kwargs)], sort_keys=True)
+    return hashlib.sha1(key_str.encode('utf-8')).hexdigest()
+
+
+def _wrap(method, ttl, maxsize, skip_self, empty_ttl):
+    namespace = method.__module__ + '.' + method.__qualname__
+    stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    stats_lock = threading.Lock()
+
+    def get_setting(name, value):
+        override = method_settings.get(method.__qualname__, {})
+        if name in override:
+            return override[name]
+        if value is not None:
+            return value
+        return default_setting[name]
+
+    def call_and_store(key, args, kwargs):
+        value = method(*args, **kwargs)
+        evictions = backend.set(namespace, key, value, get_setting('maxsize', maxsize))
+        with stats_lock:
+            stats['misses'] += 1
+            stats['evictions'] += evictions
+        return value
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        key_args = args[1:] if skip_self else args
+        key = make_key(key_args, kwargs)
+        hit, value = backend.get(namespace, key, get_setting('ttl', ttl),
+                                 get_setting('empty_ttl', empty_ttl))
+        if hit:
+            with stats_lock:
+                stats['hits'] += 1
+            return value
+        shared, value = coalescer.call((namespace, key), call_and_store, key, args, kwargs)
+        if shared:
+            # another thread's call for the same arguments was in flight; its result serves this call too
+            with stats_lock:
+                stats['hits'] += 1
+        return value
+
+    def wrapper_cache_lookup(*args, **kwargs):
+        """
+        :return: a ``(hit, value)`` pair for the result cached for these arguments, without calling the method
+        """
+        key_args = args[1:] if skip_self else args
+        hit, value = backend.get(namespace, make_key(key_args, kwargs), get_setting('ttl', ttl),
+                                 get_setting('empty_ttl', empty_ttl))
+        with stats_lock:
+            stats['hits' if hit else 'misses'] += 1
+        return hit, value
+
+    def wrapper_cache_store(value, *args, **kwargs):
+        """
+        Cache `value` as the result for these arguments (e.g., a result obtained from a batch query)
+        """
+        key_args = args[1:] if skip_self else args
+        evictions = backend.set(namespace, make_key(key_args, kwargs), value, get_setting('maxsize', maxsize))
+        with stats_lock:
+            stats['evictions'] += evictions
+
+    def wrapper_cache_info():
+        return CacheInfo(stats['hits'], stats['misses'], stats['evictions'],
+                         get_setting('maxsize', maxsize), backend.size(namespace))
+
+    def wrapper_cache_clear():
+        backend.clear(namespace)
+        with stats_lock:
+            stats.update(hits=0, misses=0, evictions=0)
+
+    wrapper.cache_lookup = wrapper_cache_lookup
+    wrapper.cache_store = wrapper_cache_store
+    wrapper.cache_info = wrapper_cache_info
+    wrapper.cache_clear = wrapper_cache_clear
+    return wrapper
+
+
+def register(method=None, ttl=None, maxsize=None, skip_self=False, empty_ttl=None):
+    """
+    Put the cache enabled method (or function) into `cached_methods`
+
+    :param method: the method (or function) that you want to be managed by this module
+    :param ttl: seconds after which a cached result expires (default: `default_setting['ttl']`)
+    :param maxsize: maximum number of cached results for this method (default: `default_setting['maxsize']`)
+    :param empty_ttl: seconds after which a cached empty result expires (default: `default_setting['empty_ttl']`)
+    :param skip_self: leave the first positional argument (``self``) out of the cache key, so that results are
+                      shared between instances; use this for instance methods whose result does not depend on `self`
     :return:
     """
-    global enabled, cached_methods, lru_cache_setting
+    global enabled, cached_methods
+
+    if method is None:
+        return lambda m: register(m, ttl=ttl, maxsize=maxsize, skip_self=skip_self, empty_ttl=empty_ttl)
 
     if enabled:
-        method = lru_cache(**lru_cache_setting)(method)
+        method = _wrap(method, ttl, maxsize, skip_self, empty_ttl)
         cached_methods.append(method)
         return method
     else:
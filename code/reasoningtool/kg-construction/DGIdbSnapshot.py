@@ -0,0 +1,238 @@
+""" This module defines the class DGIdbSnapshot, a local, indexed copy of the
+DGIdb interactions file (http://www.dgidb.org/downloads) used by `QueryDGIdb`.
+
+The snapshot is a sqlite file with one row per line of `interactions.tsv`,
+indexed by gene symbol, drug ChEMBL ID and drug name. `refresh()` downloads the
+file only if it has changed upstream: it sends a conditional GET with the
+`ETag` and `Last-Modified` of the snapshot, and does not even ask more often
+than every `check_interval` seconds. A download is streamed into the sqlite
+file in batches of rows, so it never holds the whole file in memory, and it
+replaces the previous snapshot only once it has completed; if it fails, the
+previous snapshot is kept.
+
+Usage:
+
+    snapshot = DGIdbSnapshot.get_instance()
+    snapshot.refresh()
+    for rows in snapshot.iterate_rows(batch_size=10000):
+        ...
+
+The snapshot file is `DGIdbSnapshot.sqlite` in the working directory, or the
+path in the environment variable `RTX_DGIDB_SNAPSHOT_DB`.
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import os
+import sys
+import csv
+import time
+import sqlite3
+import threading
+import urllib.parse
+import requests
+
+from HTTPClient import HTTPClient
+
+
+class DGIdbSnapshot:
+    DEFAULT_PATH = 'DGIdbSnapshot.sqlite'
+    INTERACTIONS_TSV_URL = 'http://www.dgidb.org/data/interactions.tsv'
+    # the columns of interactions.tsv that are kept in the snapshot
+    COLUMNS = ('gene_name', 'gene_claim_name', 'interaction_claim_source', 'interaction_types', 'drug_name',
+               'drug_chembl_id', 'PMIDs')
+    DEFAULT_CHECK_INTERVAL_SEC = 24 * 3600
+    DEFAULT_BATCH_SIZE = 10000
+    TIMEOUT_SEC = 600
+
+    instance = None
+    instance_lock = threading.Lock()
+
+    def __init__(self, path=DEFAULT_PATH, url=INTERACTIONS_TSV_URL, check_interval=DEFAULT_CHECK_INTERVAL_SEC):
+        """
+        :param path: the sqlite file
+        :param url: the URL of the DGIdb interactions TSV file
+        :param check_interval: seconds after a check during which `refresh` does not check upstream again
+        """
+        self.path = path
+        self.url = url
+        self.check_interval = check_interval
+
+    @staticmethod
+    def get_instance():
+        """returns the process-wide `DGIdbSnapshot`, in the file named by the environment variable
+        `RTX_DGIDB_SNAPSHOT_DB` (default: `DEFAULT_PATH`)"""
+        with DGIdbSnapshot.instance_lock:
+            if DGIdbSnapshot.instance is None:
+                DGIdbSnapshot.instance = DGIdbSnapshot(os.environ.get('RTX_DGIDB_SNAPSHOT_DB',
+                                                                      DGIdbSnapshot.DEFAULT_PATH))
+            return DGIdbSnapshot.instance
+
+    @staticmethod
+    def set_instance(snapshot):
+        with DGIdbSnapshot.instance_lock:
+            DGIdbSnapshot.instance = snapshot
+
+    def connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute('CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)')
+        conn.execute('CREATE TABLE IF NOT EXISTS interactions (gene_symbol TEXT, ' +
+                     ', '.join(column + ' TEXT' for column in DGIdbSnapshot.COLUMNS) + ')')
+        conn.commit()
+        return conn
+
+    def get_metadata(self):
+        """
+        :returns: a ``dict`` with the ``etag``, ``last_modified``, ``checked`` (time of the last check) and
+        ``num_rows`` of the snapshot, for those that are known
+        """
+        conn = self.connect()
+        try:
+            return {row['name']: row['value'] for row in conn.execute('SELECT name, value FROM metadata')}
+        finally:
+            conn.close()
+
+    def refresh(self, force=False):
+        """downloads the interactions file into the snapshot if it has changed upstream since the snapshot was made
+
+        :param force: check upstream even if the last check was less than `check_interval` seconds ago
+        :returns: ``True`` if the snapshot was updated
+        """
+        metadata = self.get_metadata()
+        if not force and 'num_rows' in metadata and \
+                time.time() - float(metadata.get('checked', 0)) < self.check_interval:
+            return False
+        headers = dict()
+        if 'num_rows' in metadata:
+            if 'etag' in metadata:
+                headers['If-None-Match'] = metadata['etag']
+            if 'last_modified' in metadata:
+                headers['If-Modified-Since'] = metadata['last_modified']
+        session = HTTPClient.get_instance().get_session(urllib.parse.urlsplit(self.url).hostname)
+        try:
+            # not through `HTTPClient.request`, which would read (and cache) the whole file
+            with session.get(self.url, headers=headers, stream=True, timeout=DGIdbSnapshot.TIMEOUT_SEC) as res:
+                if res.status_code == 304:
+                    self.set_metadata({'checked': str(time.time())})
+                    return False
+                res.raise_for_status()
+                res.encoding = 'utf-8'
+                self.load(res.iter_lines(decode_unicode=True),
+                          {'etag': res.headers.get('ETag', None),
+                           'last_modified': res.headers.get('Last-Modified', None)})
+        except (requests.exceptions.RequestException, csv.Error) as e:
+            if 'num_rows' not in metadata:
+                raise
+            print('DGIdbSnapshot: unable to refresh from ' + self.url + ' (' + type(e).__name__ +
+                  '); using the snapshot of ' + str(metadata.get('last_modified', 'unknown date')), file=sys.stderr)
+            return False
+        return True
+
+    def set_metadata(self, metadata, conn=None):
+        own_conn = conn is None
+        if own_conn:
+            conn = self.connect()
+        try:
+            conn.executemany('INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)',
+                             [(name, value) for name, value in metadata.items() if value is not None])
+            conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+
+    def load(self, lines, metadata=None, batch_size=DEFAULT_BATCH_SIZE):
+        """replaces the snapshot with the rows of an interactions TSV file, inserting them `batch_size` at a time;
+        the previous snapshot remains in place until all rows are loaded
+
+        :param lines: an iterable of the lines of the file, starting with its header
+        :param metadata: a ``dict`` with the ``etag`` and ``last_modified`` of the file
+        :returns: the number of rows loaded
+        """
+        reader = csv.reader(lines, delimiter='\t')
+        header = next(reader)
+        column_indices = [header.index(column) for column in DGIdbSnapshot.COLUMNS]
+        gene_name_index, gene_claim_name_index = column_indices[0], column_indices[1]
+        num_fields = len(header)
+        insert_sql = 'INSERT INTO interactions_new VALUES (' + ', '.join(['?'] * (len(column_indices) + 1)) + ')'
+        conn = self.connect()
+        try:
+            conn.execute('DROP TABLE IF EXISTS interactions_new')
+            conn.execute('CREATE TABLE interactions_new AS SELECT * FROM interactions WHERE 0')
+            num_rows = 0
+            batch = []
+            for fields in reader:
+                if len(fields) < num_fields:
+                    fields += [''] * (num_fields - len(fields))
+                gene_symbol = fields[gene_name_index] or fields[gene_claim_name_index]
+                batch.append([gene_symbol] + [fields[index] for index in column_indices])
+                if len(batch) >= batch_size:
+                    conn.executemany(insert_sql, batch)
+                    num_rows += len(batch)
+                    batch = []
+            conn.executemany(insert_sql, batch)
+            num_rows += len(batch)
+            conn.commit()
+            # swap the new rows in, in one transaction
+            conn.execute('BEGIN')
+            conn.execute('DROP TABLE interactions')
+            conn.execute('ALTER TABLE interactions_new RENAME TO interactions')
+            conn.execute('CREATE INDEX interactions_gene_symbol ON interactions (gene_symbol)')
+            conn.execute('CREATE INDEX interactions_drug_chembl_id ON interactions (drug_chembl_id)')
+            conn.execute('CREATE INDEX interactions_drug_name ON interactions (drug_name)')
+            conn.execute('DELETE FROM metadata')
+            metadata = dict(metadata) if metadata is not None else dict()
+            metadata.update({'checked': str(time.time()), 'num_rows': str(num_rows)})
+            self.set_metadata(metadata, conn)
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return num_rows
+
+    def iterate_rows(self, batch_size=DEFAULT_BATCH_SIZE):
+        """yields the rows of the snapshot in file order, as ``list``s of at most `batch_size` `sqlite3.Row` objects
+        (with the fields named as in the interactions file, plus ``gene_symbol``)"""
+        conn = self.connect()
+        try:
+            last_rowid = 0
+            while True:
+                rows = conn.execute('SELECT rowid, * FROM interactions WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                                    (last_rowid, batch_size)).fetchall()
+                if len(rows) == 0:
+                    break
+                last_rowid = rows[-1]['rowid']
+                yield rows
+        finally:
+            conn.close()
+
+    def get_rows_for_gene(self, gene_symbol):
+        """
+        :returns: a ``list`` of the rows whose gene name (or, if it has none, gene claim name) is `gene_symbol`
+        """
+        return self.select_rows('gene_symbol', gene_symbol)
+
+    def get_rows_for_drug(self, drug_chembl_id):
+        """
+        :returns: a ``list`` of the rows for the drug with ChEMBL ID `drug_chembl_id` (e.g., ``'CHEMBL25'``)
+        """
+        return self.select_rows('drug_chembl_id', drug_chembl_id)
+
+    def get_rows_for_drug_name(self, drug_name):
+        return self.select_rows('drug_name', drug_name)
+
+    def select_rows(self, column, value):
+        conn = self.connect()
+        try:
+            return conn.execute('SELECT * FROM interactions WHERE ' + column + '=? ORDER BY rowid',
+                                (value,)).fetchall()
+        finally:
+            conn.close()
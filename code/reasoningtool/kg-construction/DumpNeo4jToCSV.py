@@ -1,5 +1,20 @@
 '''Dumps the knowledge graph from Neo4j to CSV or TSV format files
 
+The nodes are exported one label at a time and the relationships one type at a
+time, and the partitions are exported in parallel (`--workers`), each in its
+own session. Each partition is read with a single query whose result is
+consumed from the cursor as the server streams it, and written to the file in
+chunks of `--page-size` rows, so that neither the partition nor a repeated
+scan of it is ever needed. A file name that ends with ``.gz`` is written
+gzip-compressed.
+
+After the export, the number of rows written for each label and relationship
+type is checked against the number in the graph, and the script exits with
+status 1 if any differ (e.g., because the graph was changed during the export).
+
+Usage:
+
+    python3 DumpNeo4jToCSV.py -u neo4j -p PASSWORD --nodes-file nodes.csv.gz --rels-file rels.csv.gz
 '''
 
 __author__ = 'Stephen Ramsey'
@@ -11,51 +26,126 @@ __maintainer__ = ''
 __email__ = ''
 __status__ = 'Prototype'
 
+import sys
+import csv
+import gzip
 import argparse
+import threading
+import concurrent.futures
 import neo4j.v1
-from BioNetExpander import BioNetExpander
-from Orangeboard import Orangeboard
 
+DEFAULT_PAGE_SIZE = 10000
+DEFAULT_NUM_WORKERS = 4
+
+NODES_QUERY = 'MATCH (n:`%s`) RETURN n.UUID AS uuid, n.name AS name'
+RELS_QUERY = 'MATCH (n)-[r:`%s`]->(m) ' \
+             'RETURN n.UUID AS source_uuid, m.UUID AS target_uuid, r.provided_by AS provided_by'
+NODES_COUNT_QUERY = 'MATCH (n:`%s`) RETURN count(n) AS count'
+RELS_COUNT_QUERY = 'MATCH ()-[r:`%s`]->() RETURN count(r) AS count'
+
+
+def run_cypher(driver, query, parameters=None):
+    with driver.session() as session:
+        return list(session.run(query, parameters))
+
+
+def get_node_labels(driver):
+    return sorted(record['label'] for record in run_cypher(driver, 'CALL db.labels() YIELD label RETURN label')
+                  if record['label'] != 'Base')
+
+
+def get_rel_types(driver):
+    return sorted(record['relationshipType'] for record in
+                  run_cypher(driver, 'CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType'))
 
-def run_cypher(query, parameters=None):
-    return driver.session().run(query, parameters)
 
+def open_export_file(filename):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wt', newline='')
+    return open(filename, 'w', newline='')
 
-def make_nodes_file(filename='nodes.csv', separator=','):
-    query_result = run_cypher('match (n) return n')
-    base_set = set('Base')
-    nodes_file = open(filename, 'w')
-    for record in query_result:
-        for result_tuple in record.items():
-            node = result_tuple[1]
-            node_labels = node.labels
-            node_labels.remove('Base')
-            node_properties = node.properties
-            node_uuid = node_properties['UUID']
-            nodetype = next(iter(node_labels))
-            nodename = node_properties['name']
-            nodes_file.write('node' + separator + node_uuid + separator + nodetype + separator + nodename + '\n')
-    nodes_file.close()
 
+def export_partition(driver, query, make_row, writer, lock, page_size=DEFAULT_PAGE_SIZE):
+    """writes the rows that `query` returns, consuming its result from the cursor and writing `page_size` rows at a
+    time
 
-def make_rels_file(filename='rels.csv', separator=','):
+    :param query: a query that returns all of the records of the partition
+    :param make_row: a function of a record that returns the row to write
+    :param writer: the ``csv.writer`` that is shared by all partitions
+    :param lock: the lock that serializes the writes to `writer`
+    :returns: the number of rows written
+    """
+    num_rows = 0
+    rows = []
+    with driver.session() as session:
+        for record in session.run(query):
+            rows.append(make_row(record))
+            if len(rows) >= page_size:
+                with lock:
+                    writer.writerows(rows)
+                num_rows += len(rows)
+                rows = []
+    if len(rows) > 0:
+        with lock:
+            writer.writerows(rows)
+        num_rows += len(rows)
+    return num_rows
+
+
+def export_partitions(driver, filename, separator, partitions, page_size, num_workers):
+    """
+    :param partitions: a ``dict`` of partition name (a label or relationship type) to a ``(query, make_row)`` tuple
+    :returns: a ``dict`` of partition name to the number of rows written
+    """
+    lock = threading.Lock()
+    with open_export_file(filename) as export_file:
+        writer = csv.writer(export_file, delimiter=separator, lineterminator='\n')
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = {name: executor.submit(export_partition, driver, query, make_row, writer, lock, page_size)
+                       for name, (query, make_row) in partitions.items()}
+            num_rows = {name: future.result() for name, future in futures.items()}
+    print(filename + ': ' + str(sum(num_rows.values())) + ' rows')
+    return num_rows
+
+
+def make_nodes_file(driver, filename='nodes.csv', separator=',', page_size=DEFAULT_PAGE_SIZE,
+                    num_workers=DEFAULT_NUM_WORKERS):
+    """
+    :returns: a ``dict`` of node label to the number of nodes written
+    """
+    def make_partition(label):
+        return NODES_QUERY % label, lambda record: ['node', record['uuid'], label, record['name']]
+    partitions = {label: make_partition(label) for label in get_node_labels(driver)}
+    return export_partitions(driver, filename, separator, partitions, page_size, num_workers)
+
+
+def make_rels_file(driver, filename='rels.csv', separator=',', page_size=DEFAULT_PAGE_SIZE,
+                   num_workers=DEFAULT_NUM_WORKERS):
+    """
+    :returns: a ``dict`` of relationship type to the number of relationships written
+    """
     assert ':' not in separator
-    query_result = run_cypher('match (n)-[r]-(m) return n.UUID, m.UUID, r LIMIT 10000')
-    rels_set = set()
-    rels_file = open(filename, 'w')
-    for record in query_result:
-        source_node_uuid = record[0]
-        target_node_uuid = record[1]
-        rel = record[2]
-        rel_properties = rel.properties
-        reltype = rel.type
-        reltype_dir = BioNetExpander.MASTER_REL_IS_DIRECTED[reltype]
-        sourcedb = rel_properties['provided_by']
-        rel_key = Orangeboard.make_rel_dict_key(source_node_uuid, target_node_uuid, reltype_dir)
-        if rel_key not in rels_set:
-            rels_set.add(rel_key)
-            rels_file.write('rel' + separator + source_node_uuid + separator + target_node_uuid + separator + sourcedb + ':' + reltype + '\n')
-    rels_file.close()
+
+    def make_partition(rel_type):
+        return RELS_QUERY % rel_type, lambda record: ['rel', record['source_uuid'], record['target_uuid'],
+                                                           str(record['provided_by']) + ':' + rel_type]
+    partitions = {rel_type: make_partition(rel_type) for rel_type in get_rel_types(driver)}
+    return export_partitions(driver, filename, separator, partitions, page_size, num_workers)
+
+
+def verify_counts(driver, count_query, num_rows):
+    """compares the number of rows written for each partition with the number in the graph
+
+    :returns: ``True`` if all of the numbers match
+    """
+    verified = True
+    for name, num_written in sorted(num_rows.items()):
+        num_in_graph = run_cypher(driver, count_query % name)[0]['count']
+        if num_in_graph != num_written:
+            print('DumpNeo4jToCSV: ' + name + ': exported ' + str(num_written) + ' rows, but the graph has ' +
+                  str(num_in_graph), file=sys.stderr)
+            verified = False
+    return verified
 
 
 if __name__ == '__main__':
@@ -68,6 +158,19 @@ if __name__ == '__main__':
                         default='')
     parser.add_argument("-p", "--password", help="The password used to connect to the neo4j instance. (default: )",
                         default='')
+    parser.add_argument("--nodes-file", help="The nodes file; gzip-compressed if it ends with .gz (default: nodes.csv)",
+                        default='nodes.csv')
+    parser.add_argument("--rels-file", help="The relationships file; gzip-compressed if it ends with .gz "
+                                            "(default: rels.csv)",
+                        default='rels.csv')
+    parser.add_argument("--tsv", help="Write tab-separated files instead of comma-separated files",
+                        action="store_true", default=False)
+    parser.add_argument("--page-size", help="The number of rows written to the file at a time (default: %d)" %
+                                            DEFAULT_PAGE_SIZE,
+                        type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("-w", "--workers", help="The number of labels and relationship types exported in parallel "
+                                                "(default: %d)" % DEFAULT_NUM_WORKERS,
+                        type=int, default=DEFAULT_NUM_WORKERS)
     args = parser.parse_args()
 
     if args.username == '' or args.password == '':
@@ -75,6 +178,12 @@ if __name__ == '__main__':
         print('DumpNeo4jToCSV.py: error: invalid username or password')
         exit(0)
 
+    separator = '\t' if args.tsv else ','
     driver = neo4j.v1.GraphDatabase.driver(args.address, auth=(args.username, args.password))
-    make_nodes_file()
-    make_rels_file()
+    num_nodes = make_nodes_file(driver, args.nodes_file, separator, args.page_size, args.workers)
+    num_rels = make_rels_file(driver, args.rels_file, separator, args.page_size, args.workers)
+    verified = verify_counts(driver, NODES_COUNT_QUERY, num_nodes)
+    verified = verify_counts(driver, RELS_COUNT_QUERY, num_rels) and verified
+    driver.close()
+    if not verified:
+        exit(1)
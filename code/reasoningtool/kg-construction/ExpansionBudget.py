@@ -0,0 +1,85 @@
+""" This module defines the class ExpansionBudget, the limits on a
+`BioNetExpander.expand_with_budget` run.
+
+A budget caps the total number of nodes and relationships in the Orangeboard,
+the number of upstream API calls that go over the network, and the wall-clock
+time of the expansion. The budget is checked before each node is expanded, so
+the expansion of one node may overshoot a node or relationship cap by at most
+the number of nodes or relationships that one expansion adds.
+
+With several workers, the expansion prefetches a batch of nodes' upstream data
+before it expands them one by one. The budget is checked before each batch
+too, and a batch has no more nodes than there are API calls left. The API call
+cap may still be overshot by the calls of one batch beyond one call per node,
+and the time cap by the time it takes to prefetch one batch.
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import time
+
+from UpstreamStats import UpstreamStats
+
+
+class ExpansionBudget:
+    def __init__(self, max_nodes=None, max_rels=None, max_api_calls=None, max_seconds=None):
+        """
+        :param max_nodes: the most nodes in the Orangeboard (``None`` for no limit)
+        :param max_rels: the most relationships in the Orangeboard (``None`` for no limit)
+        :param max_api_calls: the most upstream API calls over the network during the expansion (``None`` for no limit)
+        :param max_seconds: the most seconds of wall-clock time for the expansion (``None`` for no limit)
+        """
+        self.max_nodes = max_nodes
+        self.max_rels = max_rels
+        self.max_api_calls = max_api_calls
+        self.max_seconds = max_seconds
+        self.start_time = None
+        self.start_api_calls = None
+
+    def scaled(self, factor):
+        """returns a new budget with the node, relationship and API call caps of this one multiplied by `factor`
+        (e.g., ``1 / n`` to share the budget among `n` shards); the time cap is unchanged"""
+        def scale(limit):
+            return int(limit * factor) if limit is not None else None
+        return ExpansionBudget(max_nodes=scale(self.max_nodes), max_rels=scale(self.max_rels),
+                               max_api_calls=scale(self.max_api_calls), max_seconds=self.max_seconds)
+
+    def start(self):
+        """starts the clock and the API call count"""
+        self.start_time = time.monotonic()
+        self.start_api_calls = UpstreamStats.get_instance().count_network_calls()
+
+    def get_api_calls(self):
+        return UpstreamStats.get_instance().count_network_calls() - self.start_api_calls
+
+    def get_remaining_api_calls(self):
+        """
+        :returns: the number of API calls left in the budget (``None`` for no limit)
+        """
+        if self.max_api_calls is None:
+            return None
+        return max(0, self.max_api_calls - self.get_api_calls())
+
+    def get_seconds(self):
+        return time.monotonic() - self.start_time
+
+    def get_exhausted_reason(self, orangeboard):
+        """
+        :returns: a message naming the limit that has been reached, or ``None`` if the budget is not exhausted
+        """
+        if self.max_nodes is not None and orangeboard.count_nodes() >= self.max_nodes:
+            return 'node budget of ' + str(self.max_nodes) + ' reached'
+        if self.max_rels is not None and orangeboard.count_rels() >= self.max_rels:
+            return 'relationship budget of ' + str(self.max_rels) + ' reached'
+        if self.max_api_calls is not None and self.get_api_calls() >= self.max_api_calls:
+            return 'API call budget of ' + str(self.max_api_calls) + ' reached'
+        if self.max_seconds is not None and self.get_seconds() >= self.max_seconds:
+            return 'time budget of ' + str(self.max_seconds) + ' s reached'
+        return None
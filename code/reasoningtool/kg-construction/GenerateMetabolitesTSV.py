@@ -21,6 +21,7 @@ __status__ = 'Prototype'
 
 import requests
 import sys
+from HTTPClient import HTTPClient
 
 
 class GenerateMetabolitesTSV:
@@ -33,7 +34,7 @@ class GenerateMetabolitesTSV:
 
         #   network request
         try:
-            res = requests.get(GenerateMetabolitesTSV.URL)
+            res = HTTPClient.get_instance().get(GenerateMetabolitesTSV.URL)
         except requests.exceptions.Timeout:
             print(GenerateMetabolitesTSV.URL, file=sys.stderr)
             print("Timeout for URL: " + GenerateMetabolitesTSV.URL, file=sys.stderr)
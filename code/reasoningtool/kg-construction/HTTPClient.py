@@ -0,0 +1,270 @@
+""" This module defines the class HTTPClient, the HTTP layer shared by the Query* classes.
+
+HTTPClient keeps a pool of keep-alive connections for each upstream host, so
+that repeated queries to UniProt, Reactome, BioLink, etc. reuse connections
+instead of paying for a TCP and TLS handshake each time. Successful GET and
+HEAD responses are cached in a `ResponseCache` (a POST response only if the
+caller opts in with ``cache=True``), identical GET requests from concurrent threads
+are coalesced into one, and every request is recorded in the `UpstreamStats`.
+It applies one timeout
+policy, retries connection errors, timeouts and transient HTTP status codes
+(429 and 5xx) with exponential backoff and jitter, and limits the number of
+concurrent requests to each host. Within `throttle_requests`, the requests that
+go out over the network also wait for the per-host rates of a `HostRateLimiter`.
+Within `cached_requests_only`, a request whose response would not be cached
+raises `UncachedRequestError` instead (e.g., while warming the caches).
+
+Usage:
+
+    res = HTTPClient.get_instance().get(url, timeout=QueryFoo.TIMEOUT_SEC)
+
+Responses with an error status code are returned to the caller, as with
+`requests.get`; a connection error or timeout that persists after all retries
+is raised, so the callers' existing `except requests.exceptions...` clauses
+still apply.
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import os
+import sys
+import time
+import random
+import threading
+import contextlib
+import urllib.parse
+import requests
+import requests.adapters
+
+from ResponseCache import ResponseCache
+from UpstreamStats import UpstreamStats
+from RequestCoalescer import RequestCoalescer
+
+
+class UncachedRequestError(Exception):
+    """raised by `HTTPClient.request`, within `HTTPClient.cached_requests_only`, instead of sending a request whose
+    response would not be cached"""
+    pass
+
+
+class ThrottlingHTTPAdapter(requests.adapters.HTTPAdapter):
+    """an `HTTPAdapter` that waits for the rate limiters of an `HTTPClient` before it sends a request"""
+
+    def __init__(self, client, **kwargs):
+        self.client = client
+        super().__init__(**kwargs)
+
+    def send(self, request, *args, **kwargs):
+        self.client.throttle(request.url)
+        return super().send(request, *args, **kwargs)
+
+
+class HTTPClient:
+    DEFAULT_CONNECT_TIMEOUT_SEC = 10
+    DEFAULT_READ_TIMEOUT_SEC = 120
+    DEFAULT_MAX_RETRIES = 3
+    DEFAULT_BACKOFF_SEC = 1.0
+    MAX_BACKOFF_SEC = 30.0
+    DEFAULT_MAX_CONNECTIONS_PER_HOST = 8
+    RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+    # identical concurrent requests with these (idempotent) methods share one request to the upstream
+    COALESCED_METHODS = frozenset(['GET', 'HEAD'])
+    # the methods whose successful responses are cached unless the caller passes `cache=False`
+    CACHED_METHODS = frozenset(['GET', 'HEAD'])
+
+    instance = None
+    instance_lock = threading.Lock()
+
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT_SEC, read_timeout=DEFAULT_READ_TIMEOUT_SEC,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF_SEC,
+                 max_connections_per_host=DEFAULT_MAX_CONNECTIONS_PER_HOST, response_cache=None):
+        """
+        :param connect_timeout: seconds to wait for a connection to be established
+        :param read_timeout: seconds to wait for the server to respond, for calls that pass no `timeout`
+        :param max_retries: number of times a failed request is retried
+        :param backoff: seconds before the first retry; the wait doubles for each further retry
+        :param max_connections_per_host: the most requests in flight to any one host (also the pool size)
+        :param response_cache: a `ResponseCache` for the successful responses, or ``None`` for no caching
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_connections_per_host = max_connections_per_host
+        self.response_cache = response_cache
+        # `requests.Session` is not guaranteed to be thread-safe, so each thread has its own session per host
+        self.local = threading.local()
+        self.host_semaphores = dict()
+        self.lock = threading.Lock()
+        self.coalescer = RequestCoalescer()
+        # replaced (never modified in place) by `throttle_requests`, so that `throttle` can read it without the lock
+        self.rate_limiters = []
+
+    @staticmethod
+    def get_instance():
+        """returns the process-wide `HTTPClient`, creating it with the default settings on first use; its responses
+        are cached in the `ResponseCache` file named by the environment variable `RTX_RESPONSE_CACHE_DB` (default:
+        `ResponseCache.DEFAULT_PATH`)"""
+        with HTTPClient.instance_lock:
+            if HTTPClient.instance is None:
+                cache_path = os.environ.get('RTX_RESPONSE_CACHE_DB', ResponseCache.DEFAULT_PATH)
+                HTTPClient.instance = HTTPClient(response_cache=ResponseCache(cache_path))
+            return HTTPClient.instance
+
+    @staticmethod
+    def set_instance(client):
+        """replaces the process-wide `HTTPClient` (e.g., to change its timeouts or retry policy)"""
+        with HTTPClient.instance_lock:
+            HTTPClient.instance = client
+
+    def get_session(self, host):
+        sessions = getattr(self.local, 'sessions', None)
+        # a forked child process must not share its parent's pooled connections
+        if sessions is None or self.local.pid != os.getpid():
+            sessions = dict()
+            self.local.sessions = sessions
+            self.local.pid = os.getpid()
+        session = sessions.get(host, None)
+        if session is None:
+            session = requests.Session()
+            adapter = ThrottlingHTTPAdapter(self, pool_connections=1, pool_maxsize=self.max_connections_per_host)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            sessions[host] = session
+        return session
+
+    @contextlib.contextmanager
+    def throttle_requests(self, rate_limiter):
+        """applies the per-host limits of `rate_limiter` (e.g., a `HostRateLimiter`) to the requests that this client
+        sends over the network within this context, from any thread; nested and overlapping contexts all apply"""
+        with self.lock:
+            self.rate_limiters = self.rate_limiters + [rate_limiter]
+        try:
+            yield rate_limiter
+        finally:
+            with self.lock:
+                rate_limiters = list(self.rate_limiters)
+                rate_limiters.remove(rate_limiter)
+                self.rate_limiters = rate_limiters
+
+    @contextlib.contextmanager
+    def cached_requests_only(self):
+        """makes `request` raise `UncachedRequestError` for the requests from this thread within this context whose
+        responses would not be cached, so that a prefetch never sends a request that the real work must send again"""
+        previous_cached_only = getattr(self.local, 'cached_only', False)
+        self.local.cached_only = True
+        try:
+            yield
+        finally:
+            self.local.cached_only = previous_cached_only
+
+    def throttle(self, url):
+        """blocks until each of the rate limiters of `throttle_requests` lets a request to `url` go out"""
+        for rate_limiter in self.rate_limiters:
+            rate_limiter.acquire(url)
+
+    def get_host_semaphore(self, host):
+        with self.lock:
+            semaphore = self.host_semaphores.get(host, None)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_connections_per_host)
+                self.host_semaphores[host] = semaphore
+            return semaphore
+
+    def make_timeout(self, timeout):
+        if timeout is None:
+            timeout = self.read_timeout
+        if isinstance(timeout, tuple):
+            return timeout
+        return (min(self.connect_timeout, timeout), timeout)
+
+    def get_wait_time(self, num_tries, res=None):
+        if res is not None:
+            retry_after = res.headers.get('Retry-After', None)
+            if retry_after is not None and retry_after.isdigit():
+                return min(HTTPClient.MAX_BACKOFF_SEC, float(retry_after))
+        wait_time = min(HTTPClient.MAX_BACKOFF_SEC, self.backoff * (2.0 ** (num_tries - 1)))
+        return wait_time * (0.5 + random.random() / 2.0)
+
+    def request(self, method, url, timeout=None, cache=None, **kwargs):
+        """returns the cached response to an HTTP request, or else sends the request over a pooled connection,
+        retrying transient failures, and caches the response if its status code is 200; a GET request that is
+        identical to one already in flight from another thread waits for, and shares, that request's response
+
+        :param method: ``'GET'`` or ``'POST'``
+        :param url: the URL
+        :param timeout: the read timeout in seconds, or a ``(connect, read)`` tuple (default: `read_timeout`)
+        :param cache: whether the response is cached (default: only for the `CACHED_METHODS`); pass ``True`` only for
+        a POST to a read-only query endpoint, whose response depends on nothing but the request
+        :param kwargs: passed on to `requests.Session.request` (e.g., ``params``, ``data``, ``headers``)
+        :returns: a `requests.Response`
+        :raises UncachedRequestError: within `cached_requests_only`, if the response would not be cached
+        """
+        request_key = ResponseCache.make_key(method, url, kwargs.get('params', None), kwargs.get('data', None),
+                                             kwargs.get('json', None), kwargs.get('headers', None))
+        if cache is None:
+            cache = method.upper() in HTTPClient.CACHED_METHODS
+        if getattr(self.local, 'cached_only', False) and not (cache and self.response_cache is not None):
+            raise UncachedRequestError('not cached: ' + method + ' ' + url)
+        if method.upper() not in HTTPClient.COALESCED_METHODS:
+            return self.send(method, url, request_key, timeout, cache, kwargs)
+        start_time = time.perf_counter()
+        (shared, res) = self.coalescer.call(request_key, self.send, method, url, request_key, timeout, cache, kwargs)
+        if shared:
+            UpstreamStats.get_instance().record(UpstreamStats.get_endpoint(url), time.perf_counter() - start_time,
+                                                coalesced=True, status_code=res.status_code)
+        return res
+
+    def send(self, method, url, request_key, timeout, cache, kwargs):
+        """the part of `request` that consults the response cache and the network"""
+        host = urllib.parse.urlsplit(url).hostname
+        stats = UpstreamStats.get_instance()
+        endpoint = UpstreamStats.get_endpoint(url)
+        start_time = time.perf_counter()
+        if cache and self.response_cache is not None:
+            res = self.response_cache.get(request_key, host)
+            if res is not None:
+                stats.record(endpoint, time.perf_counter() - start_time, cache_hit=True, status_code=res.status_code)
+                return res
+        timeout = self.make_timeout(timeout)
+        semaphore = self.get_host_semaphore(host)
+        num_tries = 0
+        while True:
+            num_tries += 1
+            try:
+                with semaphore:
+                    res = self.get_session(host).request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if num_tries > self.max_retries:
+                    stats.record(endpoint, time.perf_counter() - start_time, retries=num_tries - 1, error=True)
+                    raise
+                wait_time = self.get_wait_time(num_tries)
+                print('HTTPClient: ' + type(e).__name__ + ' for URL: ' + url + '; retry ' + str(num_tries) +
+                      ' in ' + format(wait_time, '.1f') + ' s', file=sys.stderr)
+            else:
+                if res.status_code not in HTTPClient.RETRY_STATUS_CODES or num_tries > self.max_retries:
+                    stats.record(endpoint, time.perf_counter() - start_time, retries=num_tries - 1,
+                                 error=res.status_code in HTTPClient.RETRY_STATUS_CODES, status_code=res.status_code,
+                                 num_bytes=len(res.content))
+                    if cache and self.response_cache is not None and res.status_code == 200:
+                        self.response_cache.set(request_key, host, res)
+                    return res
+                wait_time = self.get_wait_time(num_tries, res)
+                print('HTTPClient: status code ' + str(res.status_code) + ' for URL: ' + url + '; retry ' +
+                      str(num_tries) + ' in ' + format(wait_time, '.1f') + ' s', file=sys.stderr)
+            time.sleep(wait_time)
+
+    def get(self, url, params=None, **kwargs):
+        """like `requests.get`, through `request`"""
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        """like `requests.post`, through `request`"""
+        return self.request('POST', url, data=data, json=json, **kwargs)
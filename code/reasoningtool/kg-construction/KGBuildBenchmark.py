@@ -0,0 +1,313 @@
+""" This module defines the class KGBuildBenchmark, an end-to-end benchmark of
+building a knowledge graph with `BioNetExpander` and `Orangeboard`.
+
+The benchmark seeds an Orangeboard from a fixed set of seed nodes, expands it
+the way `BuildMasterKG` does, and reports nodes/s, rels/s, peak RSS, upstream
+API calls per node, and the time spent in each `expand_*` method. For
+repeatable numbers, replay recorded upstream responses (see `UpstreamStandIn`)
+instead of querying the live services. Each result is appended to a JSON-lines
+results file and compared with an earlier result.
+
+Usage:
+
+    python3 KGBuildBenchmark.py --fixtures fixtures.jsonl.gz --label my-change --baseline master
+
+(record the fixtures once with `BuildMasterKG.py --record-fixtures` or
+`KGBuildBenchmark.py --record-fixtures`). Run each benchmark in a fresh process,
+since the peak RSS is that of the whole process.
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import sys
+import json
+import time
+import resource
+import argparse
+import datetime
+import functools
+import threading
+import contextlib
+import subprocess
+import collections
+import urllib.parse
+import requests.adapters
+
+from Orangeboard import Orangeboard
+from BioNetExpander import BioNetExpander
+from RateLimiter import HostRateLimiter
+from HTTPClient import HTTPClient
+from ResponseCache import ResponseCache
+from UpstreamStandIn import FixtureArchive, StandInServer, record_requests, route_requests
+
+
+class KGBuildBenchmark:
+    # one or two seed nodes of each type that the master KG is seeded with, so that every `expand_*` method runs
+    DEFAULT_SEED_NODES = (('disease', 'DOID:906', 'peroxisomal disease'),
+                          ('disease', 'OMIM:105150', 'CEREBRAL AMYLOID ANGIOPATHY, CST3-RELATED'),
+                          ('disease', 'MONDO:0005359', 'drug-induced liver injury'),
+                          ('protein', 'Q75MH2', 'IL6'),
+                          ('protein', 'Q59F02', 'PMM2'),
+                          ('chemical_substance', 'CHEMBL521', 'Ibuprofen'),
+                          ('microRNA', 'NCBIGene:406991', 'MIR21'),
+                          ('anatomical_entity', 'UBERON:0000171', 'respiration organ'),
+                          ('biological_process', 'GO:1904685', 'positive regulation of metalloendopeptidase activity'),
+                          ('metabolite', 'KEGG:C00190', 'UDP-D-xylose'))
+
+    DEFAULT_NUM_EXPANSIONS = 3
+    DEFAULT_RESULTS_FILE = 'KGBuildBenchmark.jsonl'
+
+    # metrics compared between runs, and whether a larger value is better
+    COMPARED_METRICS = (('elapsed_sec', False),
+                        ('num_nodes', None),
+                        ('num_rels', None),
+                        ('nodes_per_sec', True),
+                        ('rels_per_sec', True),
+                        ('peak_rss_mb', False),
+                        ('api_calls', False),
+                        ('api_calls_per_node', False))
+
+    def __init__(self, seed_nodes=DEFAULT_SEED_NODES, num_expansions=DEFAULT_NUM_EXPANSIONS, num_workers=1,
+                 host_rate_limiter=None):
+        """
+        :param seed_nodes: a sequence of ``(node_type, name, desc)`` tuples, as for `BioNetExpander.add_node_smart`
+        :param num_expansions: number of times `expand_all_nodes` is run
+        :param num_workers: number of prefetch threads for `BioNetExpander`
+        :param host_rate_limiter: passed on to `BioNetExpander`
+        """
+        self.seed_nodes = seed_nodes
+        self.num_expansions = num_expansions
+        self.num_workers = num_workers
+        self.host_rate_limiter = host_rate_limiter
+
+    @staticmethod
+    def read_seed_nodes(file_name):
+        """reads seed nodes from a TSV file in the format of `data/seed_nodes_filtered.tsv` (columns: type,
+        rtx_name, term, purpose; with a header row)"""
+        seed_nodes = []
+        with open(file_name, 'r') as seed_file:
+            next(seed_file)
+            for line in seed_file:
+                fields = line.rstrip('\n').split('\t')
+                seed_nodes.append((fields[0], fields[1], fields[2]))
+        return seed_nodes
+
+    @staticmethod
+    @contextlib.contextmanager
+    def count_requests(counts):
+        """counts the HTTP requests that go out over the network via the `requests` package within this context,
+        by host, in the ``collections.Counter`` `counts`"""
+        original_send = requests.adapters.HTTPAdapter.send
+        lock = threading.Lock()
+
+        def send(adapter, request, *args, **kwargs):
+            with lock:
+                counts[urllib.parse.urlsplit(request.url).hostname] += 1
+            return original_send(adapter, request, *args, **kwargs)
+
+        requests.adapters.HTTPAdapter.send = send
+        try:
+            yield counts
+        finally:
+            requests.adapters.HTTPAdapter.send = original_send
+
+    @staticmethod
+    @contextlib.contextmanager
+    def time_expand_methods(expander, times, calls):
+        """accumulates the seconds spent in, and the number of calls to, each `expand_*` method of `expander` within
+        this context (inclusive of nested `expand_*` calls; not counting prefetching into scratch expanders)"""
+        method_names = [name for name in dir(BioNetExpander)
+                        if name.startswith('expand_') and name not in ('expand_node', 'expand_all_nodes')]
+        original_methods = {name: getattr(BioNetExpander, name) for name in method_names}
+
+        def make_timed_method(name, method):
+            @functools.wraps(method)
+            def timed_method(self, *args, **kwargs):
+                if self is not expander:
+                    return method(self, *args, **kwargs)
+                start_time = time.perf_counter()
+                try:
+                    return method(self, *args, **kwargs)
+                finally:
+                    times[name] += time.perf_counter() - start_time
+                    calls[name] += 1
+            return timed_method
+
+        for name, method in original_methods.items():
+            setattr(BioNetExpander, name, make_timed_method(name, method))
+        try:
+            yield times
+        finally:
+            for name, method in original_methods.items():
+                setattr(BioNetExpander, name, method)
+
+    @staticmethod
+    def get_peak_rss_mb():
+        # `ru_maxrss` is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+    @staticmethod
+    def get_git_commit():
+        try:
+            return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                           stderr=subprocess.DEVNULL).decode('utf-8').strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def run(self):
+        """builds the KG and returns the benchmark result as a ``dict``"""
+        ob = Orangeboard(debug=False)
+        bne = BioNetExpander(ob, num_workers=self.num_workers, host_rate_limiter=self.host_rate_limiter)
+        api_calls_by_host = collections.Counter()
+        expand_method_sec = collections.Counter()
+        expand_method_calls = collections.Counter()
+        start_time = time.perf_counter()
+        with KGBuildBenchmark.count_requests(api_calls_by_host), \
+                KGBuildBenchmark.time_expand_methods(bne, expand_method_sec, expand_method_calls):
+            first_node = True
+            for node_type, name, desc in self.seed_nodes:
+                bne.add_node_smart(node_type, name, seed_node_bool=first_node, desc=desc)
+                first_node = False
+            for _ in range(self.num_expansions):
+                bne.expand_all_nodes()
+        bne.shutdown_prefetch()
+        elapsed_sec = time.perf_counter() - start_time
+        num_nodes = ob.count_nodes()
+        num_rels = ob.count_rels()
+        api_calls = sum(api_calls_by_host.values())
+        return {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'git_commit': KGBuildBenchmark.get_git_commit(),
+                'num_seed_nodes': len(self.seed_nodes),
+                'num_expansions': self.num_expansions,
+                'num_workers': self.num_workers,
+                'elapsed_sec': elapsed_sec,
+                'num_nodes': num_nodes,
+                'num_rels': num_rels,
+                'nodes_per_sec': num_nodes / elapsed_sec,
+                'rels_per_sec': num_rels / elapsed_sec,
+                'peak_rss_mb': KGBuildBenchmark.get_peak_rss_mb(),
+                'api_calls': api_calls,
+                'api_calls_per_node': api_calls / max(1, num_nodes),
+                'api_calls_by_host': dict(api_calls_by_host),
+                'expand_method_sec': dict(expand_method_sec),
+                'expand_method_calls': dict(expand_method_calls)}
+
+    @staticmethod
+    def save_result(result, file_name):
+        """appends `result` to the JSON-lines results file"""
+        with open(file_name, 'a') as results_file:
+            results_file.write(json.dumps(result, sort_keys=True) + '\n')
+
+    @staticmethod
+    def load_results(file_name):
+        try:
+            with open(file_name, 'r') as results_file:
+                return [json.loads(line) for line in results_file if line.strip() != '']
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def find_baseline(results, label=None):
+        """returns the most recent result in `results` with the given label (any label if ``None``), or ``None``"""
+        for result in reversed(results):
+            if label is None or result.get('label', None) == label:
+                return result
+        return None
+
+    @staticmethod
+    def compare(result, baseline):
+        """returns the lines of a report comparing `result` with `baseline`"""
+        def format_change(name, old_value, new_value, larger_is_better):
+            line = name + ': ' + format(old_value, '.3f') + ' -> ' + format(new_value, '.3f')
+            if old_value != 0:
+                change = 100.0 * (new_value - old_value) / old_value
+                line += ' (' + format(change, '+.1f') + '%'
+                if larger_is_better is not None and change != 0:
+                    line += ', ' + ('better' if (change > 0) == larger_is_better else 'worse')
+                line += ')'
+            return line
+
+        lines = ['compared with ' + str(baseline.get('label', None)) + ' (' + str(baseline['git_commit']) + ', ' +
+                 baseline['timestamp'] + '):']
+        for name, larger_is_better in KGBuildBenchmark.COMPARED_METRICS:
+            lines.append('  ' + format_change(name, baseline[name], result[name], larger_is_better))
+        for name in sorted(set(baseline['expand_method_sec']) | set(result['expand_method_sec'])):
+            lines.append('  ' + format_change(name + '_sec', baseline['expand_method_sec'].get(name, 0.0),
+                                              result['expand_method_sec'].get(name, 0.0), False))
+        return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks building a KG with BioNetExpander and Orangeboard')
+    parser.add_argument('--seeds', help='TSV file of seed nodes, in the format of data/seed_nodes_filtered.tsv '
+                                        '(default: a fixed set of ' + str(len(KGBuildBenchmark.DEFAULT_SEED_NODES)) +
+                                        ' seed nodes)', default=None)
+    parser.add_argument('--expansions', type=int, help='number of expansion rounds (default: ' +
+                                                       str(KGBuildBenchmark.DEFAULT_NUM_EXPANSIONS) + ')',
+                        default=KGBuildBenchmark.DEFAULT_NUM_EXPANSIONS)
+    parser.add_argument('-w', '--workers', type=int, help='number of prefetch threads (default: 1)', default=1)
+    parser.add_argument('--fixtures', help='replay the upstream responses from this fixture archive (default: query '
+                                           'the live services)', default=None)
+    parser.add_argument('--replay-latency', dest='replay_latency', type=float,
+                        help='seconds of latency added to each replayed response (default: 0)', default=0.0)
+    parser.add_argument('--record-fixtures', dest='record_fixtures',
+                        help='record the upstream responses of this run into a fixture archive', default=None)
+    parser.add_argument('--response-cache', dest='response_cache',
+                        help='sqlite file for cached upstream responses (default: no response cache)', default=None)
+    parser.add_argument('--results', help='JSON-lines file to which the result is appended (default: ' +
+                                          KGBuildBenchmark.DEFAULT_RESULTS_FILE + ')',
+                        default=KGBuildBenchmark.DEFAULT_RESULTS_FILE)
+    parser.add_argument('--label', help='label stored with the result, e.g., a branch name', default=None)
+    parser.add_argument('--baseline', help='compare with the most recent result that has this label (default: the '
+                                           'most recent result)', default=None)
+    args = parser.parse_args()
+
+    if args.fixtures is not None and args.record_fixtures is not None:
+        parser.error('--fixtures and --record-fixtures are mutually exclusive')
+
+    seed_nodes = KGBuildBenchmark.DEFAULT_SEED_NODES
+    if args.seeds is not None:
+        seed_nodes = KGBuildBenchmark.read_seed_nodes(args.seeds)
+
+    response_cache = None
+    if args.response_cache is not None:
+        response_cache = ResponseCache(args.response_cache)
+    HTTPClient.set_instance(HTTPClient(response_cache=response_cache))
+
+    host_rate_limiter = None
+    upstream_context = contextlib.ExitStack()
+    if args.fixtures is not None:
+        # the stand-in server need not be spared
+        host_rate_limiter = HostRateLimiter.unlimited()
+        stand_in_server = upstream_context.enter_context(StandInServer(FixtureArchive(args.fixtures),
+                                                                       latency=args.replay_latency))
+        upstream_context.enter_context(route_requests(stand_in_server.url))
+    elif args.record_fixtures is not None:
+        upstream_context.enter_context(record_requests(FixtureArchive(args.record_fixtures)))
+
+    benchmark = KGBuildBenchmark(seed_nodes, num_expansions=args.expansions, num_workers=args.workers,
+                                 host_rate_limiter=host_rate_limiter)
+    with upstream_context:
+        result = benchmark.run()
+    result['label'] = args.label
+    result['fixtures'] = args.fixtures
+
+    for name, _ in KGBuildBenchmark.COMPARED_METRICS:
+        print(name + ': ' + format(result[name], '.3f'))
+    for name, seconds in sorted(result['expand_method_sec'].items(), key=lambda item: -item[1]):
+        print(name + ': ' + format(seconds, '.3f') + ' s in ' + str(result['expand_method_calls'][name]) + ' calls')
+    if args.fixtures is not None and stand_in_server.stats['missing'] > 0:
+        print('warning: ' + str(stand_in_server.stats['missing']) + ' requests had no recorded response',
+              file=sys.stderr)
+
+    baseline = KGBuildBenchmark.find_baseline(KGBuildBenchmark.load_results(args.results), args.baseline)
+    if baseline is not None:
+        print('\n'.join(KGBuildBenchmark.compare(result, baseline)))
+    KGBuildBenchmark.save_result(result, args.results)
@@ -0,0 +1,156 @@
+''' This module defines the class Neo4jBulkWriter, which runs a parameterized
+`UNWIND $rows ...` cypher query over a large list of rows in bounded batches.
+The batches are written in parallel over several sessions, a failed batch is
+retried with exponential backoff, and the write throughput is reported.
+
+It also deletes nodes and relationships in bounded transactions (`delete_nodes`),
+so that clearing a large graph does not build one transaction that exhausts
+the Neo4j heap.
+'''
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import sys
+import time
+import random
+import timeit
+import concurrent.futures
+import neo4j
+import neo4j.exceptions
+
+
+class Neo4jBulkWriter:
+    DEFAULT_BATCH_SIZE = 10000
+    DEFAULT_NUM_SESSIONS = 4
+    DEFAULT_MAX_RETRIES = 5
+    # the errors after which a transaction may succeed if it is run again (e.g., deadlocks between concurrent
+    # relationship batches, lost connections); any other error (e.g., a syntax error) is raised at once
+    RETRIED_EXCEPTIONS = (neo4j.exceptions.TransientError, neo4j.exceptions.ServiceUnavailable, neo4j.SessionExpired)
+
+    def __init__(self, driver, batch_size=DEFAULT_BATCH_SIZE, num_sessions=DEFAULT_NUM_SESSIONS,
+                 max_retries=DEFAULT_MAX_RETRIES, debug=False):
+        """
+        :param driver: a connected ``neo4j.v1`` driver
+        :param batch_size: maximum number of rows sent in one transaction
+        :param num_sessions: number of batches written concurrently, each in its own session
+        :param max_retries: number of times a failed batch is retried before giving up
+        :param debug: print progress and throughput
+        """
+        self.driver = driver
+        self.batch_size = batch_size
+        self.num_sessions = num_sessions
+        self.max_retries = max_retries
+        self.debug = debug
+
+    @staticmethod
+    def make_batches(rows, batch_size):
+        return [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+
+    def run_transaction(self, query, parameters, description):
+        """runs `query` in its own write transaction, retrying on a transient failure
+
+        :param description: what the transaction writes, for the retry messages
+        :returns: a ``list`` of the records returned by the query
+        """
+        num_tries = 0
+        while True:
+            try:
+                with self.driver.session() as session:
+                    return session.write_transaction(lambda tx: list(tx.run(query, parameters)))
+            except Neo4jBulkWriter.RETRIED_EXCEPTIONS as e:
+                num_tries += 1
+                if num_tries > self.max_retries:
+                    raise
+                wait_time = min(60.0, 2.0 ** num_tries) * (0.5 + random.random() / 2.0)
+                print('Neo4jBulkWriter: ' + description + ' failed (' + repr(e) + '); retry ' + str(num_tries) +
+                      ' in ' + format(wait_time, '.1f') + ' s', file=sys.stderr)
+                time.sleep(wait_time)
+
+    def write_batch(self, query, batch):
+        """writes one batch in its own transaction, retrying on a transient failure
+
+        :returns: a ``list`` of the records returned by the query
+        """
+        return self.run_transaction(query, {'rows': batch}, 'batch of ' + str(len(batch)) + ' rows')
+
+    def delete_in_batches(self, query, parameters=None, unit='nodes'):
+        """runs a deletion query over and over, each time in its own transaction, until it deletes nothing
+
+        :param query: a cypher query that deletes at most ``$batch_size`` nodes or relationships and returns their
+        number as ``num_deleted`` (e.g., ``MATCH (n) WITH n LIMIT $batch_size DETACH DELETE n RETURN count(*) AS
+        num_deleted``)
+        :param parameters: a ``dict`` of the other parameters of the query
+        :param unit: what is deleted, for the progress report
+        :returns: the number deleted
+        """
+        parameters = dict(parameters) if parameters is not None else dict()
+        parameters['batch_size'] = self.batch_size
+        start_time = timeit.default_timer()
+        num_deleted = 0
+        while True:
+            records = self.run_transaction(query, parameters, 'deletion of ' + str(self.batch_size) + ' ' + unit)
+            num_deleted_batch = records[0]['num_deleted'] if len(records) > 0 else 0
+            if num_deleted_batch == 0:
+                break
+            num_deleted += num_deleted_batch
+            if self.debug:
+                elapsed_time = timeit.default_timer() - start_time
+                print('Deleted ' + str(num_deleted) + ' ' + unit + '; ' +
+                      format(num_deleted / max(elapsed_time, 1e-6), '.0f') + ' ' + unit + '/s')
+        elapsed_time = timeit.default_timer() - start_time
+        print('Deleted ' + str(num_deleted) + ' ' + unit + ' in ' + format(elapsed_time, '.2f') + ' s')
+        return num_deleted
+
+    def delete_nodes(self, node_pattern='(n)', parameters=None):
+        """deletes the nodes that match `node_pattern`, and their relationships, in transactions of at most
+        `batch_size` relationships or nodes; the relationships are deleted first, so that deleting a node with many
+        relationships does not make a large transaction
+
+        :param node_pattern: a cypher node pattern that binds ``n`` (e.g., ``'(n:Base {seed_node_uuid: $uuid})'``)
+        :param parameters: a ``dict`` of the parameters of `node_pattern`
+        :returns: a ``(num_rels, num_nodes)`` tuple of the numbers deleted
+        """
+        if node_pattern == '(n)':
+            rel_query = 'MATCH ()-[r]->() WITH r LIMIT $batch_size DELETE r RETURN count(*) AS num_deleted'
+        else:
+            rel_query = 'MATCH ' + node_pattern + '-[r]-() WITH DISTINCT r LIMIT $batch_size DELETE r ' + \
+                        'RETURN count(*) AS num_deleted'
+        num_rels = self.delete_in_batches(rel_query, parameters, 'rels')
+        num_nodes = self.delete_in_batches('MATCH ' + node_pattern + ' WITH n LIMIT $batch_size DETACH DELETE n ' +
+                                           'RETURN count(*) AS num_deleted', parameters, 'nodes')
+        return num_rels, num_nodes
+
+    def write(self, query, rows, unit='rows'):
+        """runs `query` (which must read its input from ``$rows``) over all of `rows`, in batches
+
+        :param query: a cypher query starting with ``UNWIND $rows AS ...``
+        :param rows: a ``list`` of parameter maps
+        :param unit: what the rows are, for the throughput report (e.g., ``'nodes'`` or ``'rels'``)
+        :returns: a ``list`` of the records returned by the query, over all batches
+        """
+        batches = Neo4jBulkWriter.make_batches(rows, self.batch_size)
+        if len(batches) == 0:
+            return []
+        start_time = timeit.default_timer()
+        records = []
+        num_written = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.num_sessions) as executor:
+            futures = {executor.submit(self.write_batch, query, batch): len(batch) for batch in batches}
+            for future in concurrent.futures.as_completed(futures):
+                records += future.result()
+                num_written += futures[future]
+                if self.debug:
+                    elapsed_time = timeit.default_timer() - start_time
+                    print('Wrote ' + str(num_written) + ' of ' + str(len(rows)) + ' ' + unit + '; ' +
+                          format(num_written / max(elapsed_time, 1e-6), '.0f') + ' ' + unit + '/s')
+        elapsed_time = timeit.default_timer() - start_time
+        print('Wrote ' + str(len(rows)) + ' ' + unit + ' in ' + format(elapsed_time, '.2f') + ' s (' +
+              format(len(rows) / max(elapsed_time, 1e-6), '.0f') + ' ' + unit + '/s)')
+        return records
@@ -9,6 +9,10 @@ retrieve node and update node) The available methods include:
 
     xxx is the type of nodes. (e.g., anatomy, phenotype, microRNA, pathway, protein, disease)
 
+All of the update_xxx methods go through update_nodes, which writes the nodes with a Neo4jBulkWriter: in transactions
+of at most batch_size nodes, over num_sessions concurrent sessions, retrying transactions that fail with transient
+errors, and reporting the write throughput.
+
 '''
 
 __author__ = 'Deqing Qu'
@@ -21,12 +25,37 @@ __email__ = ''
 __status__ = 'Prototype'
 
 from neo4j.v1 import GraphDatabase
+from Neo4jBulkWriter import Neo4jBulkWriter
 
 
 class Neo4jConnection:
-
-    def __init__(self, uri, user, password):
+    # node type -> (label, ID property) of its nodes
+    NODE_TYPES = {'anatomy': ('anatomical_entity', 'rtx_name'),
+                  'phenotype': ('phenotypic_feature', 'rtx_name'),
+                  'microRNA': ('microRNA', 'rtx_name'),
+                  'pathway': ('pathway', 'rtx_name'),
+                  'protein': ('protein', 'id'),
+                  'disease': ('disease', 'rtx_name'),
+                  'chemical_substance': ('chemical_substance', 'rtx_name'),
+                  'bio_process': ('biological_process', 'rtx_name'),
+                  'cellular_component': ('cellular_component', 'rtx_name'),
+                  'molecular_function': ('molecular_function', 'rtx_name'),
+                  'metabolite': ('metabolite', 'rtx_name')}
+    # the node property updates are small, so smaller transactions let more of them be written in parallel
+    DEFAULT_BATCH_SIZE = 1000
+
+    def __init__(self, uri, user, password, batch_size=DEFAULT_BATCH_SIZE,
+                 num_sessions=Neo4jBulkWriter.DEFAULT_NUM_SESSIONS, max_retries=Neo4jBulkWriter.DEFAULT_MAX_RETRIES,
+                 debug=False):
+        """
+        :param batch_size: the most rows written in one transaction by the update methods
+        :param num_sessions: the number of transactions written concurrently by the update methods
+        :param max_retries: the number of times a failed transaction is retried
+        :param debug: print the progress of each update
+        """
         self._driver = GraphDatabase.driver(uri, auth=(user, password))
+        self._writer = Neo4jBulkWriter(self._driver, batch_size=batch_size, num_sessions=num_sessions,
+                                       max_retries=max_retries, debug=debug)
 
     def close(self):
         self._driver.close()
@@ -75,37 +104,54 @@ class Neo4jConnection:
         with self._driver.session() as session:
             return session.read_transaction(self._get_metabolite_nodes)
 
-    def update_anatomy_nodes(self, nodes):
+    def get_node_uuids(self, node_type):
+        """
+        :param node_type: a key of `NODE_TYPES` (e.g., ``'protein'``)
+        :returns: a ``dict`` from the ID of each node of type `node_type` to its UUID, which is new in each build of
+        the KG
+        """
+        (label, id_property) = Neo4jConnection.NODE_TYPES[node_type]
+        query = 'MATCH (n:%s) RETURN n.%s AS node_id, n.UUID AS uuid' % (label, id_property)
         with self._driver.session() as session:
-            return session.write_transaction(self._update_anatomy_nodes, nodes)
+            return session.read_transaction(
+                lambda tx: {record['node_id']: record['uuid'] for record in tx.run(query)})
+
+    def update_nodes(self, node_type, property_name, row_key, nodes):
+        """sets a property of many nodes of one type
+
+        :param node_type: a key of `NODE_TYPES` (e.g., ``'protein'``)
+        :param property_name: the node property to set (e.g., ``'description'``)
+        :param row_key: the key of the property's value in each node ``dict`` (e.g., ``'desc'``)
+        :param nodes: a ``list`` of ``dict``s with the node ID under ``'node_id'`` and the value under `row_key`
+        """
+        (label, id_property) = Neo4jConnection.NODE_TYPES[node_type]
+        query = 'UNWIND $rows AS row MATCH (n:%s {%s: row.node_id}) SET n.%s = row.%s' % \
+                (label, id_property, property_name, row_key)
+        return self._writer.write(query, nodes, unit=label + ' nodes')
+
+    def update_anatomy_nodes(self, nodes):
+        return self.update_nodes('anatomy', 'extended_info_json', 'extended_info_json', nodes)
 
     def update_phenotype_nodes(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_phenotype_nodes, nodes)
+        return self.update_nodes('phenotype', 'extended_info_json', 'extended_info_json', nodes)
 
     def update_microRNA_nodes(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_microRNA_nodes, nodes)
+        return self.update_nodes('microRNA', 'extended_info_json', 'extended_info_json', nodes)
 
     def update_pathway_nodes(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_pathway_nodes, nodes)
+        return self.update_nodes('pathway', 'extended_info_json', 'extended_info_json', nodes)
 
     def update_protein_nodes(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_protein_nodes, nodes)
+        return self.update_nodes('protein', 'extended_info_json', 'extended_info_json', nodes)
 
     def update_disease_nodes(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_disease_nodes, nodes)
+        return self.update_nodes('disease', 'extended_info_json', 'extended_info_json', nodes)
 
     def update_chemical_substance_nodes(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_chemical_substance_nodes, nodes)
+        return self.update_nodes('chemical_substance', 'extended_info_json', 'extended_info_json', nodes)
 
     def update_bio_process_nodes(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_bio_process_nodes, nodes)
+        return self.update_nodes('bio_process', 'extended_info_json', 'extended_info_json', nodes)
 
     def get_anatomy_node(self, id):
         with self._driver.session() as session:
@@ -144,64 +190,71 @@ class Neo4jConnection:
             return session.write_transaction(self._get_node, id)
 
     def update_anatomy_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_anatomy_nodes_desc, nodes)
+        return self.update_nodes('anatomy', 'description', 'desc', nodes)
 
     def update_phenotype_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_phenotype_nodes_desc, nodes)
+        return self.update_nodes('phenotype', 'description', 'desc', nodes)
 
     def update_microRNA_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_microRNA_nodes_desc, nodes)
+        return self.update_nodes('microRNA', 'description', 'desc', nodes)
 
     def update_pathway_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_pathway_nodes_desc, nodes)
+        return self.update_nodes('pathway', 'description', 'desc', nodes)
 
     def update_protein_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_protein_nodes_desc, nodes)
+        return self.update_nodes('protein', 'description', 'desc', nodes)
 
     def update_disease_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_disease_nodes_desc, nodes)
+        return self.update_nodes('disease', 'description', 'desc', nodes)
 
     def update_chemical_substance_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_chemical_substance_nodes_desc, nodes)
+        return self.update_nodes('chemical_substance', 'description', 'desc', nodes)
 
     def update_bio_process_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_bio_process_nodes_desc, nodes)
+        return self.update_nodes('bio_process', 'description', 'desc', nodes)
 
     def update_cellular_component_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_cellular_component_desc, nodes)
+        return self.update_nodes('cellular_component', 'description', 'desc', nodes)
 
     def update_molecular_function_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_molecular_function_desc, nodes)
+        return self.update_nodes('molecular_function', 'description', 'desc', nodes)
 
     def update_protein_nodes_name(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_protein_nodes_name, nodes)
+        return self.update_nodes('protein', 'name', 'name', nodes)
 
     def update_metabolite_nodes_desc(self, nodes):
-        with self._driver.session() as session:
-            return session.write_transaction(self._update_metabolite_desc, nodes)
+        return self.update_nodes('metabolite', 'description', 'desc', nodes)
 
     def get_node_names(self, type):
         with self._driver.session() as session:
             return session.write_transaction(self._get_node_names, type)
 
     def create_disease_has_phenotype(self, array):
-        with self._driver.session() as session:
-            return session.write_transaction(self.__create_disease_has_phenotype, array)
+        """creates a has_phenotype relationship for each ``{"d_id": ..., "p_id": ...}`` in `array` that does not
+        exist yet; MERGE (not CREATE) keeps a batch that is retried after it was committed from duplicating them"""
+        return self._writer.write(
+            """
+            UNWIND $rows AS row
+            WITH row.d_id AS d_id, row.p_id AS p_id
+            MATCH (d:disease {rtx_name:d_id}), (p:phenotypic_feature {rtx_name:p_id})
+            MERGE (d)-[r:has_phenotype]->(p)
+            ON CREATE SET r += {
+                source_node_uuid: d.UUID,
+                target_node_uuid: p.UUID,
+                is_defined_by: \'RTX\',
+                provided_by: \'BioLink\',
+                predicate: \'has_phenotype\',
+                seed_node_uuid: d.seed_node_uuid,
+                relation: \'has_phenotype\'
+            }
+            """, array, unit='has_phenotype relationships')
 
     def remove_duplicate_has_phenotype_relations(self):
+        """deletes all but one of each set of parallel has_phenotype relationships, in batches"""
         with self._driver.session() as session:
-            return session.write_transaction(self.__remove_duplicate_has_phenotype_relations)
+            rel_ids = session.read_transaction(self.__get_duplicate_has_phenotype_relation_ids)
+        return self._writer.write('UNWIND $rows AS rel_id MATCH ()-[r]->() WHERE id(r) = rel_id DELETE r', rel_ids,
+                                  unit='duplicate has_phenotype relationships')
 
     def count_has_phenotype_relation(self, relation):
         """
@@ -213,8 +266,11 @@ class Neo4jConnection:
             return session.write_transaction(self.__count_has_phenotype_relation, relation)
 
     def remove_duplicated_react_nodes(self):
+        """deletes the Reactome nodes whose id another node also has, and their relationships, in batches"""
         with self._driver.session() as session:
-            return session.write_transaction(self.__remove_duplicated_react_nodes)
+            node_ids = session.read_transaction(self.__get_duplicated_react_node_ids)
+        return self._writer.write('UNWIND $rows AS node_id MATCH (n) WHERE id(n) = node_id DETACH DELETE n', node_ids,
+                                  unit='duplicated Reactome nodes')
 
     def count_duplicated_nodes(self):
         with self._driver.session() as session:
@@ -279,110 +335,6 @@ class Neo4jConnection:
         result = tx.run("MATCH (n:metabolite) RETURN n.rtx_name")
         return [record["n.rtx_name"] for record in result]
 
-    @staticmethod
-    def _update_anatomy_nodes(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.extended_info_json AS extended_info_json
-            MATCH (n:anatomical_entity{rtx_name:node_id})
-            SET n.extended_info_json=extended_info_json
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_phenotype_nodes(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.extended_info_json AS extended_info_json
-            MATCH (n:phenotypic_feature{rtx_name:node_id})
-            SET n.extended_info_json=extended_info_json
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_microRNA_nodes(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.extended_info_json AS extended_info_json
-            MATCH (n:microRNA{rtx_name:node_id})
-            SET n.extended_info_json=extended_info_json
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_pathway_nodes(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.extended_info_json AS extended_info_json
-            MATCH (n:pathway{rtx_name:node_id})
-            SET n.extended_info_json=extended_info_json
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_protein_nodes(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.extended_info_json AS extended_info_json
-            MATCH (n:protein{id:node_id})
-            SET n.extended_info_json=extended_info_json
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_disease_nodes(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.extended_info_json AS extended_info_json
-            MATCH (n:disease{rtx_name:node_id})
-            SET n.extended_info_json=extended_info_json
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_chemical_substance_nodes(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.extended_info_json AS extended_info_json
-            MATCH (n:chemical_substance{rtx_name:node_id})
-            SET n.extended_info_json=extended_info_json
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_bio_process_nodes(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.extended_info_json AS extended_info_json
-            MATCH (n:biological_process{rtx_name:node_id})
-            SET n.extended_info_json=extended_info_json
-            """,
-            nodes=nodes,
-        )
-        return result
-
     @staticmethod
     def _get_anatomy_node(tx, id):
         result = tx.run("MATCH (n:anatomical_entity{rtx_name:'%s'}) RETURN n" % id)
@@ -428,199 +380,23 @@ class Neo4jConnection:
         result = tx.run("MATCH (n{rtx_name:'%s'}) RETURN n" % id)
         return result.single()
 
-    @staticmethod
-    def _update_anatomy_nodes_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:anatomical_entity{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_phenotype_nodes_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:phenotypic_feature{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_microRNA_nodes_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:microRNA{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_disease_nodes_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:disease{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_pathway_nodes_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:pathway{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_protein_nodes_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:protein{id:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_chemical_substance_nodes_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:chemical_substance{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_bio_process_nodes_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:biological_process{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_cellular_component_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:cellular_component{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_molecular_function_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:molecular_function{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_protein_nodes_name(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.name AS name
-            MATCH (n:protein{id:node_id})
-            SET n.name=name
-            """,
-            nodes=nodes,
-        )
-        return result
-
-    @staticmethod
-    def _update_metabolite_desc(tx, nodes):
-        result = tx.run(
-            """
-            UNWIND {nodes} AS row
-            WITH row.node_id AS node_id, row.desc AS description
-            MATCH (n:metabolite{rtx_name:node_id})
-            SET n.description=description
-            """,
-            nodes=nodes,
-        )
-        return result
-
     @staticmethod
     def _get_node_names(tx, type):
         result = tx.run("MATCH (n:%s) RETURN n.name" % type)
         return [record["n.name"] for record in result]
 
     @staticmethod
-    def __create_disease_has_phenotype(tx, array):
-        result = tx.run(
-            """
-            UNWIND {array} AS row
-            WITH row.d_id AS d_id, row.p_id AS p_id
-            MATCH (d:disease {rtx_name:d_id}), (p:phenotypic_feature {rtx_name:p_id})
-            CREATE (d)-[:has_phenotype {
-                source_node_uuid: d.UUID, 
-                target_node_uuid: p.UUID,
-                is_defined_by: \'RTX\',
-                provided_by: \'BioLink\',
-                predicate: \'has_phenotype\',
-                seed_node_uuid: d.seed_node_uuid,
-                relation: \'has_phenotype\'  
-            }]->(p)
-            """,
-            array=array
-        )
-        return result
-
-    @staticmethod
-    def __remove_duplicate_has_phenotype_relations(tx):
+    def __get_duplicate_has_phenotype_relation_ids(tx):
         result = tx.run(
             """
             MATCH (a)-[r:has_phenotype]->(b)  
-            WITH a, b, TAIL (COLLECT (r)) as rr  
+            WITH a, b, TAIL (COLLECT (id(r))) as rr  
             WHERE size(rr)>0  
-            FOREACH (r IN rr | DELETE r)
+            UNWIND rr AS rel_id
+            RETURN rel_id
             """
         )
-        return result
+        return [record['rel_id'] for record in result]
 
     @staticmethod
     def __count_has_phenotype_relation(tx, relation):
@@ -634,15 +410,15 @@ class Neo4jConnection:
         return result.single()['count(p)']
 
     @staticmethod
-    def __remove_duplicated_react_nodes(tx):
+    def __get_duplicated_react_node_ids(tx):
         result = tx.run(
             """
             MATCH (n), (m) 
             WHERE n<>m AND n.id=m.id AND split(n.rtx_name, ':')[0] = 'REACT'
-            DELETE n
+            RETURN DISTINCT id(n) AS node_id
             """
         )
-        return result
+        return [record['node_id'] for record in result]
 
     @staticmethod
     def __count_duplicated_nodes(tx):
@@ -0,0 +1,88 @@
+""" This module defines the class Neo4jStore, the fast way to empty a Neo4j
+database when the whole graph is about to be replaced: instead of deleting
+the nodes and relationships, it stops Neo4j, deletes the database's store
+directory, and starts Neo4j again with a new, empty store.
+
+It must run on the Neo4j host, as a user that may stop and start Neo4j and
+delete the store (see also neo4j-backup.sh). Indexes are lost with the store;
+`Orangeboard.neo4j_push` creates the ones it needs.
+
+Usage:
+
+    store = Neo4jStore('/var/lib/neo4j/data/databases/graph.db', neo4j_command='service neo4j')
+    store.recreate()
+    driver = store.wait_until_available(make_driver)
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import os
+import time
+import shlex
+import shutil
+import subprocess
+
+
+class Neo4jStore:
+    DEFAULT_NEO4J_COMMAND = 'neo4j'
+    DEFAULT_START_TIMEOUT_SEC = 300
+    # seconds between the attempts to connect to Neo4j while it starts
+    POLL_INTERVAL_SEC = 1.0
+    # a file that every Neo4j store directory has, so that some other directory is never deleted by mistake
+    STORE_MARKER_FILE = 'neostore'
+
+    def __init__(self, store_dir, neo4j_command=DEFAULT_NEO4J_COMMAND, start_timeout=DEFAULT_START_TIMEOUT_SEC):
+        """
+        :param store_dir: the store directory of the database (e.g., ``.../data/databases/graph.db``)
+        :param neo4j_command: the command that, followed by ``stop`` or ``start``, stops or starts Neo4j (e.g.,
+        ``'service neo4j'``)
+        :param start_timeout: seconds to wait for Neo4j to accept queries after it is started
+        """
+        self.store_dir = store_dir
+        self.neo4j_command = neo4j_command
+        self.start_timeout = start_timeout
+
+    def run_neo4j_command(self, action):
+        subprocess.run(shlex.split(self.neo4j_command) + [action], check=True)
+
+    def recreate(self):
+        """stops Neo4j, deletes the store directory, and starts Neo4j, which creates an empty store"""
+        if os.path.exists(self.store_dir) and \
+                not os.path.exists(os.path.join(self.store_dir, Neo4jStore.STORE_MARKER_FILE)):
+            raise ValueError('not a Neo4j store directory: ' + self.store_dir)
+        print('recreating the Neo4j store: ' + self.store_dir)
+        self.run_neo4j_command('stop')
+        try:
+            if os.path.exists(self.store_dir):
+                shutil.rmtree(self.store_dir)
+        finally:
+            self.run_neo4j_command('start')
+
+    def wait_until_available(self, make_driver):
+        """waits until Neo4j accepts queries, for at most `start_timeout` seconds
+
+        :param make_driver: a function that returns a new driver; the driver is created in the retry loop, because
+        creating one connects to Neo4j (and fails while Neo4j is starting)
+        :returns: the driver, once it has run a query
+        """
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            driver = None
+            try:
+                driver = make_driver()
+                with driver.session() as session:
+                    session.run('RETURN 1').consume()
+                return driver
+            except Exception:
+                if driver is not None:
+                    driver.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(self.POLL_INTERVAL_SEC)
@@ -0,0 +1,82 @@
+""" This module defines the class NodeFingerprintStore, which remembers a
+fingerprint of the properties last fetched for each node, so that an
+incremental `UpdateNodesInfo` run writes to Neo4j only the nodes whose
+upstream data changed (see `NodeUpdatePipeline`).
+
+The fingerprints are kept in a sqlite file, with the time each node was last
+fetched, separately for each kind of update (e.g., ``update_protein_nodes_desc``).
+Each fingerprint also records the graph ID of the node it was written to (its
+UUID, which is new in each build of the KG), so that the nodes of a rebuilt KG
+are written even though their upstream data did not change.
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import json
+import hashlib
+import sqlite3
+
+
+class NodeFingerprintStore:
+    DEFAULT_PATH = 'NodeFingerprints.sqlite'
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+
+    def connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE IF NOT EXISTS fingerprints (namespace TEXT, node_id TEXT, fingerprint TEXT, '
+                     'fetched REAL, graph_id TEXT, PRIMARY KEY (namespace, node_id))')
+        # a file from before graph IDs were recorded; its fingerprints match no node until the node is written again
+        if 'graph_id' not in [row[1] for row in conn.execute('PRAGMA table_info(fingerprints)')]:
+            conn.execute('ALTER TABLE fingerprints ADD COLUMN graph_id TEXT')
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def make_fingerprint(node):
+        """returns a digest of the node ``dict`` `node`"""
+        return hashlib.sha1(json.dumps(node, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def get_fingerprints(self, namespace):
+        """
+        :returns: a ``dict`` from node ID to a ``(fingerprint, fetched, graph_id)`` tuple, where `fetched` is the
+        time (in seconds since the epoch) at which the node was last fetched
+        """
+        conn = self.connect()
+        try:
+            return {node_id: (fingerprint, fetched, graph_id) for node_id, fingerprint, fetched, graph_id in
+                    conn.execute('SELECT node_id, fingerprint, fetched, graph_id FROM fingerprints WHERE namespace=?',
+                                 (namespace,))}
+        finally:
+            conn.close()
+
+    def set_fingerprints(self, namespace, node_fingerprints, fetched):
+        """
+        :param node_fingerprints: an iterable of ``(node_id, fingerprint, graph_id)`` tuples
+        :param fetched: the time at which the nodes were fetched
+        """
+        conn = self.connect()
+        try:
+            conn.executemany('INSERT OR REPLACE INTO fingerprints (namespace, node_id, fingerprint, fetched, graph_id) '
+                             'VALUES (?, ?, ?, ?, ?)',
+                             [(namespace, str(node_id), fingerprint, fetched, graph_id)
+                              for node_id, fingerprint, graph_id in node_fingerprints])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self, namespace):
+        conn = self.connect()
+        try:
+            conn.execute('DELETE FROM fingerprints WHERE namespace=?', (namespace,))
+            conn.commit()
+        finally:
+            conn.close()
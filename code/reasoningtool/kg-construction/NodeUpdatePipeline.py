@@ -0,0 +1,239 @@
+""" This module defines the class NodeUpdatePipeline, which fetches the
+properties of many nodes concurrently and writes them to Neo4j in batches as
+they arrive (used by `UpdateNodesInfo`).
+
+Fetcher threads take node IDs from a shared iterator, fetch each node's
+properties, and put them on a bounded queue; the calling thread drains the
+queue and writes the nodes to Neo4j `batch_size` at a time. The writes start
+as soon as the first batch is fetched, and at most `queue_size` fetched nodes
+wait to be batched, so memory does not grow with the number of nodes.
+
+*   Each node has a source (e.g., the Query* class that it is fetched from),
+    and `source_limits` caps the number of concurrent fetches from a source.
+*   If a `checkpoint_file` is given, the IDs of the nodes in each batch are
+    appended to it once the batch is written, and a later run with the same
+    file skips them; the file is deleted when a run completes.
+*   If a `NodeFingerprintStore` is given (an incremental refresh), a node whose
+    fetched properties have the same fingerprint as last time is not written,
+    and a node that was fetched less than `max_age` seconds ago is not fetched,
+    but only if the node's graph ID (`get_graph_id`) is the same as when it was
+    last written; so the nodes of a rebuilt KG are all written.
+
+Usage:
+
+    pipeline = NodeUpdatePipeline(fetch, conn.update_anatomy_nodes_desc, num_workers=8)
+    pipeline.run(node_ids)
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import os
+import sys
+import time
+import queue
+import threading
+
+from NodeFingerprintStore import NodeFingerprintStore
+
+
+class NodeUpdatePipeline:
+    DEFAULT_NUM_WORKERS = 8
+    DEFAULT_BATCH_SIZE = 10000
+    DEFAULT_QUEUE_SIZE = 1000
+    # seconds that a fetcher waits on a full queue before checking whether the pipeline has stopped
+    QUEUE_POLL_SEC = 0.1
+
+    def __init__(self, fetch, write, num_workers=DEFAULT_NUM_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                 queue_size=DEFAULT_QUEUE_SIZE, get_source=None, source_limits=None, checkpoint_file=None,
+                 name='node', fingerprint_store=None, fingerprint_namespace=None, max_age=None, get_graph_id=None):
+        """
+        :param fetch: a function of a node ID that returns the node ``dict`` to write, or ``None`` to write nothing
+        :param write: a function that writes a ``list`` of node ``dict``s (e.g., `Neo4jConnection.update_*_nodes_desc`)
+        :param num_workers: the number of fetcher threads
+        :param batch_size: the most nodes per call to `write`
+        :param queue_size: the most fetched nodes waiting to be batched
+        :param get_source: a function of a node ID that returns the name of the source it is fetched from
+        :param source_limits: a ``dict`` of source name to the most concurrent fetches from that source (sources that
+        are not in it are limited only by `num_workers`)
+        :param checkpoint_file: the file that records the IDs of the nodes written so far, or ``None`` to not record them
+        :param name: the kind of node, for the progress messages
+        :param fingerprint_store: a `NodeFingerprintStore` for an incremental refresh, or ``None`` to write every node
+        :param fingerprint_namespace: the kind of update that the fingerprints are for (default: `name`)
+        :param max_age: with a `fingerprint_store`, the seconds after which a node is fetched again (``None`` to fetch
+        every node)
+        :param get_graph_id: with a `fingerprint_store`, a function of a node ID that returns the ID of the node in the
+        graph that is written to (e.g., its UUID, which is new in each build of the KG); ``None`` if the graph is
+        never rebuilt
+        """
+        self.fetch = fetch
+        self.write = write
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.queue = None
+        self.get_source = get_source
+        self.source_limits = source_limits if source_limits is not None else dict()
+        self.checkpoint_file = checkpoint_file
+        self.name = name
+        self.fingerprint_store = fingerprint_store
+        self.fingerprint_namespace = fingerprint_namespace if fingerprint_namespace is not None else name
+        self.max_age = max_age
+        self.get_graph_id = get_graph_id
+        self.lock = threading.Lock()
+        self.source_semaphores = dict()
+        self.stop_event = threading.Event()
+
+    def get_source_semaphore(self, node_id):
+        source = self.get_source(node_id) if self.get_source is not None else None
+        with self.lock:
+            semaphore = self.source_semaphores.get(source, None)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.source_limits.get(source, self.num_workers))
+                self.source_semaphores[source] = semaphore
+            return semaphore
+
+    def get_graph_id_str(self, node_id):
+        if self.get_graph_id is None:
+            return None
+        graph_id = self.get_graph_id(node_id)
+        return str(graph_id) if graph_id is not None else None
+
+    def is_fetched_recently(self, fingerprints, node_id, fetched_after):
+        """
+        :returns: ``True`` if the node was fetched after `fetched_after` and written to the same node in the graph
+        """
+        (_, fetched, graph_id) = fingerprints.get(str(node_id), (None, 0, None))
+        return fetched >= fetched_after and graph_id == self.get_graph_id_str(node_id)
+
+    def read_checkpoint(self):
+        """
+        :returns: the ``set`` of the IDs of the nodes that a previous run wrote
+        """
+        if self.checkpoint_file is None or not os.path.exists(self.checkpoint_file):
+            return set()
+        with open(self.checkpoint_file, 'r') as checkpoint_file:
+            return set(line.rstrip('\n') for line in checkpoint_file)
+
+    def put(self, item):
+        """puts `item` on the queue, unless the pipeline stops first
+
+        :returns: ``True`` if the item was put on the queue
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=NodeUpdatePipeline.QUEUE_POLL_SEC)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def fetch_nodes(self, node_ids):
+        while not self.stop_event.is_set():
+            with self.lock:
+                node_id = next(node_ids, None)
+            if node_id is None:
+                break
+            try:
+                with self.get_source_semaphore(node_id):
+                    node = self.fetch(node_id)
+            except Exception as e:
+                self.put((node_id, None, e))
+                return
+            if not self.put((node_id, node, None)):
+                return
+        self.put(None)
+
+    def write_batch(self, nodes, node_ids, node_fingerprints):
+        if len(nodes) > 0:
+            self.write(nodes)
+        if self.fingerprint_store is not None and len(node_fingerprints) > 0:
+            self.fingerprint_store.set_fingerprints(self.fingerprint_namespace, node_fingerprints, time.time())
+        if self.checkpoint_file is not None and len(node_ids) > 0:
+            with open(self.checkpoint_file, 'a') as checkpoint_file:
+                checkpoint_file.write(''.join(str(node_id) + '\n' for node_id in node_ids))
+
+    def run(self, node_ids):
+        """fetches and writes the nodes with IDs `node_ids`, except those that the checkpoint file says were written
+        (and, in an incremental refresh, those fetched recently or unchanged)
+
+        :returns: the number of nodes written in this run
+        """
+        done_node_ids = self.read_checkpoint()
+        node_ids = [node_id for node_id in node_ids if str(node_id) not in done_node_ids]
+        if len(done_node_ids) > 0:
+            print('resuming the ' + self.name + ' update: ' + str(len(node_ids)) + ' nodes left')
+        fingerprints = dict()
+        if self.fingerprint_store is not None:
+            fingerprints = self.fingerprint_store.get_fingerprints(self.fingerprint_namespace)
+            if self.max_age is not None:
+                fetched_after = time.time() - self.max_age
+                num_nodes = len(node_ids)
+                node_ids = [node_id for node_id in node_ids
+                            if not self.is_fetched_recently(fingerprints, node_id, fetched_after)]
+                print(str(num_nodes - len(node_ids)) + ' ' + self.name + ' nodes were fetched recently')
+        node_ids_iter = iter(node_ids)
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.stop_event.clear()
+        threads = [threading.Thread(target=self.fetch_nodes, args=(node_ids_iter,), daemon=True)
+                   for _ in range(min(self.num_workers, max(len(node_ids), 1)))]
+        for thread in threads:
+            thread.start()
+        num_running = len(threads)
+        num_written = 0
+        num_unchanged = 0
+        fetch_exception = None
+        batch = []
+        batch_node_ids = []
+        batch_fingerprints = []
+        try:
+            while num_running > 0:
+                item = self.queue.get()
+                if item is None:
+                    num_running -= 1
+                    continue
+                node_id, node, exception = item
+                if exception is not None:
+                    print('NodeUpdatePipeline: ' + type(exception).__name__ + ' fetching ' + self.name + ' node: ' +
+                          str(node_id), file=sys.stderr)
+                    fetch_exception = exception
+                    break
+                if node is not None and self.fingerprint_store is not None:
+                    fingerprint = NodeFingerprintStore.make_fingerprint(node)
+                    graph_id = self.get_graph_id_str(node_id)
+                    batch_fingerprints.append((node_id, fingerprint, graph_id))
+                    (last_fingerprint, _, last_graph_id) = fingerprints.get(str(node_id), (None, 0, None))
+                    if (last_fingerprint, last_graph_id) == (fingerprint, graph_id):
+                        num_unchanged += 1
+                        node = None
+                if node is not None:
+                    batch.append(node)
+                batch_node_ids.append(node_id)
+                if len(batch_node_ids) >= self.batch_size:
+                    self.write_batch(batch, batch_node_ids, batch_fingerprints)
+                    num_written += len(batch)
+                    print(self.name + ' nodes written: ' + str(num_written) + ' (unchanged: ' + str(num_unchanged) +
+                          ') of ' + str(len(node_ids)))
+                    batch = []
+                    batch_node_ids = []
+                    batch_fingerprints = []
+            # the nodes fetched before an error are written, so that a restart need not fetch them again
+            self.write_batch(batch, batch_node_ids, batch_fingerprints)
+            num_written += len(batch)
+        finally:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+        if fetch_exception is not None:
+            raise fetch_exception
+        if self.checkpoint_file is not None and os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+        if self.fingerprint_store is not None:
+            print(str(num_unchanged) + ' ' + self.name + ' nodes were unchanged upstream and not written')
+        return num_written
@@ -8,6 +8,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import urllib
 import math
 import sys
@@ -17,7 +18,6 @@ import re
 import pandas
 import pprint
 import CachedMethods
-import requests_cache
 import numpy
 from QueryNCBIeUtils import QueryNCBIeUtils
 from QueryDisont import QueryDisont  # DOID -> MeSH
@@ -25,8 +25,6 @@ from QueryEBIOLS import QueryEBIOLS  # UBERON -> MeSH
 from QueryPubChem import QueryPubChem  # ChEMBL -> PubMed id
 from QueryMyChem import QueryMyChem
 
-requests_cache.install_cache('NGDCache')
-
 
 class NormGoogleDistance:
 
@@ -38,7 +36,7 @@ class NormGoogleDistance:
         """
         url_str =  'https://www.ebi.ac.uk/spot/oxo/api/mappings?fromId=' + str(uid)
         try:
-            res = requests.get(url_str, headers={'accept': 'application/json'}, timeout=120)
+            res = HTTPClient.get_instance().get(url_str, headers={'accept': 'application/json'}, timeout=120)
         except requests.exceptions.Timeout:
             print('HTTP timeout in SemMedInterface.py; URL: ' + url_str, file=sys.stderr)
             time.sleep(1)  ## take a timeout because NCBI rate-limits connections
@@ -19,11 +19,17 @@ __status__ = 'Prototype'
 
 import uuid
 import itertools
+import collections
 import pprint
 import neo4j.v1
 import sys
 import timeit
 import argparse
+import os
+import gc
+import pickle
+
+from Neo4jBulkWriter import Neo4jBulkWriter
 
 # NOTE to users:  neo4j password hard-coded (see NEO4J_PASSWORD below)
 # nodetype+name together uniquely define a node
@@ -32,8 +38,15 @@ import argparse
 class Node:
     RESERVED_PROPS = {"UUID", "name", "seed_node_uuid", "expanded", "description"}
 
-    def __init__(self, nodetype, name, seed_node):
-        self.nodetype = nodetype
+    # no per-instance __dict__; the master KG has millions of nodes
+    __slots__ = ('node_id', 'nodetype', 'name', 'seed_node', 'uuid', 'expanded', 'extra_props', 'desc')
+
+    def __init__(self, nodetype, name, seed_node, node_id=None):
+        """
+        :param node_id: a small ``int`` that identifies the node within its Orangeboard (used in relationship keys)
+        """
+        self.node_id = node_id
+        self.nodetype = sys.intern(nodetype)
         self.name = name
         if seed_node is not None:
             self.seed_node = seed_node
@@ -81,16 +94,19 @@ class Node:
 
 
 class Rel:
+    __slots__ = ('reltype', 'sourcedb', 'source_node', 'target_node', 'seed_node', 'prob', 'extended_reltype',
+                 'publications')
+
     def __init__(self, reltype, sourcedb, source_node, target_node, seed_node, prob=None, extended_reltype=None, publications=None):
-        self.reltype = reltype
-        self.sourcedb = sourcedb
+        self.reltype = sys.intern(reltype)
+        self.sourcedb = sys.intern(sourcedb)
         self.source_node = source_node
         self.target_node = target_node
         self.seed_node = seed_node
         self.prob = prob
         if extended_reltype is None:
             extended_reltype = reltype
-        self.extended_reltype = extended_reltype
+        self.extended_reltype = sys.intern(extended_reltype)
         if publications is not None:
             self.publications = publications
         else:
@@ -118,6 +134,22 @@ class Rel:
             prop_dict['target_node_uuid'] = self.source_node.uuid
         return prop_dict
 
+    def get_neo4j_props(self, reverse=False):
+        """returns the properties of the relationship as they are stored in Neo4j by `Orangeboard.neo4j_push`
+
+        :param reverse: ``True`` for the reverse-direction copy of an undirected relationship
+        """
+        rel_props = self.get_props(reverse)
+        return {'source_node_uuid': rel_props['source_node_uuid'],
+                'target_node_uuid': rel_props['target_node_uuid'],
+                'is_defined_by': 'RTX',
+                'provided_by': rel_props['sourcedb'],
+                'predicate': self.reltype,
+                'seed_node_uuid': rel_props['seed_node_uuid'],
+                'probability': rel_props['prob'],
+                'publications': rel_props['publications'],
+                'relation': rel_props['extended_reltype']}
+
     def __str__(self):
         attr_list = ['reltype', 'sourcedb', 'source_node', 'target_node']
         attr_dict = {attr: str(self.__getattribute__(attr))
@@ -133,15 +165,40 @@ class Orangeboard:
     NEO4J_USERNAME = 'neo4j'
     NEO4J_PASSWORD = 'precisionmedicine'
     DEBUG_COUNT_REPORT_GRANULARITY = 1000
+    NEO4J_IMPORT_ARRAY_DELIMITER = ';'  # the neo4j-admin import default
+    # the attributes that hold the graph itself (not the Neo4j connection settings), i.e., what a snapshot saves
+    SNAPSHOT_ATTRIBUTES = ('dict_nodetype_to_dict_name_to_node',
+                           'dict_reltype_to_dict_relkey_to_rel',
+                           'dict_nodetype_count',
+                           'dict_reltype_count',
+                           'dict_seed_uuid_to_list_nodes',
+                           'dict_seed_uuid_to_list_rels',
+                           'next_node_id',
+                           'seed_node',
+                           'dict_reltype_dirs')
 
     def bytesize(self):
+        """returns the deep memory footprint, in bytes, of the nodes and relationships in the orangeboard and of the
+        dictionaries that index them; objects reachable in more than one way (e.g., interned strings) count once"""
         count = 0
-        for uuid in self.dict_seed_uuid_to_list_nodes.keys():
-            for node in self.dict_seed_uuid_to_list_nodes[uuid]:
-                count += sys.getsizeof(node)
-        for uuid in self.dict_seed_uuid_to_list_rels.keys():
-            for rel in self.dict_seed_uuid_to_list_rels[uuid]:
-                count += sys.getsizeof(rel)
+        seen_ids = set()
+        objects = [self.dict_nodetype_to_dict_name_to_node,
+                   self.dict_reltype_to_dict_relkey_to_rel,
+                   self.dict_seed_uuid_to_list_nodes,
+                   self.dict_seed_uuid_to_list_rels]
+        while len(objects) > 0:
+            obj = objects.pop()
+            if id(obj) in seen_ids:
+                continue
+            seen_ids.add(id(obj))
+            count += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                objects.extend(obj.keys())
+                objects.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                objects.extend(obj)
+            elif isinstance(obj, (Node, Rel)):
+                objects.extend(getattr(obj, slot) for slot in obj.__slots__ if hasattr(obj, slot))
         return count
 
     def __init__(self, debug=False):
@@ -151,6 +208,7 @@ class Orangeboard:
         self.dict_reltype_count = dict()
         self.dict_seed_uuid_to_list_nodes = dict()
         self.dict_seed_uuid_to_list_rels = dict()
+        self.next_node_id = 0
         self.debug = debug
         self.seed_node = None
         self.dict_reltype_dirs = None
@@ -158,6 +216,10 @@ class Orangeboard:
         self.neo4j_url = None
         self.neo4j_user = None
         self.neo4j_password = None
+        self.push_batch_size = Neo4jBulkWriter.DEFAULT_BATCH_SIZE
+        self.push_num_sessions = Neo4jBulkWriter.DEFAULT_NUM_SESSIONS
+        self.push_max_retries = Neo4jBulkWriter.DEFAULT_MAX_RETRIES
+        self.neo4j_store = None
         if self.debug:
             self.start_time = timeit.default_timer()
 
@@ -285,7 +347,8 @@ class Orangeboard:
             subdict = self.dict_nodetype_to_dict_name_to_node.get(nodetype, None)
             if subdict is None:
                 self.dict_nodetype_to_dict_name_to_node[nodetype] = dict()
-            new_node = Node(nodetype, name, self.seed_node)
+            new_node = Node(nodetype, name, self.seed_node, self.next_node_id)
+            self.next_node_id += 1
             new_node.desc = desc
             existing_node = new_node
             if seed_node_bool:
@@ -342,6 +405,13 @@ class Orangeboard:
             rel_dict_key = target_uuid + '--' + source_uuid
         return rel_dict_key
 
+    @staticmethod
+    def make_rel_dict_int_key(source_node_id, target_node_id, rel_dir):
+        """like `make_rel_dict_key`, but for the integer `Node.node_id` values; returns a single ``int``"""
+        if not rel_dir and source_node_id > target_node_id:
+            source_node_id, target_node_id = target_node_id, source_node_id
+        return (source_node_id << 32) | target_node_id
+
     def get_rel(self, reltype, source_node, target_node):
         dict_reltype_dirs = self.dict_reltype_dirs
         if dict_reltype_dirs is None:
@@ -355,7 +425,7 @@ class Orangeboard:
         rel_dict_key = None
         subdict = self.dict_reltype_to_dict_relkey_to_rel.get(reltype, None)
         if subdict is not None:
-            rel_dict_key = Orangeboard.make_rel_dict_key(source_node.uuid, target_node.uuid, reltype_dir)
+            rel_dict_key = Orangeboard.make_rel_dict_int_key(source_node.node_id, target_node.node_id, reltype_dir)
             existing_rel = subdict.get(rel_dict_key, None)
             if existing_rel is not None:
                 ret_rel = existing_rel
@@ -386,7 +456,7 @@ class Orangeboard:
             existing_rel = new_rel
             rel_dict_key = existing_rel_list[1]
             if rel_dict_key is None:
-                rel_dict_key = Orangeboard.make_rel_dict_key(source_node.uuid, target_node.uuid, reltype_dir)
+                rel_dict_key = Orangeboard.make_rel_dict_int_key(source_node.node_id, target_node.node_id, reltype_dir)
             subdict[rel_dict_key] = new_rel
             seed_node_uuid = seed_node.uuid
             sublist = self.dict_seed_uuid_to_list_rels.get(seed_node_uuid, None)
@@ -416,44 +486,183 @@ class Orangeboard:
         """
         return '{' + (', '.join('{!s}:{!r}'.format(key,val) for (key,val) in property_info.items())) + '}' if len(property_info) > 0 else ''
 
+    def get_rel_dict_key(self, rel):
+        """returns the key of the relationship in ``dict_reltype_to_dict_relkey_to_rel[rel.reltype]``"""
+        return Orangeboard.make_rel_dict_int_key(rel.source_node.node_id, rel.target_node.node_id,
+                                                 self.dict_reltype_dirs[rel.reltype])
+
     def clear_from_seed_node_uuid(self, seed_node_uuid):
+        """removes the nodes and relationships that were added under the given seed node; uses the per-seed lists,
+        so the time taken is proportional to the size of the seed's own subgraph
+
+        :param seed_node_uuid: the UUID of the seed node
+        """
         dict_reltype_to_dict_relkey_to_rel = self.dict_reltype_to_dict_relkey_to_rel
-        for reltype in dict_reltype_to_dict_relkey_to_rel.keys():
-            dict_relkey_to_rel = dict_reltype_to_dict_relkey_to_rel[reltype]
-            for relkey in dict_relkey_to_rel.copy().keys():
-                rel = dict_relkey_to_rel[relkey]
-                if rel.seed_node.uuid == seed_node_uuid:
-                    rel.source_node = None
-                    rel.target_node = None
-                    del dict_relkey_to_rel[relkey]
-        del self.dict_seed_uuid_to_list_rels[seed_node_uuid][:]
-        del self.dict_seed_uuid_to_list_rels[seed_node_uuid]
+        for rel in self.dict_seed_uuid_to_list_rels.pop(seed_node_uuid, []):
+            dict_relkey_to_rel = dict_reltype_to_dict_relkey_to_rel[rel.reltype]
+            relkey = self.get_rel_dict_key(rel)
+            if dict_relkey_to_rel.get(relkey, None) is rel:
+                del dict_relkey_to_rel[relkey]
+            rel.source_node = None
+            rel.target_node = None
         dict_nodetype_to_dict_name_to_node = self.dict_nodetype_to_dict_name_to_node
-        for nodetype in dict_nodetype_to_dict_name_to_node.keys():
-            dict_name_to_node = dict_nodetype_to_dict_name_to_node[nodetype]
-            for name in dict_name_to_node.copy().keys():
-                node = dict_name_to_node[name]
-                if node.seed_node.uuid == seed_node_uuid:
-                    del dict_name_to_node[name]
-        del self.dict_seed_uuid_to_list_nodes[seed_node_uuid][:]
-        del self.dict_seed_uuid_to_list_nodes[seed_node_uuid]
+        for node in self.dict_seed_uuid_to_list_nodes.pop(seed_node_uuid, []):
+            dict_name_to_node = dict_nodetype_to_dict_name_to_node[node.nodetype]
+            if dict_name_to_node.get(node.name, None) is node:
+                del dict_name_to_node[node.name]
+
+    def count_nodes_for_seed_node_uuid(self, seed_node_uuid):
+        return len(self.dict_seed_uuid_to_list_nodes.get(seed_node_uuid, []))
+
+    def count_rels_for_seed_node_uuid(self, seed_node_uuid):
+        return len(self.dict_seed_uuid_to_list_rels.get(seed_node_uuid, []))
+
+    def count_nodes_by_nodetype_for_seed_node_uuid(self, seed_node_uuid):
+        """:returns: a ``dict`` from nodetype to the number of nodes of that type added under the given seed node"""
+        return dict(collections.Counter(node.nodetype
+                                        for node in self.dict_seed_uuid_to_list_nodes.get(seed_node_uuid, [])))
+
+    def count_rels_by_reltype_for_seed_node_uuid(self, seed_node_uuid):
+        """:returns: a ``dict`` from reltype to the number of relationships of that type added under the given seed
+        node"""
+        return dict(collections.Counter(rel.reltype
+                                        for rel in self.dict_seed_uuid_to_list_rels.get(seed_node_uuid, [])))
 
     def clear_from_seed_node(self, seed_node):
         self.clear_from_seed_node_uuid(seed_node.uuid)
 
     def clear_all(self):
-        for seed_node_uuid in self.dict_seed_uuid_to_list_nodes.keys():
+        for seed_node_uuid in list(self.dict_seed_uuid_to_list_nodes.keys()):
             self.clear_from_seed_node_uuid(seed_node_uuid)
         self.seed_node = None
 
+    def save_snapshot(self, file_name, extra_state=None):
+        """writes the graph held by the orangeboard to a binary snapshot file
+
+        The file is written under a temporary name and then renamed, so an interrupted save never replaces a good
+        snapshot with a truncated one.
+
+        :param file_name: the snapshot file
+        :param extra_state: any picklable object to save along with the graph (e.g., the caller's progress); it may
+        refer to the orangeboard's nodes and relationships
+        """
+        if self.debug:
+            start_time = timeit.default_timer()
+        state = {attr: getattr(self, attr) for attr in Orangeboard.SNAPSHOT_ATTRIBUTES}
+        temp_file_name = file_name + '.tmp'
+        # the snapshot creates no garbage, so the cyclic collector would only rescan the graph
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(temp_file_name, 'wb') as snapshot_file:
+                pickle.dump((state, extra_state), snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        os.replace(temp_file_name, file_name)
+        if self.debug:
+            print('Saved snapshot ' + file_name + ' (' + str(os.path.getsize(file_name)) + ' bytes) in ' +
+                  format(timeit.default_timer() - start_time, '.2f') + ' s')
+
+    def load_snapshot(self, file_name):
+        """replaces the graph held by the orangeboard with the one in a snapshot file written by `save_snapshot`;
+        the Neo4j connection settings of the orangeboard are kept
+
+        :param file_name: the snapshot file
+        :returns: the `extra_state` that was saved with the snapshot
+        """
+        if self.debug:
+            start_time = timeit.default_timer()
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(file_name, 'rb') as snapshot_file:
+                (state, extra_state) = pickle.load(snapshot_file)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        for attr in Orangeboard.SNAPSHOT_ATTRIBUTES:
+            setattr(self, attr, state[attr])
+        if self.debug:
+            print('Loaded snapshot ' + file_name + ' (' + str(self.count_nodes()) + ' nodes, ' +
+                  str(self.count_rels()) + ' rels) in ' + format(timeit.default_timer() - start_time, '.2f') + ' s')
+        return extra_state
+
+    def merge(self, other):
+        """merges the graph held by the orangeboard `other` (e.g., one shard of a sharded build) into this one
+
+        Nodes are deduplicated by ``(nodetype, name)``. A node that is already in this orangeboard keeps its UUID and
+        seed node, gets any description and properties that only `other` has, and is marked expanded if it was
+        expanded in either; if it is a seed node in `other`, it becomes a seed node here too (as with `add_node`
+        and ``seed_node_bool=True``). A new node keeps the UUID, and the (merged) seed node, that it had in `other`.
+        Relationships are deduplicated as in `add_rel` (the relationship that is already here wins), and new ones
+        keep the (merged) seed node that they had in `other`.
+
+        :param other: an ``Orangeboard`` with the same reltype directions as this one
+        :returns: a ``dict`` mapping each node of `other` to the corresponding node of this orangeboard
+        """
+        if self.dict_reltype_dirs is None:
+            self.set_dict_reltype_dirs(other.dict_reltype_dirs)
+        node_map = dict()
+        new_nodes = []
+        for other_nodes in other.dict_seed_uuid_to_list_nodes.values():
+            for other_node in other_nodes:
+                node = self.get_node(other_node.nodetype, other_node.name)
+                if node is None:
+                    node = Node(other_node.nodetype, other_node.name, None, self.next_node_id)
+                    self.next_node_id += 1
+                    node.uuid = other_node.uuid
+                    node.expanded = other_node.expanded
+                    node.desc = other_node.desc
+                    node.extra_props = dict(other_node.extra_props)
+                    self.dict_nodetype_to_dict_name_to_node.setdefault(node.nodetype, dict())[node.name] = node
+                    new_nodes.append((node, other_node))
+                else:
+                    node.expanded = node.expanded or other_node.expanded
+                    if node.desc == '':
+                        node.desc = other_node.desc
+                    for key, value in other_node.extra_props.items():
+                        node.extra_props.setdefault(key, value)
+                    if other_node.seed_node is other_node and node.seed_node is not node:
+                        self.dict_seed_uuid_to_list_nodes[node.seed_node.uuid].remove(node)
+                        node.seed_node = node
+                        self.dict_seed_uuid_to_list_nodes.setdefault(node.uuid, []).append(node)
+                node_map[other_node] = node
+        # the seed nodes are mapped only once every node is, since a seed node need not come first in its list
+        for node, other_node in new_nodes:
+            node.seed_node = node_map[other_node.seed_node]
+            self.dict_seed_uuid_to_list_nodes.setdefault(node.seed_node.uuid, []).append(node)
+        for other_rels in other.dict_seed_uuid_to_list_rels.values():
+            for other_rel in other_rels:
+                source_node = node_map[other_rel.source_node]
+                target_node = node_map[other_rel.target_node]
+                (existing_rel, rel_dict_key) = self.get_rel(other_rel.reltype, source_node, target_node)
+                if existing_rel is not None:
+                    continue
+                if rel_dict_key is None:
+                    rel_dict_key = Orangeboard.make_rel_dict_int_key(source_node.node_id, target_node.node_id,
+                                                                     self.dict_reltype_dirs[other_rel.reltype])
+                seed_node = node_map[other_rel.seed_node]
+                new_rel = Rel(other_rel.reltype, other_rel.sourcedb, source_node, target_node, seed_node,
+                              other_rel.prob, other_rel.extended_reltype, other_rel.publications)
+                self.dict_reltype_to_dict_relkey_to_rel.setdefault(other_rel.reltype, dict())[rel_dict_key] = new_rel
+                self.dict_seed_uuid_to_list_rels.setdefault(seed_node.uuid, []).append(new_rel)
+        if self.seed_node is None and other.seed_node is not None:
+            self.seed_node = node_map[other.seed_node]
+        return node_map
+
     def neo4j_connect(self):
         assert self.neo4j_url is not None
         assert self.neo4j_user is not None
         assert self.neo4j_password is not None
 
-        self.driver = neo4j.v1.GraphDatabase.driver(self.neo4j_url,
-                                                    auth=(self.neo4j_user,
-                                                          self.neo4j_password))
+        self.driver = self.neo4j_make_driver()
+
+    def neo4j_make_driver(self):
+        return neo4j.v1.GraphDatabase.driver(self.neo4j_url,
+                                             auth=(self.neo4j_user,
+                                                   self.neo4j_password))
+
     # def neo4j_shutdown(self):
     #     """shuts down the Orangeboard by disconnecting from the Neo4j database
     #
@@ -482,30 +691,63 @@ class Orangeboard:
         return res
 
     def neo4j_clear(self, seed_node=None):
-        """deletes all nodes and relationships in the orangeboard
+        """deletes all nodes and relationships in the Neo4j database (or only those of `seed_node`), in transactions
+        of at most `push_batch_size` nodes or relationships; if a `Neo4jStore` was set with `neo4j_set_store`, the
+        whole database is cleared by recreating its store instead
 
         :returns: nothing
         """
+        if seed_node is None and self.neo4j_store is not None:
+            if self.driver is not None:
+                self.driver.close()
+                self.driver = None
+            self.neo4j_store.recreate()
+            self.driver = self.neo4j_store.wait_until_available(self.neo4j_make_driver)
+            return
+        writer = self.neo4j_make_bulk_writer()
         if seed_node is not None:
-            seed_node_uuid = seed_node.uuid
-            cypher_query_middle = ':Base {seed_node_uuid: \'' + seed_node_uuid + '\'}'
+            writer.delete_nodes('(n:Base {seed_node_uuid: $seed_node_uuid})', {'seed_node_uuid': seed_node.uuid})
         else:
-            cypher_query_middle = ''
+            writer.delete_nodes()
 
-        cypher_query = 'MATCH (n' + \
-                       cypher_query_middle + \
-                       ') DETACH DELETE n'
+    def neo4j_set_store(self, store):
+        """sets the `Neo4jStore` that `neo4j_clear` recreates to clear the whole database (``None`` to delete the
+        nodes and relationships instead)"""
+        self.neo4j_store = store
 
-        if self.debug:
-            print(cypher_query)
+    def neo4j_set_push_options(self, batch_size=Neo4jBulkWriter.DEFAULT_BATCH_SIZE,
+                               num_sessions=Neo4jBulkWriter.DEFAULT_NUM_SESSIONS,
+                               max_retries=Neo4jBulkWriter.DEFAULT_MAX_RETRIES):
+        """sets how `neo4j_push` and `neo4j_push_incremental` write to Neo4j
 
-        self.neo4j_run_cypher_query(cypher_query)
+        :param batch_size: maximum number of nodes or relationships written in one transaction
+        :param num_sessions: number of batches written concurrently
+        :param max_retries: number of times a failed batch is retried
+        """
+        self.push_batch_size = batch_size
+        self.push_num_sessions = num_sessions
+        self.push_max_retries = max_retries
+
+    def neo4j_make_bulk_writer(self):
+        # Lazily initialize the driver
+        if self.driver is None:
+            self.neo4j_connect()
+        return Neo4jBulkWriter(self.driver,
+                               batch_size=self.push_batch_size,
+                               num_sessions=self.push_num_sessions,
+                               max_retries=self.push_max_retries,
+                               debug=self.debug)
 
     def neo4j_push(self, seed_node=None):
         assert self.dict_reltype_dirs is not None
 
         self.neo4j_clear()
 
+        writer = self.neo4j_make_bulk_writer()
+
+        # the internal Neo4j id of each node, so that relationships can be created without UUID index lookups
+        dict_uuid_to_neo4j_id = dict()
+
         nodetypes = self.get_all_nodetypes()
         for nodetype in nodetypes:
             if self.debug:
@@ -513,16 +755,14 @@ class Orangeboard:
             nodes = self.get_all_nodes_for_nodetype(nodetype)
             if seed_node is not None:
                 nodes &= self.get_all_nodes_for_seed_node_uuid(seed_node.uuid)
-            query_params = {'props': [node.get_props() for node in nodes]}
-            node = next(iter(nodes))
-            cypher_query_str = 'UNWIND $props as map\nCREATE (n' + \
-                               Orangeboard.make_label_string_from_set(node.get_labels()) + \
-                               ')\nSET n = map'
+            cypher_query_str = 'UNWIND $rows as map\nCREATE (n' + \
+                               Orangeboard.make_label_string_from_set({'Base', nodetype}) + \
+                               ')\nSET n = map\nRETURN map.UUID AS uuid, id(n) AS id'
             if self.debug:
                 print(cypher_query_str)
-            res = self.neo4j_run_cypher_query(cypher_query_str, query_params)
-            if self.debug:
-                print(res.summary().counters)
+            records = writer.write(cypher_query_str, [node.get_props() for node in nodes], 'nodes')
+            for record in records:
+                dict_uuid_to_neo4j_id[record['uuid']] = record['id']
 
         try:
             self.neo4j_run_cypher_query('CREATE INDEX ON :Base(UUID)')
@@ -538,28 +778,249 @@ class Orangeboard:
             rels = self.get_all_rels_for_reltype(reltype)
             if seed_node is not None:
                 rels &= self.get_all_rels_for_seed_node_uuid(seed_node.uuid)
-            reltype_rels_params_list = [rel.get_props() for rel in rels]
+            reltype_rels_params_list = [rel.get_neo4j_props() for rel in rels]
             if not reltype_dir:
                 reltype_rels_params_list = reltype_rels_params_list + \
-                                           [rel.get_props(reverse=True) for rel in rels]
-            query_params = {'rel_data_list': reltype_rels_params_list}
-            cypher_query_str = 'UNWIND $rel_data_list AS rel_data_map\n' + \
-                               'MATCH (n1:Base {UUID: rel_data_map.source_node_uuid}),' + \
-                               '(n2:Base {UUID: rel_data_map.target_node_uuid})\n' + \
-                               'CREATE (n1)-[:`' + reltype + \
-                               '` { source_node_uuid: rel_data_map.source_node_uuid,' + \
-                               ' target_node_uuid: rel_data_map.target_node_uuid,' + \
-                               ' is_defined_by: \'RTX\',' + \
-                               ' provided_by: rel_data_map.sourcedb,' + \
-                               ' predicate: \'' + reltype + '\',' + \
-                               ' seed_node_uuid: rel_data_map.seed_node_uuid,' + \
-                               ' probability: rel_data_map.prob,' + \
-                               ' publications: rel_data_map.publications,' + \
-                               ' relation: rel_data_map.extended_reltype' + \
-                               ' }]->(n2)'
-            res = self.neo4j_run_cypher_query(cypher_query_str, query_params)
+                                           [rel.get_neo4j_props(reverse=True) for rel in rels]
+            # (when pushing a single seed node, relationships to nodes outside of it are skipped)
+            rows = [{'source_id': dict_uuid_to_neo4j_id[rel_props['source_node_uuid']],
+                     'target_id': dict_uuid_to_neo4j_id[rel_props['target_node_uuid']],
+                     'props': rel_props} for rel_props in reltype_rels_params_list
+                    if rel_props['source_node_uuid'] in dict_uuid_to_neo4j_id and
+                    rel_props['target_node_uuid'] in dict_uuid_to_neo4j_id]
+            cypher_query_str = 'UNWIND $rows AS row\n' + \
+                               'MATCH (n1) WHERE id(n1) = row.source_id\n' + \
+                               'MATCH (n2) WHERE id(n2) = row.target_id\n' + \
+                               'CREATE (n1)-[r:`' + reltype + '`]->(n2)\n' + \
+                               'SET r = row.props'
+            writer.write(cypher_query_str, rows, 'rels')
+
+    @staticmethod
+    def make_rel_create_query(reltype):
+        """returns a cypher query that creates one `reltype` relationship for each property map in `$rows`"""
+        return 'UNWIND $rows AS rel_data_map\n' + \
+               'MATCH (n1:Base {UUID: rel_data_map.source_node_uuid}),' + \
+               '(n2:Base {UUID: rel_data_map.target_node_uuid})\n' + \
+               'CREATE (n1)-[r:`' + reltype + '`]->(n2)\n' + \
+               'SET r = rel_data_map'
+
+    @staticmethod
+    def make_neo4j_comparable(props):
+        """drops ``None`` values (which Neo4j does not store) and turns tuples into lists, so that property
+        dicts built in memory can be compared with the ones read back from Neo4j"""
+        return {key: (list(value) if type(value) == tuple else value)
+                for key, value in props.items() if value is not None}
+
+    def set_node_uuids(self, dict_node_key_to_uuid):
+        """replaces the UUIDs of nodes already in the orangeboard, and re-keys the seed-node dictionaries accordingly
+
+        :param dict_node_key_to_uuid: a ``dict`` of (nodetype, name) tuple to the UUID the node should take
+        """
+        dict_old_uuid_to_new_uuid = dict()
+        for (nodetype, name), new_uuid in dict_node_key_to_uuid.items():
+            node = self.get_node(nodetype, name)
+            if node is not None and node.uuid != new_uuid:
+                dict_old_uuid_to_new_uuid[node.uuid] = new_uuid
+                node.uuid = new_uuid
+        if len(dict_old_uuid_to_new_uuid) == 0:
+            return
+        self.dict_seed_uuid_to_list_nodes = {dict_old_uuid_to_new_uuid.get(seed_uuid, seed_uuid): nodes
+                                             for seed_uuid, nodes in self.dict_seed_uuid_to_list_nodes.items()}
+        self.dict_seed_uuid_to_list_rels = {dict_old_uuid_to_new_uuid.get(seed_uuid, seed_uuid): rels
+                                            for seed_uuid, rels in self.dict_seed_uuid_to_list_rels.items()}
+
+    def neo4j_push_incremental(self):
+        """brings the Neo4j database in line with the orangeboard by writing only what differs
+
+        Nodes are matched on (category, rtx_name); matched nodes keep the UUID they already have in Neo4j.
+        Nodes and relationships that are in Neo4j but not in the orangeboard are deleted, new ones are
+        created, and ones whose properties changed are updated in place.
+
+        :returns: a ``dict`` with the number of nodes and relationships created, updated and deleted
+        """
+        assert self.dict_reltype_dirs is not None
+
+        try:
+            self.neo4j_run_cypher_query('CREATE INDEX ON :Base(UUID)')
+            self.neo4j_run_cypher_query('CREATE INDEX ON :Base(seed_node_uuid)')
+        except neo4j.exceptions.ClientError as e:
+            print(str(e), file=sys.stderr)
+
+        # (1) adopt the UUIDs of the nodes that are already in the database
+        dict_node_key_to_existing_props = dict()
+        delete_node_uuids = []
+        res = self.neo4j_run_cypher_query('MATCH (n:Base) RETURN n.category AS category, n.rtx_name AS rtx_name, '
+                                          'properties(n) AS props')
+        for record in res:
+            node_key = (record['category'], record['rtx_name'])
+            if node_key in dict_node_key_to_existing_props or self.get_node(*node_key) is None:
+                delete_node_uuids.append(record['props']['UUID'])
+            else:
+                dict_node_key_to_existing_props[node_key] = record['props']
+        self.set_node_uuids({node_key: props['UUID'] for node_key, props in dict_node_key_to_existing_props.items()})
+
+        # (2) nodes
+        writer = self.neo4j_make_bulk_writer()
+        counts = {'nodes_created': 0, 'nodes_updated': 0, 'nodes_deleted': len(delete_node_uuids),
+                  'rels_created': 0, 'rels_updated': 0, 'rels_deleted': 0}
+        if len(delete_node_uuids) > 0:
+            writer.write('UNWIND $rows AS uuid MATCH (n:Base {UUID: uuid}) DETACH DELETE n',
+                         delete_node_uuids, 'deleted nodes')
+        for nodetype in self.get_all_nodetypes():
+            create_props_list = []
+            update_props_list = []
+            for node in self.get_all_nodes_for_nodetype(nodetype):
+                props = Orangeboard.make_neo4j_comparable(node.get_props())
+                existing_props = dict_node_key_to_existing_props.get((nodetype, node.name), None)
+                if existing_props is None:
+                    create_props_list.append(props)
+                elif Orangeboard.make_neo4j_comparable(existing_props) != props:
+                    update_props_list.append(props)
+            counts['nodes_created'] += len(create_props_list)
+            counts['nodes_updated'] += len(update_props_list)
+            if self.debug:
+                print('Nodes to create/update for node type ' + nodetype + ': ' +
+                      str(len(create_props_list)) + '/' + str(len(update_props_list)))
+            writer.write('UNWIND $rows as map\nCREATE (n' +
+                         Orangeboard.make_label_string_from_set({'Base', nodetype}) +
+                         ')\nSET n = map', create_props_list, 'created nodes')
+            writer.write('UNWIND $rows as map\nMATCH (n:Base {UUID: map.UUID})\nSET n = map',
+                         update_props_list, 'updated nodes')
+
+        # (3) relationships, keyed on (reltype, source UUID, target UUID); undirected ones are stored both ways
+        dict_rel_key_to_props = dict()
+        for reltype in self.get_all_reltypes():
+            reverse_list = [False] if self.dict_reltype_dirs[reltype] else [False, True]
+            for rel in self.get_all_rels_for_reltype(reltype):
+                for reverse in reverse_list:
+                    props = Orangeboard.make_neo4j_comparable(rel.get_neo4j_props(reverse))
+                    dict_rel_key_to_props[(reltype, props['source_node_uuid'], props['target_node_uuid'])] = props
+        delete_rel_ids = []
+        dict_reltype_to_update_list = dict()
+        res = self.neo4j_run_cypher_query('MATCH (n1:Base)-[r]->(n2:Base) RETURN id(r) AS id, type(r) AS reltype, '
+                                          'n1.UUID AS source_uuid, n2.UUID AS target_uuid, properties(r) AS props')
+        for record in res:
+            rel_key = (record['reltype'], record['source_uuid'], record['target_uuid'])
+            props = dict_rel_key_to_props.pop(rel_key, None)
+            if props is None:
+                delete_rel_ids.append(record['id'])
+            elif Orangeboard.make_neo4j_comparable(record['props']) != props:
+                dict_reltype_to_update_list.setdefault(record['reltype'], []).append({'id': record['id'],
+                                                                                      'props': props})
+        writer.write('UNWIND $rows AS rel_id MATCH ()-[r]->() WHERE id(r) = rel_id DELETE r',
+                     delete_rel_ids, 'deleted rels')
+        for update_list in dict_reltype_to_update_list.values():
+            writer.write('UNWIND $rows AS rel_data_map\n'
+                         'MATCH ()-[r]->() WHERE id(r) = rel_data_map.id\n'
+                         'SET r = rel_data_map.props', update_list, 'updated rels')
+        dict_reltype_to_create_list = dict()
+        for (reltype, source_uuid, target_uuid), props in dict_rel_key_to_props.items():
+            dict_reltype_to_create_list.setdefault(reltype, []).append(props)
+        for reltype, create_list in dict_reltype_to_create_list.items():
+            writer.write(Orangeboard.make_rel_create_query(reltype), create_list, 'created rels')
+
+        counts['rels_created'] = len(dict_rel_key_to_props)
+        counts['rels_updated'] = sum(map(len, dict_reltype_to_update_list.values()))
+        counts['rels_deleted'] = len(delete_rel_ids)
+        if self.debug:
+            print('Incremental push: ' + str(counts))
+        return counts
+
+    @staticmethod
+    def get_neo4j_import_type(values):
+        """returns the neo4j-admin import type for a column holding `values` (``None`` values are ignored)"""
+        value_types = {type(value) for value in values if value is not None}
+        if len(value_types) == 0 or value_types == {str}:
+            return 'string'
+        if value_types == {bool}:
+            return 'boolean'
+        if value_types == {int}:
+            return 'long'
+        if value_types <= {int, float}:
+            return 'double'
+        if value_types <= {list, tuple, set}:
+            return 'string[]'
+        return 'string'
+
+    @staticmethod
+    def format_neo4j_import_value(value, import_type):
+        if value is None or import_type in ('long', 'double'):
+            return value
+        if import_type == 'boolean':
+            return 'true' if value else 'false'
+        if import_type == 'string[]':
+            return Orangeboard.NEO4J_IMPORT_ARRAY_DELIMITER.join(str(item) for item in value)
+        return str(value)
+
+    @staticmethod
+    def write_neo4j_import_csv(file_name, props_list, id_columns, extra_columns):
+        """writes one neo4j-admin import CSV file
+
+        :param file_name: the CSV file to write
+        :param props_list: a ``list`` of property ``dict`` objects, one per row
+        :param id_columns: a ``list`` of (header, key) pairs written first, without a type (e.g., ``('UUID:ID', 'UUID')``)
+        :param extra_columns: a ``list`` of (header, value) pairs with the same value in every row (e.g., ``(':LABEL', 'Base;protein')``)
+        """
+        # a `key:ID` column already stores the id as property `key`
+        id_keys = {key for header, key in id_columns if header == key + ':ID'}
+        prop_keys = sorted({key for props in props_list for key in props.keys()} - id_keys)
+        prop_types = {key: Orangeboard.get_neo4j_import_type([props.get(key, None) for props in props_list])
+                      for key in prop_keys}
+        header = [header for header, key in id_columns] + \
+                 [key + ':' + prop_types[key] for key in prop_keys] + \
+                 [header for header, value in extra_columns]
+        with open(file_name, 'w') as csv_file:
+            csv_file.write(','.join(Orangeboard.quote_neo4j_import_field(column) for column in header) + '\n')
+            for props in props_list:
+                row = [props[key] for header, key in id_columns] + \
+                      [Orangeboard.format_neo4j_import_value(props.get(key, None), prop_types[key])
+                       for key in prop_keys] + \
+                      [value for header, value in extra_columns]
+                csv_file.write(','.join(Orangeboard.quote_neo4j_import_field(field) for field in row) + '\n')
+
+    @staticmethod
+    def quote_neo4j_import_field(field):
+        """quotes every string, so that an empty string stays an empty string while a missing value (``None``,
+        written as an unquoted empty field) means that the property is not set"""
+        if field is None:
+            return ''
+        if type(field) in (int, float):
+            return str(field)
+        return '"' + str(field).replace('"', '""') + '"'
+
+    def export_neo4j_import_csv(self, output_dir):
+        """writes the orangeboard as CSV files for the offline Neo4j bulk importer (`neo4j-admin import`), one file
+        per node type and one per relationship type; undirected relationships are written in both directions, as
+        `neo4j_push` stores them
+
+        :param output_dir: the directory in which to write the CSV files (created if it does not exist)
+        :returns: the `neo4j-admin import` command line that loads the files into an empty database
+        """
+        assert self.dict_reltype_dirs is not None
+        os.makedirs(output_dir, exist_ok=True)
+        command_args = ['neo4j-admin', 'import', '--id-type=STRING', '--multiline-fields=true']
+        for nodetype in sorted(self.get_all_nodetypes()):
+            file_name = os.path.join(output_dir, 'nodes_' + nodetype + '.csv')
+            props_list = [node.get_props() for node in self.dict_nodetype_to_dict_name_to_node[nodetype].values()]
+            Orangeboard.write_neo4j_import_csv(file_name, props_list,
+                                               [('UUID:ID', 'UUID')],
+                                               [(':LABEL', 'Base;' + nodetype)])
+            command_args.append('--nodes=' + file_name)
+            if self.debug:
+                print('Exported ' + str(len(props_list)) + ' nodes to ' + file_name)
+        for reltype in sorted(self.get_all_reltypes()):
+            file_name = os.path.join(output_dir, 'rels_' + reltype + '.csv')
+            rels = self.dict_reltype_to_dict_relkey_to_rel[reltype].values()
+            props_list = [rel.get_neo4j_props() for rel in rels]
+            if not self.dict_reltype_dirs[reltype]:
+                props_list += [rel.get_neo4j_props(reverse=True) for rel in rels]
+            Orangeboard.write_neo4j_import_csv(file_name, props_list,
+                                               [(':START_ID', 'source_node_uuid'), (':END_ID', 'target_node_uuid')],
+                                               [(':TYPE', reltype)])
+            command_args.append('--relationships=' + file_name)
             if self.debug:
-                print(res.summary().counters)
+                print('Exported ' + str(len(props_list)) + ' relationships to ' + file_name)
+        return ' '.join(command_args)
 
     def test_issue_66():
         ob = Orangeboard(debug=True)
@@ -57,13 +57,8 @@ class PatchKG:
         t = time()
 
         print("relations count = " + str(len(array)))
-        nodes_nums = len(array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.create_disease_has_phenotype(array[start:end])
+        # written in batches by Neo4jConnection
+        conn.create_disease_has_phenotype(array)
 
         print("time for creating relations: %f" % (time() - t))
         t = time()
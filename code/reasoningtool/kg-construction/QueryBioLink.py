@@ -23,6 +23,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import sys
 import json
@@ -56,7 +57,7 @@ class QueryBioLink:
         url = QueryBioLink.API_BASE_URL + '/' + handler
         
         try:
-            res = requests.get(url, timeout=QueryBioLink.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryBioLink.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryBioLink for URL: ' + url, file=sys.stderr)
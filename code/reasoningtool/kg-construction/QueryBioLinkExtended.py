@@ -16,6 +16,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import sys
 import json
@@ -37,7 +38,7 @@ class QueryBioLinkExtended:
         url = QueryBioLinkExtended.API_BASE_URL + '/' + handler
 
         try:
-            res = requests.get(url, timeout=QueryBioLinkExtended.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryBioLinkExtended.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryBioLink for URL: ' + url, file=sys.stderr)
@@ -17,6 +17,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import sys
 import urllib.parse
@@ -58,7 +59,7 @@ class QueryCOHD:
         url = QueryCOHD.API_BASE_URL + '/' + handler + '?' + url_suffix
         
         try:
-            res = requests.get(url, timeout=QueryCOHD.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryCOHD.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryCOHD for URL: ' + url, file=sys.stderr)
@@ -12,6 +12,7 @@ __status__ = 'Prototype'
 
 import urllib
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import sys
 
@@ -26,7 +27,7 @@ class QueryChEMBL:
         url = QueryChEMBL.API_BASE_URL + '/' + handler + '?' + url_suffix
 #        print(url)
         try:
-            res = requests.get(url,
+            res = HTTPClient.get_instance().get(url,
                                timeout=QueryChEMBL.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
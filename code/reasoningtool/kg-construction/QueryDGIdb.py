@@ -1,5 +1,6 @@
-"""This module defines the class QueryDGIdb which downloads and reads the
-interactions.tsv file from the DGIdb database (http://www.dgidb.org/downloads)
+"""This module defines the class QueryDGIdb which reads the drug-protein
+interactions of the DGIdb database (http://www.dgidb.org/downloads) from a
+local `DGIdbSnapshot` of its interactions.tsv file
 
 """
 
@@ -12,16 +13,14 @@ __maintainer__ = 'Stephen Ramsey'
 __email__ = 'stephen.ramsey@oregonstate.edu'
 __status__ = 'Prototype'
 
-import pandas
 import sys
+from DGIdbSnapshot import DGIdbSnapshot
 from QueryMyGene import QueryMyGene
 from QueryPubChem import QueryPubChem
 from QueryChEMBL import QueryChEMBL
 
 
 class QueryDGIdb:
-    INTERACTIONS_TSV_URL = 'http://www.dgidb.org/data/interactions.tsv'
-
     mygene = QueryMyGene()
 
     predicate_map = {'inhibitor':                       'negatively_regulates',
@@ -50,10 +49,43 @@ class QueryDGIdb:
                      'affects':                         'affects'}
 
     def read_interactions():
-        int_data = pandas.read_csv(QueryDGIdb.INTERACTIONS_TSV_URL, sep='\t')
-        int_data.fillna('', inplace=True)
+        """
+        :returns: a ``list`` of all of the drug-protein interactions in the DGIdb snapshot (see
+        `read_interactions_in_batches`)
+        """
+        return [interaction for interactions in QueryDGIdb.read_interactions_in_batches()
+                for interaction in interactions]
+
+    def read_interactions_in_batches(batch_size=DGIdbSnapshot.DEFAULT_BATCH_SIZE):
+        """refreshes the local DGIdb snapshot if the upstream file has changed, and yields its drug-protein
+        interactions one batch at a time, so that they need not all be in memory at once
+
+        :param batch_size: the number of rows of the interactions file per batch
+        :returns: a generator of ``list``s of interaction ``dict``s
+        """
+        snapshot = DGIdbSnapshot.get_instance()
+        snapshot.refresh()
+        for rows in snapshot.iterate_rows(batch_size):
+            yield QueryDGIdb.make_interactions(rows)
+
+    def get_interactions_for_gene(gene_symbol):
+        """returns the interactions of the gene `gene_symbol` in the DGIdb snapshot (without refreshing it)"""
+        return QueryDGIdb.make_interactions(DGIdbSnapshot.get_instance().get_rows_for_gene(gene_symbol))
+
+    def get_interactions_for_drug(drug_chembl_id):
+        """returns the interactions of the drug `drug_chembl_id` in the DGIdb snapshot (without refreshing it)"""
+        return QueryDGIdb.make_interactions(DGIdbSnapshot.get_instance().get_rows_for_drug(drug_chembl_id))
+
+    def make_interactions(rows):
+        """
+        :param rows: rows of the DGIdb snapshot
+        :returns: a ``list`` of drug-protein interaction ``dict``s for `rows`
+        """
+        # resolve the gene symbols of the rows in a few batch queries, instead of one query per interaction
+        gene_symbols_to_uniprot_ids = QueryDGIdb.mygene.convert_gene_symbols_to_uniprot_ids(
+            set(row['gene_symbol'] for row in rows) - {''})
         res_list = []
-        for index, row in int_data.iterrows():
+        for row in rows:
             pmids = row['PMIDs']
             gene_name = row['gene_name']
             gene_claim_name = row['gene_claim_name']
@@ -65,7 +97,7 @@ class QueryDGIdb:
                 else:
                     continue
             assert ',' not in gene_symbol
-            uniprot_ids_set = QueryDGIdb.mygene.convert_gene_symbol_to_uniprot_id(gene_symbol)
+            uniprot_ids_set = gene_symbols_to_uniprot_ids.get(gene_symbol, set())
             if len(uniprot_ids_set) == 0:
                 continue
 
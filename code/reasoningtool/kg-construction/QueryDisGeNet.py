@@ -19,6 +19,7 @@ import pandas
 import io
 import math
 import requests
+from HTTPClient import HTTPClient
 import sys
 import functools
 import CachedMethods
@@ -65,7 +66,7 @@ class QueryDisGeNet:
         url_str = QueryDisGeNet.SPARQL_ENDPOINT_URL
 
         try:
-            res = requests.post(url_str, data=binary_data, timeout=QueryDisGeNet.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().post(url_str, data=binary_data, timeout=QueryDisGeNet.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url_str, sys.stderr)
             print('Timeout in QueryDisGeNet for URL: ' + url_str, file=sys.stderr)
@@ -12,6 +12,7 @@ __email__ = ""
 __status__ = "Prototype"
 
 import requests
+from HTTPClient import HTTPClient
 import sys
 
 class QueryDisont:
@@ -23,7 +24,7 @@ class QueryDisont:
         url = QueryDisont.API_BASE_URL + "/" + handler + "/" + url_suffix
 #        print(url_str)
         try:
-            res = requests.get(url, headers={'accept': 'application/json'}, timeout=QueryDisont.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, headers={'accept': 'application/json'}, timeout=QueryDisont.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryDisont for URL: ' + url, file=sys.stderr)
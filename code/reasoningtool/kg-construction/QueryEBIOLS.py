@@ -8,11 +8,10 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
-import requests_cache
+from HTTPClient import HTTPClient
 import urllib.parse
 import sys
 import json
-import time
 
 class QueryEBIOLS:
     TIMEOUT_SEC = 120
@@ -31,14 +30,12 @@ class QueryEBIOLS:
         url_str = QueryEBIOLS.API_BASE_URL + '/' + handler + "/" + url_suffix
 #        print(url_str)
         try:
-            res = requests.get(url_str, headers={'Accept': 'application/json'}, timeout=QueryEBIOLS.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url_str, headers={'Accept': 'application/json'}, timeout=QueryEBIOLS.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print('HTTP timeout in QueryNCBIeUtils.py; URL: ' + url_str, file=sys.stderr)
-            time.sleep(1)  # take a timeout because NCBI rate-limits connections
             return None
         except requests.exceptions.ConnectionError:
             print('HTTP connection error in QueryNCBIeUtils.py; URL: ' + url_str, file=sys.stderr)
-            time.sleep(1)  # take a timeout because NCBI rate-limits connections
             return None
         status_code = res.status_code
         if status_code != 200:
@@ -108,7 +105,7 @@ class QueryEBIOLS:
         url = QueryEBIOLS.API_BASE_URL + '/' + handler
         # print(url)
         try:
-            res = requests.get(url, timeout=QueryEBIOLS.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryEBIOLS.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryEBIOLSExtended for URL: ' + url, file=sys.stderr)
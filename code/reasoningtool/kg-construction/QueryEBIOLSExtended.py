@@ -16,6 +16,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import urllib.parse
 import sys
@@ -40,7 +41,7 @@ class QueryEBIOLSExtended:
         url = QueryEBIOLSExtended.API_BASE_URL + '/' + handler
         # print(url)
         try:
-            res = requests.get(url, timeout=QueryEBIOLSExtended.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryEBIOLSExtended.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryEBIOLSExtended for URL: ' + url, file=sys.stderr)
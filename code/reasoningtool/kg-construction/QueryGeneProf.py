@@ -13,6 +13,7 @@ __email__ = ""
 __status__ = "Prototype"
 
 import requests
+from HTTPClient import HTTPClient
 import sys
 
 class QueryGeneProf:
@@ -24,7 +25,7 @@ class QueryGeneProf:
         url_str = QueryGeneProf.API_BASE_URL + "/" + handler + "/" + url_suffix
 #        print(url_str)
         try:
-            res = requests.get(url_str, timeout=QueryGeneProf.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url_str, timeout=QueryGeneProf.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print("Timeout in QueryGeneProf for URL: " + url_str, file=sys.stderr)
             return None
@@ -17,6 +17,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import sys
 import xmltodict
@@ -31,7 +32,7 @@ class QueryHMDB:
         url = url + '.xml'
 
         try:
-            res = requests.get(url, timeout=QueryHMDB.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryHMDB.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryHMDB for URL: ' + url, file=sys.stderr)
@@ -18,6 +18,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import sys
 
@@ -38,7 +39,7 @@ class QueryKEGG:
         url = base_url + '/' + handler
 
         try:
-            res = requests.get(url, timeout=QueryKEGG.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryKEGG.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryKEGG for URL: ' + url, file=sys.stderr)
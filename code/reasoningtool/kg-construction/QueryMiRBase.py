@@ -13,6 +13,7 @@ __email__ = ""
 __status__ = "Prototype"
 
 import requests
+from HTTPClient import HTTPClient
 import lxml.html
 import functools
 import CachedMethods
@@ -25,7 +26,7 @@ class QueryMiRBase:
     def send_query_get(handler, url_suffix):
         url_str = QueryMiRBase.API_BASE_URL + "/" + handler + "?" + url_suffix
 #        print(url_str)
-        res = requests.get(url_str, headers={'accept': 'application/json'})
+        res = HTTPClient.get_instance().get(url_str, headers={'accept': 'application/json'})
         status_code = res.status_code
         assert status_code == 200
         return res
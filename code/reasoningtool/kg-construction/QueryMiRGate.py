@@ -14,6 +14,7 @@ __status__ = 'Prototype'
 
 
 import requests
+from HTTPClient import HTTPClient
 import lxml.etree
 import sys
 
@@ -26,7 +27,7 @@ class QueryMiRGate:
         url_str = QueryMiRGate.API_BASE_URL + "/" + handler + "/" + url_suffix
 #        print(url_str)
         try:
-            res = requests.get(url_str, headers={'accept': 'application/json'},
+            res = HTTPClient.get_instance().get(url_str, headers={'accept': 'application/json'},
                                timeout=QueryMiRGate.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url_str, file=sys.stderr)
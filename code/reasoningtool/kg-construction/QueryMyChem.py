@@ -15,6 +15,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import sys
 import json
@@ -35,7 +36,7 @@ class QueryMyChem:
 
         url = QueryMyChem.API_BASE_URL + '/' + handler
         try:
-            res = requests.get(url, timeout=QueryMyChem.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryMyChem.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryMyChem for URL: ' + url, file=sys.stderr)
@@ -96,7 +97,7 @@ class QueryMyChem:
         url = QueryMyChem.API_BASE_URL + '/' + handler
 
         try:
-            res = requests.get(url, timeout=QueryMyChem.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryMyChem.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryMyChem for URL: ' + url, file=sys.stderr)
@@ -127,7 +128,7 @@ class QueryMyChem:
         url = QueryMyChem.API_BASE_URL + '/' + handler
 
         try:
-            res = requests.get(url, timeout=QueryMyChem.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryMyChem.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryMyChem for URL: ' + url, file=sys.stderr)
@@ -17,11 +17,21 @@ import sys
 import requests
 import json
 import requests_cache
+import CachedMethods
+from HTTPClient import HTTPClient
+from UpstreamStats import UpstreamStats
 
 
 class QueryMyGene:
+    QUERYMANY_CHUNK_SIZE = 1000  # the most identifiers that MyGene.info accepts in one batch query
+    # room for the results of batch conversions, which are shared with the single-identifier caches
+    ID_CONVERSION_CACHE_MAXSIZE = 100000
+
     def __init__(self, debug=False):
-        self.mygene_obj = mygene.MyGeneInfo()
+        mygene_obj = mygene.MyGeneInfo()
+        # the mygene client sends its own requests, so it waits for the `HTTPClient` rate limiters explicitly
+        self.mygene_obj = UpstreamStats.instrument_client(
+            mygene_obj, 'mygene.info', before_call=lambda: HTTPClient.get_instance().throttle(mygene_obj.url))
         self.debug = debug
 
     ONT_NAME_TO_SIMPLE_NODE_TYPE = {'BP': 'biological_process',
@@ -43,6 +53,7 @@ class QueryMyGene:
 
         return list(generate_elements(lst, skip_type))
 
+    @CachedMethods.register(skip_self=True, maxsize=ID_CONVERSION_CACHE_MAXSIZE)
     def convert_gene_symbol_to_uniprot_id(self, gene_symbol):
         try:
             res = self.mygene_obj.query('symbol:' + gene_symbol, species='human',
@@ -66,6 +77,7 @@ class QueryMyGene:
             uniprot_ids_set = set(uniprot_ids_list)
         return uniprot_ids_set
 
+    @CachedMethods.register(skip_self=True, maxsize=ID_CONVERSION_CACHE_MAXSIZE)
     def convert_uniprot_id_to_gene_symbol(self, uniprot_id):
         try:
             res = self.mygene_obj.query('uniprot:' + uniprot_id, species='human',
@@ -83,6 +95,7 @@ class QueryMyGene:
             gene_symbol = set([hit["symbol"] for hit in res_hits])
         return gene_symbol
 
+    @CachedMethods.register(skip_self=True, maxsize=ID_CONVERSION_CACHE_MAXSIZE)
     def convert_uniprot_id_to_entrez_gene_ID(self, uniprot_id):
         try:
             res = self.mygene_obj.query('uniprot:' + uniprot_id, species='human',
@@ -103,6 +116,7 @@ class QueryMyGene:
                 print("QueryMyGene.convert_uniprot_id_to_entrez_gene_ID: no \'hits\' result data for uniprot_id: " + uniprot_id, file=sys.stderr)
         return entrez_ids
 
+    @CachedMethods.register(skip_self=True)
     def convert_hgnc_gene_id_to_uniprot_id(self, hgnc_id):
         uniprot_ids = set()
         try:
@@ -123,6 +137,7 @@ class QueryMyGene:
                             uniprot_ids.union(uniprot_id)
         return uniprot_ids
     
+    @CachedMethods.register(skip_self=True, maxsize=ID_CONVERSION_CACHE_MAXSIZE)
     def convert_gene_symbol_to_entrez_gene_ID(self, gene_symbol):
         entrez_ids = set()
         try:
@@ -139,6 +154,7 @@ class QueryMyGene:
                     entrez_ids.add(entrez_id)
         return entrez_ids
 
+    @CachedMethods.register(skip_self=True, maxsize=ID_CONVERSION_CACHE_MAXSIZE)
     def convert_entrez_gene_id_to_uniprot_id(self, entrez_gene_id):
         assert type(entrez_gene_id) == int
         uniprot_id = set()
@@ -163,6 +179,7 @@ class QueryMyGene:
                                         uniprot_id.add(uniprot_id_item)
         return uniprot_id
     
+    @CachedMethods.register(skip_self=True)
     def convert_entrez_gene_ID_to_mirbase_ID(self, entrez_gene_id):
         assert type(entrez_gene_id) == int
         mirbase_id = set()
@@ -183,6 +200,111 @@ class QueryMyGene:
                               str(entrez_gene_id), file=sys.stderr)
         return mirbase_id
 
+    @staticmethod
+    def get_uniprot_ids_from_hit(hit):
+        uniprot_hit = hit.get('uniprot', None)
+        if uniprot_hit is None:
+            return set()
+        uniprot_id = uniprot_hit.get('Swiss-Prot', None)
+        if uniprot_id is None:
+            return set()
+        return set(QueryMyGene.unnest([uniprot_id], str))
+
+    @staticmethod
+    def get_gene_symbols_from_hit(hit):
+        gene_symbol = hit.get('symbol', None)
+        return {gene_symbol} if gene_symbol is not None else set()
+
+    @staticmethod
+    def get_entrez_gene_ids_from_hit(hit):
+        entrez_id = hit.get('entrezgene', None)
+        return {entrez_id} if entrez_id is not None else set()
+
+    def convert_many(self, ids, scope, field, get_values_from_hit, cached_method):
+        """converts many identifiers at once with MyGene batch queries, of at most `QUERYMANY_CHUNK_SIZE` identifiers
+        each, and shares the results with the cache of the equivalent single-identifier method; identifiers that
+        MyGene does not know are cached with an empty result, but those in a chunk whose query failed are neither
+        cached nor returned, so that a failure is never mistaken for "no mapping"
+
+        :param ids: an iterable of identifiers
+        :param scope: the MyGene field to search the identifiers in (e.g., ``'symbol'``)
+        :param field: the MyGene field to return (e.g., ``'uniprot'``)
+        :param get_values_from_hit: a function that returns the ``set`` of converted identifiers in one MyGene hit
+        :param cached_method: the single-identifier conversion method (e.g., `convert_gene_symbol_to_uniprot_id`)
+        :returns: a ``dict`` from each identifier to its ``set`` of converted identifiers (without the identifiers whose
+        query failed)
+        """
+        res_dict = dict()
+        missing_ids = []
+        for id in set(ids):
+            hit, value = cached_method.cache_lookup(self, id)
+            if hit:
+                res_dict[id] = value
+            else:
+                missing_ids.append(id)
+        for start in range(0, len(missing_ids), QueryMyGene.QUERYMANY_CHUNK_SIZE):
+            chunk_ids = missing_ids[start:start + QueryMyGene.QUERYMANY_CHUNK_SIZE]
+            try:
+                res = self.mygene_obj.querymany(chunk_ids, scopes=scope, species='human', fields=field,
+                                                verbose=False)
+            except requests.exceptions.HTTPError:
+                print('HTTP error in mygene_obj.querymany for ' + str(len(chunk_ids)) + ' identifiers in scope: ' +
+                      scope, file=sys.stderr)
+                continue
+            # MyGene echoes each query as a string
+            query_to_id = {str(id): id for id in chunk_ids}
+            chunk_res_dict = {id: set() for id in chunk_ids}
+            for hit in res:
+                id = query_to_id.get(hit.get('query', None), None)
+                if id is not None and not hit.get('notfound', False):
+                    chunk_res_dict[id] |= get_values_from_hit(hit)
+            for id, values in chunk_res_dict.items():
+                cached_method.cache_store(values, self, id)
+            res_dict.update(chunk_res_dict)
+        return res_dict
+
+    def convert_gene_symbols_to_uniprot_ids(self, gene_symbols):
+        """batch version of `convert_gene_symbol_to_uniprot_id`
+
+        :returns: a ``dict`` from each gene symbol to its ``set`` of Swiss-Prot IDs
+        """
+        return self.convert_many(gene_symbols, 'symbol', 'uniprot', QueryMyGene.get_uniprot_ids_from_hit,
+                                 QueryMyGene.convert_gene_symbol_to_uniprot_id)
+
+    def convert_uniprot_ids_to_gene_symbols(self, uniprot_ids):
+        """batch version of `convert_uniprot_id_to_gene_symbol`
+
+        :returns: a ``dict`` from each UniProt ID to its ``set`` of gene symbols
+        """
+        return self.convert_many(uniprot_ids, 'uniprot', 'symbol', QueryMyGene.get_gene_symbols_from_hit,
+                                 QueryMyGene.convert_uniprot_id_to_gene_symbol)
+
+    def convert_uniprot_ids_to_entrez_gene_IDs(self, uniprot_ids):
+        """batch version of `convert_uniprot_id_to_entrez_gene_ID`
+
+        :returns: a ``dict`` from each UniProt ID to its ``set`` of Entrez gene IDs
+        """
+        return self.convert_many(uniprot_ids, 'uniprot', 'entrezgene', QueryMyGene.get_entrez_gene_ids_from_hit,
+                                 QueryMyGene.convert_uniprot_id_to_entrez_gene_ID)
+
+    def convert_gene_symbols_to_entrez_gene_IDs(self, gene_symbols):
+        """batch version of `convert_gene_symbol_to_entrez_gene_ID`
+
+        :returns: a ``dict`` from each gene symbol to its ``set`` of Entrez gene IDs
+        """
+        return self.convert_many(gene_symbols, 'symbol', 'entrezgene', QueryMyGene.get_entrez_gene_ids_from_hit,
+                                 QueryMyGene.convert_gene_symbol_to_entrez_gene_ID)
+
+    def convert_entrez_gene_ids_to_uniprot_ids(self, entrez_gene_ids):
+        """batch version of `convert_entrez_gene_id_to_uniprot_id`
+
+        :param entrez_gene_ids: an iterable of ``int`` Entrez gene IDs
+        :returns: a ``dict`` from each Entrez gene ID to its ``set`` of Swiss-Prot IDs
+        """
+        return self.convert_many(entrez_gene_ids, 'entrezgene', 'uniprot', QueryMyGene.get_uniprot_ids_from_hit,
+                                 QueryMyGene.convert_entrez_gene_id_to_uniprot_id)
+
+    @CachedMethods.register(skip_self=True)
     def get_gene_ontology_ids_bp_for_uniprot_id(self, uniprot_id):
         assert type(uniprot_id) == str
         res = dict()
@@ -205,6 +327,7 @@ class QueryMyGene:
                                     res.update(res_add)
         return res
     
+    @CachedMethods.register(skip_self=True)
     def get_gene_ontology_ids_for_uniprot_id(self, uniprot_id):
         assert type(uniprot_id) == str
         res = dict()
@@ -230,6 +353,7 @@ class QueryMyGene:
                                                          'ont': ont_name_simple_node_type}})
         return res
 
+    @CachedMethods.register(skip_self=True)
     def get_gene_ontology_ids_bp_for_entrez_gene_id(self, entrez_gene_id):
         assert type(entrez_gene_id) == int
         q_res = self.mygene_obj.query('entrezgene:' + str(entrez_gene_id), species='human', fields='go', verbose=False)
@@ -248,6 +372,7 @@ class QueryMyGene:
                                     res.update(res_add)
         return res
 
+    @CachedMethods.register(skip_self=True)
     def uniprot_id_is_human(self, uniprot_id_str):
         res_json = self.mygene_obj.query("uniprot:" + uniprot_id_str, species="human", verbose=False)
         hits = res_json.get("hits", None)
@@ -329,6 +454,7 @@ class QueryMyGene:
         return desc
 
 
+    @CachedMethods.register(skip_self=True)
     def get_protein_name(self, protein_id):
         if not isinstance(protein_id, str):
             return "None"
@@ -8,6 +8,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import urllib
 import math
 import sys
@@ -16,8 +17,6 @@ from io import StringIO
 import re
 import pandas
 import CachedMethods
-import requests_cache
-requests_cache.install_cache('QueryNCBIeUtilsCache')
 import numpy
 
 # MeSH Terms for Q1 diseases: (see git/q1/README.md)
@@ -60,14 +59,12 @@ class QueryNCBIeUtils:
         url_str = QueryNCBIeUtils.API_BASE_URL + '/' + handler + '?' + url_suffix + '&retmode=json&retmax=' + str(retmax)
 #        print(url_str)
         try:
-            res = requests.get(url_str, headers={'accept': 'application/json'}, timeout=QueryNCBIeUtils.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url_str, headers={'accept': 'application/json'}, timeout=QueryNCBIeUtils.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print('HTTP timeout in QueryNCBIeUtils.py; URL: ' + url_str, file=sys.stderr)
-            time.sleep(1)  ## take a timeout because NCBI rate-limits connections
             return None
         except requests.exceptions.ConnectionError:
             print('HTTP connection error in QueryNCBIeUtils.py; URL: ' + url_str, file=sys.stderr)
-            time.sleep(1)  ## take a timeout because NCBI rate-limits connections
             return None
         status_code = res.status_code
         if status_code != 200:
@@ -83,14 +80,13 @@ class QueryNCBIeUtils:
         params['retmode'] = 'json'
 #        print(url_str)
         try:
-            res = requests.post(url_str, headers={'accept': 'application/json'}, data = params, timeout=QueryNCBIeUtils.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().post(url_str, headers={'accept': 'application/json'}, data = params, timeout=QueryNCBIeUtils.TIMEOUT_SEC,
+                                                 cache=True)
         except requests.exceptions.Timeout:
             print('HTTP timeout in QueryNCBIeUtils.py; URL: ' + url_str, file=sys.stderr)
-            time.sleep(1)  ## take a timeout because NCBI rate-limits connections
             return None
         except requests.exceptions.ConnectionError:
             print('HTTP connection error in QueryNCBIeUtils.py; URL: ' + url_str, file=sys.stderr)
-            time.sleep(1)  ## take a timeout because NCBI rate-limits connections
             return None
         status_code = res.status_code
         if status_code != 200:
@@ -538,7 +534,7 @@ class QueryNCBIeUtils:
         if "UniProtKB:" in id:
             id = ":".join(id.split(":")[1:])
         url = 'https://www.uniprot.org/uniprot/?query=id:' + id + '&sort=score&columns=entry name,protein names,genes&format=tab' # hardcoded url for uniprot data
-        r = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})  # send get request
+        r = HTTPClient.get_instance().get(url, headers={'User-Agent': 'Mozilla/5.0'})  # send get request
         if r.status_code != 200:  # checks for error
             print('HTTP response status code: ' + str(r.status_code) + ' for URL:\n' + url, file=sys.stderr)
             return None
@@ -583,7 +579,7 @@ class QueryNCBIeUtils:
         if "REACT:" in id:
             id = ":".join(id.split(":")[1:])
         url = 'https://reactome.org/ContentService/data/query/'+id+'/name'  # hardcoded url for reactiome names
-        r = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})  # sends get request that returns a string
+        r = HTTPClient.get_instance().get(url, headers={'User-Agent': 'Mozilla/5.0'})  # sends get request that returns a string
         if r.status_code != 200:
             print('HTTP response status code: ' + str(r.status_code) + ' for URL:\n' + url, file=sys.stderr)
             return None
@@ -14,6 +14,7 @@ __status__ = "Prototype"
 
 import sys
 import requests
+from HTTPClient import HTTPClient
 # import CachedMethods
 import requests_cache
 
@@ -26,7 +27,7 @@ class QueryOMIM:
         url = QueryOMIM.API_BASE_URL + "/apiKey"
         session_data = {'apiKey': QueryOMIM.API_KEY,
                         'format': 'json'}
-        r = requests.post(url, data=session_data)
+        r = HTTPClient.get_instance().post(url, data=session_data)
         assert 200 == r.status_code
         self.cookie = r.cookies
 
@@ -36,7 +37,7 @@ class QueryOMIM:
                                                                               url_suffix=url_suffix)
 #        print(url)
         try:
-            res = requests.get(url, cookies=self.cookie)
+            res = HTTPClient.get_instance().get(url, cookies=self.cookie)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print("Timeout in QueryOMIM for URL: " + url, file=sys.stderr)
@@ -14,6 +14,7 @@ __status__ = "Prototype"
 
 import sys
 import requests
+from HTTPClient import HTTPClient
 # import CachedMethods
 import requests_cache
 import json
@@ -27,7 +28,7 @@ class QueryOMIMExtended:
         url = QueryOMIMExtended.API_BASE_URL + "/apiKey"
         session_data = {'apiKey': QueryOMIMExtended.API_KEY,
                         'format': 'json'}
-        r = requests.post(url, data=session_data)
+        r = HTTPClient.get_instance().post(url, data=session_data)
         assert 200 == r.status_code
         self.cookie = r.cookies
 
@@ -37,7 +38,7 @@ class QueryOMIMExtended:
                                                                               url_suffix=url_suffix)
         #print(url)
         try:
-            res = requests.get(url, cookies=self.cookie)
+            res = HTTPClient.get_instance().get(url, cookies=self.cookie)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print("Timeout in QueryOMIM for URL: " + url, file=sys.stderr)
@@ -12,6 +12,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 
 class QueryPC2:
     TIMEOUT_SEC = 120
@@ -22,7 +23,7 @@ class QueryPC2:
         url_str = QueryPC2.API_BASE_URL + "/" + handler + "?" + url_suffix
 #        print(url_str)
         try:
-            res = requests.get(url_str, timeout=QueryPC2.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url_str, timeout=QueryPC2.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             # print(url, file=sys.stderr)
             # print('Timeout in QueryPC2 for URL: ' + url, file=sys.stderr)
@@ -13,6 +13,7 @@ __email__ = ""
 __status__ = "Prototype"
 
 import requests
+from HTTPClient import HTTPClient
 import CachedMethods
 
 
@@ -24,7 +25,7 @@ class QueryPharos:
     def send_query_get(entity, url_suffix):
         url_str = QueryPharos.API_BASE_URL + "/" + entity + url_suffix
         #print(url_str)
-        res = requests.get(url_str, headers={'accept': 'application/json'})
+        res = HTTPClient.get_instance().get(url_str, headers={'accept': 'application/json'})
         status_code = res.status_code
         #print("Status code="+str(status_code))
         assert status_code in [200, 404]
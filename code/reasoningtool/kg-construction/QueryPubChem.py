@@ -10,6 +10,7 @@ __status__ = 'Prototype'
 import urllib
 import pandas
 import requests
+from HTTPClient import HTTPClient
 import sys
 import time
 import math
@@ -34,7 +35,7 @@ class QueryPubChem:
         url = QueryPubChem.API_BASE_URL + '/' + handler
         # print(url)
         try:
-            res = requests.get(url, timeout=QueryPubChem.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryPubChem.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryPubChem for URL: ' + url, file=sys.stderr)
@@ -57,7 +58,7 @@ class QueryPubChem:
         url = QueryPubChem.API_BASE_URL + '/' + handler + '/' + url_suffix
         # print(url)
         try:
-            res = requests.get(url,
+            res = HTTPClient.get_instance().get(url,
                                timeout=QueryPubChem.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
@@ -129,7 +130,7 @@ class QueryPubChem:
 
         url = 'https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/cid/' + str(pubchem_id) + '/xrefs/PubMedID/JSON'
         try:
-            r = requests.get(url, timeout=10)
+            r = HTTPClient.get_instance().get(url, timeout=10)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryPubChem for URL: ' + url, file=sys.stderr)
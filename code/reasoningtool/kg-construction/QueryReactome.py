@@ -13,6 +13,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import sys
 import re
 import requests_cache
@@ -73,7 +74,7 @@ class QueryReactome:
         url_str = QueryReactome.API_BASE_URL + '/' + handler + '/' + url_suffix
 #        print(url_str)
         try:
-            res = requests.get(url_str, headers={'accept': 'application/json'},
+            res = HTTPClient.get_instance().get(url_str, headers={'accept': 'application/json'},
                                timeout=QueryReactome.TIMEOUT_SEC)
         except KeyboardInterrupt:
             sys.exit(0)
@@ -223,7 +224,7 @@ class QueryReactome:
         url = QueryReactome.API_BASE_URL + '/' + handler
 
         try:
-            res = requests.get(url, timeout=QueryReactome.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryReactome.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryReactome for URL: ' + url, file=sys.stderr)
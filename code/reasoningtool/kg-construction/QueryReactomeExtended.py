@@ -14,6 +14,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import sys
 import json
@@ -33,7 +34,7 @@ class QueryReactomeExtended:
         url = QueryReactomeExtended.API_BASE_URL + '/' + handler
 
         try:
-            res = requests.get(url, timeout=QueryReactomeExtended.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryReactomeExtended.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryReactome for URL: ' + url, file=sys.stderr)
@@ -13,6 +13,7 @@ __email__ = ""
 __status__ = "Prototype"
 
 import requests
+from HTTPClient import HTTPClient
 import sys
 
 class QuerySciGraph:
@@ -27,7 +28,7 @@ class QuerySciGraph:
     def __access_api(url, params=None, headers=None):
 #        print(url)
         try:
-            res = requests.get(url, params, timeout=QuerySciGraph.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, params, timeout=QuerySciGraph.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QuerySciGraph for URL: ' + url, file=sys.stderr)
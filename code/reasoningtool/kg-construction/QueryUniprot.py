@@ -25,6 +25,7 @@ __email__ = ""
 __status__ = "Prototype"
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import CachedMethods
 import sys
@@ -57,7 +58,8 @@ class QueryUniprot:
         header = {'User-Agent': 'Python %s' % contact}
         try:
             url =QueryUniprot.API_BASE_URL
-            res = requests.post(QueryUniprot.API_BASE_URL, data=payload, headers=header)
+            res = HTTPClient.get_instance().post(QueryUniprot.API_BASE_URL, data=payload, headers=header,
+                                                 cache=True)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryUniprot for URL: ' + QueryUniprot.API_BASE_URL, file=sys.stderr)
@@ -90,7 +92,7 @@ class QueryUniprot:
         contact = "stephen.ramsey@oregonstate.edu"
         header = {'User-Agent': 'Python %s' % contact}
         try:
-            res = requests.get(url, timeout=QueryUniprot.TIMEOUT_SEC, headers=header)
+            res = HTTPClient.get_instance().get(url, timeout=QueryUniprot.TIMEOUT_SEC, headers=header)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryUniprot for URL: ' + url, file=sys.stderr)
@@ -26,6 +26,7 @@ __email__ = ''
 __status__ = 'Prototype'
 
 import requests
+from HTTPClient import HTTPClient
 import requests_cache
 import sys
 import xmltodict
@@ -44,7 +45,7 @@ class QueryUniprotExtended:
         url = QueryUniprotExtended.API_BASE_URL + '/' + handler
         print(url)
         try:
-            res = requests.get(url, timeout=QueryUniprotExtended.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryUniprotExtended.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             print(url, file=sys.stderr)
             print('Timeout in QueryUniprot for URL: ' + url, file=sys.stderr)
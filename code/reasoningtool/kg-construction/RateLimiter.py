@@ -0,0 +1,112 @@
+""" This module defines the classes RateLimiter and HostRateLimiter.
+RateLimiter is a thread-safe token bucket; HostRateLimiter keeps one bucket per
+upstream host so that concurrent KG expansion does not exceed the request rate
+that UniProt, Reactome, BioLink, MyGene, NCBI, etc. will tolerate.
+
+`HTTPClient.throttle_requests(host_rate_limiter)` is a context manager that
+applies the limits to the requests that the `HTTPClient` actually sends over
+the network (responses served from the `ResponseCache` are not throttled).
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import time
+import threading
+import urllib.parse
+
+
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: sustained number of requests per second
+        :param burst: number of requests that may be issued back-to-back (default: `rate`, at least 1)
+        """
+        self.rate = float(rate)
+        if burst is None:
+            burst = max(1, int(rate))
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be issued"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last_time) * self.rate)
+                self.last_time = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait_time = (1.0 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class HostRateLimiter:
+    DEFAULT_RATE = 10.0
+
+    # requests per second, per upstream host
+    DEFAULT_HOST_RATES = {'eutils.ncbi.nlm.nih.gov': 3.0,
+                          'www.uniprot.org': 10.0,
+                          'reactome.org': 10.0,
+                          'api.monarchinitiative.org': 10.0,
+                          'scigraph-ontology.monarchinitiative.org': 10.0,
+                          'mygene.info': 10.0,
+                          'mychem.info': 10.0,
+                          'www.dgidb.org': 5.0,
+                          'api.omim.org': 4.0,
+                          'www.ebi.ac.uk': 10.0,
+                          'pharos.ncats.io': 5.0,
+                          'mirgate.bioinfo.cnio.es': 5.0,
+                          'www.geneprof.org': 5.0,
+                          'rest.kegg.jp': 3.0}
+
+    def __init__(self, host_rates=None, default_rate=DEFAULT_RATE):
+        """
+        :param host_rates: a ``dict`` of host name to requests per second; merged over `DEFAULT_HOST_RATES`
+        :param default_rate: requests per second for hosts not in `host_rates` (``None`` for unlimited)
+        """
+        self.host_rates = dict(self.DEFAULT_HOST_RATES)
+        if host_rates is not None:
+            self.host_rates.update(host_rates)
+        self.default_rate = default_rate
+        self.limiters = dict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def unlimited():
+        """returns a `HostRateLimiter` that does not limit any host"""
+        return HostRateLimiter(host_rates={host: None for host in HostRateLimiter.DEFAULT_HOST_RATES},
+                               default_rate=None)
+
+    def scaled(self, factor):
+        """returns a `HostRateLimiter` with each of the rates of this one multiplied by `factor` (e.g., ``1 / n`` to
+        share the rates among `n` processes)"""
+        return HostRateLimiter(host_rates={host: (rate * factor if rate is not None else None)
+                                           for host, rate in self.host_rates.items()},
+                               default_rate=self.default_rate * factor if self.default_rate is not None else None)
+
+    def get_limiter(self, host):
+        with self.lock:
+            limiter = self.limiters.get(host, None)
+            if limiter is None:
+                rate = self.host_rates.get(host, self.default_rate)
+                if rate is None:
+                    return None
+                limiter = RateLimiter(rate)
+                self.limiters[host] = limiter
+            return limiter
+
+    def acquire(self, url):
+        """Block until a request to the host of `url` may be issued"""
+        limiter = self.get_limiter(urllib.parse.urlsplit(url).hostname)
+        if limiter is not None:
+            limiter.acquire()
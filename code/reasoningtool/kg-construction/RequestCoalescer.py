@@ -0,0 +1,73 @@
+""" This module defines the class RequestCoalescer, which lets concurrent
+identical lookups share one pending call.
+
+When the prefetch threads of `BioNetExpander` expand a frontier, many nodes
+look up the same thing at the same time (the same Reactome pathway, the same
+UniProt accession, the same anatomy term). The first thread to ask calls the
+upstream; the others that ask for the same key while that call is in flight
+wait for its result (or exception) instead of sending their own request.
+Nothing is remembered once the call completes; that is the job of the caches.
+
+Usage:
+
+    (shared, value) = coalescer.call(key, function, arg1, arg2)
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import threading
+
+
+class PendingCall:
+    __slots__ = ('done', 'value', 'exception')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.exception = None
+
+
+class RequestCoalescer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending_calls = dict()
+        self.num_shared = 0
+
+    def call(self, key, function, *args, **kwargs):
+        """calls ``function(*args, **kwargs)``, unless a call for the same `key` is already in flight, in which case
+        waits for that call to complete and shares its result
+
+        :param key: a hashable key that identifies the call
+        :returns: a ``(shared, value)`` pair, where `shared` is ``True`` if the value came from another thread's call
+        """
+        with self.lock:
+            pending_call = self.pending_calls.get(key, None)
+            if pending_call is None:
+                pending_call = PendingCall()
+                self.pending_calls[key] = pending_call
+                is_leader = True
+            else:
+                self.num_shared += 1
+                is_leader = False
+        if not is_leader:
+            pending_call.done.wait()
+            if pending_call.exception is not None:
+                raise pending_call.exception
+            return True, pending_call.value
+        try:
+            pending_call.value = function(*args, **kwargs)
+        except BaseException as e:
+            pending_call.exception = e
+            raise
+        finally:
+            with self.lock:
+                del self.pending_calls[key]
+            pending_call.done.set()
+        return False, pending_call.value
@@ -0,0 +1,219 @@
+""" This module defines the class ResponseCache, the HTTP response cache used by
+`HTTPClient` (and so by all of the Query* classes).
+
+It replaces the per-module `requests_cache.install_cache(...)` calls: there is
+one cache per process, in one sqlite file, regardless of import order.
+
+*   Entries are keyed by a digest of the normalized request (method, URL with its
+    query parameters sorted, request body, and `Accept` header), so equivalent
+    requests share an entry.
+*   Each upstream host can have its own time-to-live (`DEFAULT_HOST_TTLS`).
+*   Response bodies are zlib-compressed, and the least-recently-used entries are
+    evicted when the cache grows past `max_bytes`.
+*   The sqlite file is in WAL mode, so that concurrent readers (threads, KG build
+    workers, API workers) do not block each other.
+*   `cache_info()` reports hits, misses, stores, evictions and size.
+
+The cache file is `ResponseCache.sqlite` in the working directory, or the path
+in the environment variable `RTX_RESPONSE_CACHE_DB`.
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import os
+import time
+import json
+import zlib
+import hashlib
+import sqlite3
+import threading
+import urllib.parse
+from collections import namedtuple
+import requests
+import requests.structures
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "stores", "evictions", "currsize", "currbytes"])
+
+
+class ResponseCache:
+    DEFAULT_PATH = 'ResponseCache.sqlite'
+    DEFAULT_TTL_SEC = 30 * 24 * 3600
+    DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+    # time-to-live, in seconds, for the responses of upstream hosts whose data change faster or slower than usual
+    DEFAULT_HOST_TTLS = {'eutils.ncbi.nlm.nih.gov': 7 * 24 * 3600,
+                         'www.ebi.ac.uk': 7 * 24 * 3600,
+                         'www.dgidb.org': 7 * 24 * 3600,
+                         'api.omim.org': 90 * 24 * 3600,
+                         'rest.kegg.jp': 90 * 24 * 3600}
+    # the total size of the cache is checked (and entries evicted) after every so many stores
+    EVICTION_CHECK_INTERVAL = 100
+    # a hit records its access time (for least-recently-used eviction) only if the recorded one is older than this,
+    # so that most hits do not write to the database
+    ACCESS_TIME_RESOLUTION_SEC = 3600
+
+    def __init__(self, path=DEFAULT_PATH, default_ttl=DEFAULT_TTL_SEC, host_ttls=None, max_bytes=DEFAULT_MAX_BYTES,
+                 timeout=60):
+        """
+        :param path: the sqlite file
+        :param default_ttl: seconds after which a cached response expires (``None`` for never)
+        :param host_ttls: a ``dict`` of host name to time-to-live in seconds, merged over `DEFAULT_HOST_TTLS`
+        :param max_bytes: the most (compressed) bytes of responses to keep; ``None`` for no limit
+        :param timeout: seconds to wait for a lock held by another process
+        """
+        self.path = path
+        self.default_ttl = default_ttl
+        self.host_ttls = dict(self.DEFAULT_HOST_TTLS)
+        if host_ttls is not None:
+            self.host_ttls.update(host_ttls)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        # one sqlite connection per thread, so that threads read concurrently
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self.num_stores_since_eviction_check = 0
+
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        # sqlite connections must not be shared across a fork
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, host TEXT, status_code INTEGER, '
+                         'url TEXT, headers TEXT, encoding TEXT, body BLOB, size INTEGER, created REAL, '
+                         'accessed REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+            conn.commit()
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def normalize_url(url, params=None):
+        """returns `url`, with `params` merged into its query string, the scheme and host lower-cased and the query
+        parameters sorted"""
+        url_parts = urllib.parse.urlsplit(url)
+        query = urllib.parse.parse_qsl(url_parts.query, keep_blank_values=True)
+        if params is not None:
+            if isinstance(params, dict):
+                params = params.items()
+            query += [(str(key), str(value)) for key, value in params]
+        return urllib.parse.urlunsplit((url_parts.scheme.lower(), url_parts.netloc.lower(), url_parts.path,
+                                        urllib.parse.urlencode(sorted(query)), ''))
+
+    @staticmethod
+    def normalize_body(data=None, json_body=None):
+        if json_body is not None:
+            return json.dumps(json_body, sort_keys=True)
+        if data is None:
+            return ''
+        if isinstance(data, dict):
+            return urllib.parse.urlencode(sorted((str(key), str(value)) for key, value in data.items()))
+        if isinstance(data, bytes):
+            return data.decode('latin-1')
+        return str(data)
+
+    @staticmethod
+    def make_key(method, url, params=None, data=None, json_body=None, headers=None):
+        """returns the cache key for a request"""
+        accept = ''
+        if headers is not None:
+            accept = requests.structures.CaseInsensitiveDict(headers).get('Accept', '')
+        key_str = '\n'.join([method.upper(), ResponseCache.normalize_url(url, params),
+                             ResponseCache.normalize_body(data, json_body), accept])
+        return hashlib.sha1(key_str.encode('utf-8')).hexdigest()
+
+    def get_ttl(self, host):
+        return self.host_ttls.get(host, self.default_ttl)
+
+    def get(self, key, host):
+        """
+        :returns: the cached `requests.Response` for `key`, or ``None``
+        """
+        conn = self.connect()
+        row = conn.execute('SELECT status_code, url, headers, encoding, body, created, accessed FROM responses '
+                           'WHERE key=?', (key,)).fetchone()
+        now = time.time()
+        ttl = self.get_ttl(host)
+        if row is not None and ttl is not None and now - row[5] > ttl:
+            conn.execute('DELETE FROM responses WHERE key=?', (key,))
+            conn.commit()
+            row = None
+        if row is None:
+            with self.lock:
+                self.stats['misses'] += 1
+            return None
+        if now - row[6] > self.ACCESS_TIME_RESOLUTION_SEC:
+            conn.execute('UPDATE responses SET accessed=? WHERE key=?', (now, key))
+            conn.commit()
+        with self.lock:
+            self.stats['hits'] += 1
+        res = requests.Response()
+        res.status_code = row[0]
+        res.url = row[1]
+        res.headers = requests.structures.CaseInsensitiveDict(json.loads(row[2]))
+        res.encoding = row[3]
+        res._content = zlib.decompress(row[4])
+        res.from_cache = True
+        return res
+
+    def set(self, key, host, res):
+        """caches the response `res` under `key`"""
+        body = zlib.compress(res.content)
+        headers = {name: value for name, value in res.headers.items()
+                   if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            conn.execute('INSERT OR REPLACE INTO responses (key, host, status_code, url, headers, encoding, body, size, '
+                         'created, accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         (key, host, res.status_code, res.url, json.dumps(headers), res.encoding,
+                          sqlite3.Binary(body), len(body), now, now))
+            conn.commit()
+            self.stats['stores'] += 1
+            self.num_stores_since_eviction_check += 1
+            if self.max_bytes is not None and self.num_stores_since_eviction_check >= self.EVICTION_CHECK_INTERVAL:
+                self.num_stores_since_eviction_check = 0
+                self.evict(conn)
+
+    def evict(self, conn):
+        """deletes least-recently-used entries until the cache is within `max_bytes`"""
+        total_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        num_evicted = 0
+        excess_bytes = total_bytes - self.max_bytes
+        while excess_bytes > 0:
+            rows = conn.execute('SELECT key, size FROM responses ORDER BY accessed LIMIT 1000').fetchall()
+            if len(rows) == 0:
+                break
+            for key, size in rows:
+                if excess_bytes <= 0:
+                    break
+                conn.execute('DELETE FROM responses WHERE key=?', (key,))
+                excess_bytes -= size
+                num_evicted += 1
+        conn.commit()
+        self.stats['evictions'] += num_evicted
+
+    def cache_info(self):
+        with self.lock:
+            (currsize, currbytes) = self.connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) '
+                                                           'FROM responses').fetchone()
+            return CacheInfo(self.stats['hits'], self.stats['misses'], self.stats['stores'], self.stats['evictions'],
+                             currsize, currbytes)
+
+    def cache_clear(self):
+        with self.lock:
+            conn = self.connect()
+            conn.execute('DELETE FROM responses')
+            conn.commit()
+            for stat_name in self.stats:
+                self.stats[stat_name] = 0
@@ -7,9 +7,10 @@ from NormGoogleDistance import NormGoogleDistance
 #from SemMedInterface import SemMedInterface
 from QueryMyGene import QueryMyGene
 import mygene
+from UpstreamStats import UpstreamStats
 import requests
 from QueryMyChem import QueryMyChem
-import requests_cache
+from HTTPClient import HTTPClient
 import pandas
 #import _mysql_exceptions
 
@@ -23,7 +24,7 @@ class SynonymMapper():
         #    print('Warning: No connection was made to the SemMEdDB MySQL server.')
         #    self.smi = None
         self.biothings_url = "http://c.biothings.io/v1/query?q="
-        self.mygene_obj = mygene.MyGeneInfo()
+        self.mygene_obj = UpstreamStats.instrument_client(mygene.MyGeneInfo(), 'mygene.info')
         self.qmg = QueryMyGene()
 
     def prot_to_gene(self, curie_id):
@@ -97,6 +98,20 @@ class SynonymMapper():
         else:
             return None
 
+    def prots_to_genes(self, curie_ids):
+        """
+        Batch version of prot_to_gene: the UniProt-to-gene conversions for all of the curie ids are done in a few
+        MyGene batch queries up front, rather than one query per id
+
+        :param curie_ids: an iterable of uniprot curie ids
+        :return: a dict from each curie id to the result of prot_to_gene for it
+        """
+        curie_ids = list(curie_ids)
+        uniprot_ids = [curie_id.split(':')[1] for curie_id in curie_ids if len(curie_id.split(':')) > 1]
+        self.qmg.convert_uniprot_ids_to_entrez_gene_IDs(uniprot_ids)
+        self.qmg.convert_uniprot_ids_to_gene_symbols(uniprot_ids)
+        return {curie_id: self.prot_to_gene(curie_id) for curie_id in curie_ids}
+
     def get_all_from_oxo(self, curie_id, map_to = None):
         """
         this takes a curie id and gets all the mappings that oxo has for the given id
@@ -164,7 +179,7 @@ class SynonymMapper():
         url = QueryMyChem.API_BASE_URL + '/' + handler
 
         try:
-            res = requests.get(url, timeout=QueryMyChem.TIMEOUT_SEC)
+            res = HTTPClient.get_instance().get(url, timeout=QueryMyChem.TIMEOUT_SEC)
         except requests.exceptions.Timeout:
             #print(url, file=sys.stderr)
             #print('Timeout in QueryMyChem for URL: ' + url, file=sys.stderr)
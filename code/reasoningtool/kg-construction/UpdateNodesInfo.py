@@ -35,6 +35,16 @@ If you want to update the descriptions of all types of nodes, please use the def
 If you want to update the descriptions of the specified nodes, please use the runfunc argument to specify the method:
         $ cd [git repo]/code/reasoningtool/kg-construction
         $ python3 UpdateNodesInfo.py -u xxx -p xxx --runfunc=update_disease_nodes_desc 1>stdout_desc.log 2>stderr_desc.log
+
+The node properties are fetched by --workers concurrent threads and written to Neo4j in batches as they arrive (see
+NodeUpdatePipeline). To let an interrupted run restart where it stopped, give a --checkpoint-dir:
+        $ python3 UpdateNodesInfo.py -u xxx -p xxx --workers=16 --source-limit=QueryOMIM=2 --checkpoint-dir=update_checkpoints
+
+For a nightly refresh that writes only the nodes whose upstream data changed, and refetches only the nodes last fetched
+more than a week ago, use --incremental (the fingerprints of the fetched data are kept in --fingerprint-db):
+        $ python3 UpdateNodesInfo.py -u xxx -p xxx --incremental --max-age=7
+Each fingerprint records the UUID of the node it was written to, and the KG build gives every node a new UUID, so the
+first incremental run after a rebuild writes every node.
 """
 
 __author__ = 'Deqing Qu'
@@ -48,6 +58,9 @@ __status__ = 'Prototype'
 
 import argparse
 import sys
+import os
+import time
+import threading
 
 from Neo4jConnection import Neo4jConnection
 from QueryEBIOLS import QueryEBIOLS
@@ -57,6 +70,9 @@ from QueryMyChem import QueryMyChem
 from QueryReactome import QueryReactome
 from QueryKEGG import QueryKEGG
 from QueryHMDB import QueryHMDB
+from NodeUpdatePipeline import NodeUpdatePipeline
+from NodeFingerprintStore import NodeFingerprintStore
+from Neo4jBulkWriter import Neo4jBulkWriter
 
 
 class UpdateNodesInfo:
@@ -72,51 +88,100 @@ class UpdateNodesInfo:
         'bio_process': 'QueryBioLink'
     }
 
-    def __init__(self, user, password, url ='bolt://localhost:7687'):
+    def __init__(self, user, password, url ='bolt://localhost:7687', num_workers=NodeUpdatePipeline.DEFAULT_NUM_WORKERS,
+                 batch_size=NodeUpdatePipeline.DEFAULT_BATCH_SIZE, source_limits=None, checkpoint_dir=None,
+                 fingerprint_store=None, max_age=None, num_sessions=Neo4jBulkWriter.DEFAULT_NUM_SESSIONS):
+        """
+        :param num_workers: the number of threads that fetch node properties concurrently
+        :param batch_size: the number of nodes per Neo4j write
+        :param source_limits: a ``dict`` of Query* class name to the most concurrent fetches from it
+        :param checkpoint_dir: a directory for the files that let an interrupted update restart where it stopped, or
+        ``None`` to always start from the beginning
+        :param fingerprint_store: a `NodeFingerprintStore`, for an incremental refresh that writes only the nodes whose
+        upstream data changed, or ``None`` to write every node
+        :param max_age: in an incremental refresh, the seconds after which a node is fetched again (``None`` to fetch
+        every node)
+        :param num_sessions: the number of Neo4j transactions written concurrently
+        """
         self.neo4j_user = user
         self.neo4j_password = password
         self.neo4j_url = url
-
-    def __update_nodes(self, node_type):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        get_nodes_mtd_name = "get_" + node_type + "_nodes"
-        get_nodes_mtd = getattr(conn, get_nodes_mtd_name)
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        self.source_limits = source_limits
+        self.checkpoint_dir = checkpoint_dir
+        self.fingerprint_store = fingerprint_store
+        self.max_age = max_age
+        self.num_sessions = num_sessions
+        # the Query* instances of each fetcher thread
+        self.local = threading.local()
+
+    def __get_query_instance(self, query_class):
+        query_instances = getattr(self.local, 'query_instances', None)
+        if query_instances is None:
+            query_instances = dict()
+            self.local.query_instances = query_instances
+        query_instance = query_instances.get(query_class, None)
+        if query_instance is None:
+            query_instance = query_class()
+            query_instances[query_class] = query_instance
+        return query_instance
+
+    def __run_pipeline(self, node_type, fetch, get_source, update_nodes_mtd_name, checkpoint_name):
+        """fetches the properties of all nodes of type `node_type` with `fetch`, and writes them to Neo4j with the
+        `Neo4jConnection` method named `update_nodes_mtd_name` as they are fetched"""
+        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password, num_sessions=self.num_sessions)
+        get_nodes_mtd = getattr(conn, "get_" + node_type + "_nodes")
         nodes = get_nodes_mtd()
-        print(len(nodes))
-
-        from time import time
-        t = time()
+        print("the number of %s nodes: %d" % (node_type, len(nodes)))
+
+        t = time.time()
+
+        get_graph_id = None
+        if self.fingerprint_store is not None:
+            # the fingerprints of a previous build of the KG must not keep the nodes of this one from being written
+            get_graph_id = conn.get_node_uuids(node_type).get
+
+        checkpoint_file = None
+        if self.checkpoint_dir is not None:
+            checkpoint_file = os.path.join(self.checkpoint_dir, checkpoint_name + '.checkpoint')
+        pipeline = NodeUpdatePipeline(fetch, getattr(conn, update_nodes_mtd_name), num_workers=self.num_workers,
+                                      batch_size=self.batch_size, get_source=get_source,
+                                      source_limits=self.source_limits, checkpoint_file=checkpoint_file,
+                                      name=node_type, fingerprint_store=self.fingerprint_store,
+                                      fingerprint_namespace=checkpoint_name, max_age=self.max_age,
+                                      get_graph_id=get_graph_id)
+        try:
+            pipeline.run(nodes)
+        finally:
+            conn.close()
+
+        print("%s total time: %f" % (node_type, time.time() - t))
 
-        nodes_array = []
+    def __update_nodes(self, node_type):
         query_class_name = UpdateNodesInfo.GET_QUERY_CLASS[node_type]
         query_class = getattr(__import__(query_class_name), query_class_name)
         get_entity_mtd_name = "get_" + node_type + "_entity"
-        get_entity_mtd = getattr(query_class, get_entity_mtd_name)
-        query_instance = query_class()
-        for i, node_id in enumerate(nodes):
-            node = dict()
-            node['node_id'] = node_id
-            if node_type == "protein" or node_type == "microRNA":
-                get_entity_mtd = getattr(query_instance, get_entity_mtd_name)
-            node['extended_info_json'] = get_entity_mtd(node_id)
-            nodes_array.append(node)
-            print(node_type + " node No. %d : %s" % (i, node_id))
-
-        print("api pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            update_nodes_mtd_name = "update_" + node_type + "_nodes"
-            update_nodes_mtd = getattr(conn, update_nodes_mtd_name)
-            update_nodes_mtd(nodes_array[start:end])
-
-        print("total time: %f" % (time() - t))
 
-        conn.close()
+        def fetch(node_id):
+            if node_type == "protein" or node_type == "microRNA":
+                get_entity_mtd = getattr(self.__get_query_instance(query_class), get_entity_mtd_name)
+            else:
+                get_entity_mtd = getattr(query_class, get_entity_mtd_name)
+            return {'node_id': node_id, 'extended_info_json': get_entity_mtd(node_id)}
+
+        self.__run_pipeline(node_type, fetch, lambda node_id: query_class_name, "update_" + node_type + "_nodes",
+                            "update_" + node_type + "_nodes")
+
+    def __update_nodes_desc(self, node_type, get_desc, get_source, update_nodes_mtd_name=None):
+        """
+        :param get_desc: a function of a node ID that returns the node's description
+        :param get_source: a function of a node ID that returns the name of the Query* class that `get_desc` uses
+        """
+        if update_nodes_mtd_name is None:
+            update_nodes_mtd_name = "update_" + node_type + "_nodes_desc"
+        self.__run_pipeline(node_type, lambda node_id: {'node_id': node_id, 'desc': get_desc(node_id)}, get_source,
+                            update_nodes_mtd_name, "update_" + node_type + "_nodes_desc")
 
     def update_anatomy_nodes(self):
         self.__update_nodes('anatomy')
@@ -143,341 +208,62 @@ class UpdateNodesInfo:
         self.__update_nodes('bio_process')
 
     def update_anatomy_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_anatomy_nodes()
-        print("the number of anatomy nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
-        for i, node_id in enumerate(nodes):
-            node = dict()
-            node['node_id'] = node_id
-            node['desc'] = QueryEBIOLS.get_anatomy_description(node_id)
-            nodes_array.append(node)
-
-        print("anatomy api pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_anatomy_nodes_desc(nodes_array[start:end])
-
-        print("anatomy total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('anatomy', QueryEBIOLS.get_anatomy_description, lambda node_id: 'QueryEBIOLS')
 
     def update_phenotype_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_phenotype_nodes()
-        print("the number of phenotype nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
-        for i, node_id in enumerate(nodes):
-            node = dict()
-            node['node_id'] = node_id
-            node['desc'] = QueryEBIOLS.get_phenotype_description(node_id)
-            nodes_array.append(node)
-
-        print("phenotype api pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_phenotype_nodes_desc(nodes_array[start:end])
-
-        print("phenotype total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('phenotype', QueryEBIOLS.get_phenotype_description, lambda node_id: 'QueryEBIOLS')
 
     def update_microRNA_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_microRNA_nodes()
-        print("the number of microRNA nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
-        mg = QueryMyGene()
-        for i, node_id in enumerate(nodes):
-            node = dict()
-            node['node_id'] = node_id
-            node['desc'] = mg.get_microRNA_desc(node_id)
-            nodes_array.append(node)
-
-        print("microRNA api pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_microRNA_nodes_desc(nodes_array[start:end])
-
-        print("microRNA total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('microRNA',
+                                 lambda node_id: self.__get_query_instance(QueryMyGene).get_microRNA_desc(node_id),
+                                 lambda node_id: 'QueryMyGene')
 
     def update_pathway_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_pathway_nodes()
-        print("the number of pathway: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
-        for i, node_id in enumerate(nodes):
-            node = dict()
-            node['node_id'] = node_id
-            node['desc'] = QueryReactome.get_pathway_desc(node_id)
-            nodes_array.append(node)
-
-        print("pathway api pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_pathway_nodes_desc(nodes_array[start:end])
-
-        print("pathway total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('pathway', QueryReactome.get_pathway_desc, lambda node_id: 'QueryReactome')
 
     def update_protein_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_protein_nodes()
-        print("the number of protein nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
-        mg = QueryMyGene()
-        for i, node_id in enumerate(nodes):
-            node = dict()
-            node['node_id'] = node_id
-            node['desc'] = mg.get_protein_desc(node_id)
-            nodes_array.append(node)
-
-        print("protein api pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_protein_nodes_desc(nodes_array[start:end])
-
-        print("protein total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('protein',
+                                 lambda node_id: self.__get_query_instance(QueryMyGene).get_protein_desc(node_id),
+                                 lambda node_id: 'QueryMyGene')
 
     def update_disease_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_disease_nodes()
-        print("the number of disease nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
         qo = QueryOMIM()
-        for i, node_id in enumerate(nodes):
-            node = dict()
-            node['node_id'] = node_id
+
+        def get_desc(node_id):
             if node_id[:4] == "OMIM":
-                node['desc'] = qo.disease_mim_to_description(node_id)
+                return qo.disease_mim_to_description(node_id)
             elif node_id[:4] == "DOID":
-                node['desc'] = QueryEBIOLS.get_disease_description(node_id)
-            nodes_array.append(node)
-
-        print("disease api pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_disease_nodes_desc(nodes_array[start:end])
-
-        print("disease total time: %f" % (time() - t))
+                return QueryEBIOLS.get_disease_description(node_id)
+            return None
 
-        conn.close()
+        self.__update_nodes_desc('disease', get_desc,
+                                 lambda node_id: 'QueryOMIM' if node_id[:4] == "OMIM" else 'QueryEBIOLS')
 
     def update_chemical_substance_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_chemical_substance_nodes()
-        print("the number of chemical_substance nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
-        for i, node_id in enumerate(nodes):
-            node = dict()
-            node['node_id'] = node_id
-            node['desc'] = QueryMyChem.get_chemical_substance_description(node_id)
-            nodes_array.append(node)
-
-        print("chemical_substance pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_chemical_substance_nodes_desc(nodes_array[start:end])
-
-        print("chemical substance total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('chemical_substance', QueryMyChem.get_chemical_substance_description,
+                                 lambda node_id: 'QueryMyChem')
 
     def update_bio_process_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_bio_process_nodes()
-        print("the number of bio_process nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
-        for i, node_id in enumerate(nodes):
-            node = dict()
-            node['node_id'] = node_id
-            node['desc'] = QueryEBIOLS.get_bio_process_description(node_id)
-            nodes_array.append(node)
-
-        print("bio_process pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_bio_process_nodes_desc(nodes_array[start:end])
-
-        print("bio_process total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('bio_process', QueryEBIOLS.get_bio_process_description,
+                                 lambda node_id: 'QueryEBIOLS')
 
     def update_cellular_component_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_cellular_component_nodes()
-        print("the number of cellular_component nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
-        for i, node_id in enumerate(nodes):
-            # print("no %d" % i)
-            node = dict()
-            node['node_id'] = node_id
-            node['desc'] = QueryEBIOLS.get_cellular_component_description(node_id)
-            nodes_array.append(node)
-
-        print("cellular_component pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_cellular_component_nodes_desc(nodes_array[start:end])
-
-        print("cellular_component total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('cellular_component', QueryEBIOLS.get_cellular_component_description,
+                                 lambda node_id: 'QueryEBIOLS')
 
     def update_molecular_function_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_molecular_function_nodes()
-        print("the number of molecular_function nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        nodes_array = []
-        for i, node_id in enumerate(nodes):
-            # print("no %d" % i)
-            node = dict()
-            node['node_id'] = node_id
-            node['desc'] = QueryEBIOLS.get_molecular_function_description(node_id)
-            nodes_array.append(node)
-
-        print("molecular_function pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_molecular_function_nodes_desc(nodes_array[start:end])
-
-        print("molecular_function total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('molecular_function', QueryEBIOLS.get_molecular_function_description,
+                                 lambda node_id: 'QueryEBIOLS')
 
     def update_metabolite_nodes_desc(self):
-        conn = Neo4jConnection(self.neo4j_url, self.neo4j_user, self.neo4j_password)
-        nodes = conn.get_metabolite_nodes()
-        print("the number of metabolite nodes: %d" % len(nodes))
-
-        from time import time
-        t = time()
-
-        success_count = 0
-        nodes_array = []
-        for i, node_id in enumerate(nodes):
-            # if i % 100 == 0:
-            #     print("no %d" % i)
-            node = dict()
-            node['node_id'] = node_id
+        def get_desc(node_id):
             hmdb_id = QueryKEGG.map_kegg_compound_to_hmdb_id(node_id)
             if hmdb_id:
                 hmdb_url = 'http://www.hmdb.ca/metabolites/' + hmdb_id
-                node['desc'] = QueryHMDB.get_compound_desc(hmdb_url)
-                if node['desc'] != "None":
-                    success_count += 1
-            else:
-                node['desc'] = 'None'
-            nodes_array.append(node)
-        print("success_count = " + str(success_count))
-        print("metabolite pulling time: %f" % (time() - t))
-
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_metabolite_nodes_desc(nodes_array[start:end])
+                return QueryHMDB.get_compound_desc(hmdb_url)
+            return 'None'
 
-        print("metabolite total time: %f" % (time() - t))
-
-        conn.close()
+        self.__update_nodes_desc('metabolite', get_desc, lambda node_id: 'QueryKEGG')
 
     def update_all(self):
         # UpdateNodesInfo.update_anatomy_nodes()
@@ -511,6 +297,31 @@ if __name__ == '__main__':
     parser.add_argument("-p", "--password", help="The password used to connect to the neo4j instance. (default: )",
                         default='')
     parser.add_argument('--runfunc', dest='runfunc')
+    parser.add_argument("-w", "--workers", type=int, help="number of threads that fetch node properties concurrently "
+                                                           "(default: %d)" % NodeUpdatePipeline.DEFAULT_NUM_WORKERS,
+                        default=NodeUpdatePipeline.DEFAULT_NUM_WORKERS)
+    parser.add_argument("--batch-size", dest="batch_size", type=int,
+                        help="number of fetched nodes per Neo4j update, which is written in parallel transactions "
+                             "(default: %d)" % NodeUpdatePipeline.DEFAULT_BATCH_SIZE,
+                        default=NodeUpdatePipeline.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--write-sessions", dest="write_sessions", type=int,
+                        help="number of Neo4j transactions written concurrently (default: %d)" %
+                             Neo4jBulkWriter.DEFAULT_NUM_SESSIONS, default=Neo4jBulkWriter.DEFAULT_NUM_SESSIONS)
+    parser.add_argument("--source-limit", dest="source_limits", action="append", metavar="SOURCE=N", default=[],
+                        help="fetch at most N nodes at once from the Query* class SOURCE (e.g., QueryOMIM=2); "
+                             "may be repeated")
+    parser.add_argument("--checkpoint-dir", dest="checkpoint_dir",
+                        help="directory where the progress of each update is recorded, so that an interrupted run "
+                             "restarts where it stopped (default: no checkpoints)", default=None)
+    parser.add_argument("--incremental", action="store_true",
+                        help="write only the nodes whose fetched properties differ from those of the last run "
+                             "(recorded in --fingerprint-db)", default=False)
+    parser.add_argument("--fingerprint-db", dest="fingerprint_db",
+                        help="sqlite file for the fingerprints of the fetched node properties (default: " +
+                             NodeFingerprintStore.DEFAULT_PATH + ")", default=NodeFingerprintStore.DEFAULT_PATH)
+    parser.add_argument("--max-age", dest="max_age", type=float,
+                        help="with --incremental, fetch only the nodes last fetched more than this many days ago "
+                             "(default: fetch every node)", default=None)
     args = parser.parse_args()
 
     if args.username == '' or args.password == '':
@@ -518,9 +329,29 @@ if __name__ == '__main__':
         print('BuildMasterKG.py: error: invalid username or password')
         exit(0)
 
+    source_limits = dict()
+    for source_limit in args.source_limits:
+        source, _, limit = source_limit.partition('=')
+        if not limit.isdigit() or int(limit) < 1:
+            parser.error('invalid --source-limit: ' + source_limit)
+        source_limits[source] = int(limit)
+    if args.checkpoint_dir is not None:
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+
     args_dict = vars(args)
 
-    ui = UpdateNodesInfo(args.username, args.password, args.address)
+    fingerprint_store = None
+    max_age = None
+    if args.incremental:
+        fingerprint_store = NodeFingerprintStore(args.fingerprint_db)
+        if args.max_age is not None:
+            max_age = args.max_age * 24 * 3600
+    elif args.max_age is not None:
+        parser.error('--max-age requires --incremental')
+
+    ui = UpdateNodesInfo(args.username, args.password, args.address, num_workers=args.workers,
+                         batch_size=args.batch_size, source_limits=source_limits, checkpoint_dir=args.checkpoint_dir,
+                         fingerprint_store=fingerprint_store, max_age=max_age, num_sessions=args.write_sessions)
 
     if args_dict.get('runfunc', None) is not None:
         run_function_name = args_dict['runfunc']
@@ -86,13 +86,8 @@ class UpdateNodesName:
 
         print("protein api pulling time: %f" % (time() - t))
 
-        nodes_nums = len(nodes_array)
-        chunk_size = 10000
-        group_nums = nodes_nums // chunk_size + 1
-        for i in range(group_nums):
-            start = i * chunk_size
-            end = (i + 1) * chunk_size if (i + 1) * chunk_size < nodes_nums else nodes_nums
-            conn.update_protein_nodes_name(nodes_array[start:end])
+        # written in batches by Neo4jConnection
+        conn.update_protein_nodes_name(nodes_array)
 
         print("protein total time: %f" % (time() - t))
 
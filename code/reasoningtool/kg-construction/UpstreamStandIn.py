@@ -0,0 +1,294 @@
+""" This module defines the classes FixtureArchive and StandInServer, which let
+KG construction (and the NGD and COHD code) run against recorded upstream
+responses instead of the live MyGene, UniProt, NCBI eUtils, COHD, OxO, Reactome,
+etc. services.
+
+*   `record_requests(archive)` is a context manager that captures every response
+    that comes over the network through the `requests` package (including the
+    `mygene` client's) into a `FixtureArchive`, a gzipped JSON-lines file.
+    Responses served from the `ResponseCache` do not reach the network, so
+    record with an empty (or no) response cache.
+*   `StandInServer(archive)` is a local HTTP server that replays the archived
+    responses, optionally after an injected latency and with injected errors.
+*   `route_requests(server_url)` is a context manager that sends every request
+    made through the `requests` package to the stand-in server instead of the
+    real host.
+
+A request is matched to its recorded response by the `ResponseCache` key of
+the request (method, normalized URL, body, and `Accept` header); a request with
+no recorded response gets a 404 response.
+
+To serve an archive to other processes:
+
+    python3 UpstreamStandIn.py --archive fixtures.jsonl.gz --port 8765 --latency 0.05 --error-rate 0.01
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import sys
+import gzip
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+import contextlib
+import urllib.parse
+import http.server
+import requests.adapters
+
+from ResponseCache import ResponseCache
+
+# hop-by-hop headers, and headers that no longer describe the (already-decoded) recorded body
+EXCLUDED_HEADERS = {'connection', 'content-encoding', 'content-length', 'keep-alive', 'transfer-encoding'}
+
+
+class FixtureArchive:
+    def __init__(self, path=None):
+        """
+        :param path: the gzipped JSON-lines archive file; its responses are loaded if it exists
+        """
+        self.path = path
+        self.fixtures = dict()
+        self.lock = threading.Lock()
+        if path is not None:
+            try:
+                self.load(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def make_key(method, url, body, headers):
+        accept = headers.get('Accept', '') if headers is not None else ''
+        return ResponseCache.make_key(method, url, data=body if body else None, headers={'Accept': accept})
+
+    def load(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+            for line in archive_file:
+                fixture = json.loads(line)
+                self.fixtures[fixture['key']] = fixture
+
+    def save(self, path=None):
+        if path is None:
+            path = self.path
+        with self.lock:
+            fixtures = list(self.fixtures.values())
+        with gzip.open(path, 'wt', encoding='utf-8') as archive_file:
+            for fixture in fixtures:
+                archive_file.write(json.dumps(fixture) + '\n')
+
+    def add(self, method, url, body, headers, res):
+        """records the response `res` to a request
+
+        :param method: the request method
+        :param url: the full request URL, including the query string
+        :param body: the request body (``str``, ``bytes`` or ``None``)
+        :param headers: the request headers
+        :param res: the `requests.Response`
+        """
+        if isinstance(body, bytes):
+            body = body.decode('latin-1')
+        fixture = {'key': FixtureArchive.make_key(method, url, body, headers),
+                   'method': method,
+                   'url': url,
+                   'status_code': res.status_code,
+                   'headers': {name: value for name, value in res.headers.items()
+                               if name.lower() not in EXCLUDED_HEADERS},
+                   'content': base64.b64encode(res.content).decode('ascii')}
+        with self.lock:
+            self.fixtures[fixture['key']] = fixture
+
+    def lookup(self, method, url, body, headers):
+        """
+        :returns: a ``(status_code, headers, content)`` tuple for the recorded response, or ``None``
+        """
+        fixture = self.fixtures.get(FixtureArchive.make_key(method, url, body, headers), None)
+        if fixture is None:
+            return None
+        return fixture['status_code'], fixture['headers'], base64.b64decode(fixture['content'])
+
+    def __len__(self):
+        return len(self.fixtures)
+
+
+@contextlib.contextmanager
+def record_requests(archive):
+    """Record every response that comes over the network via the `requests` package into `archive` (a
+    `FixtureArchive`) within this context; the archive is saved to its file on exit"""
+    original_send = requests.adapters.HTTPAdapter.send
+
+    def send(adapter, request, *args, **kwargs):
+        res = original_send(adapter, request, *args, **kwargs)
+        archive.add(request.method, request.url, request.body, request.headers, res)
+        return res
+
+    requests.adapters.HTTPAdapter.send = send
+    try:
+        yield archive
+    finally:
+        requests.adapters.HTTPAdapter.send = original_send
+        if archive.path is not None:
+            archive.save()
+
+
+def make_stand_in_url(server_url, url):
+    """returns the URL on the stand-in server at `server_url` that stands for the upstream `url`"""
+    url_parts = urllib.parse.urlsplit(url)
+    return server_url.rstrip('/') + '/' + url_parts.scheme + '/' + url_parts.netloc + url_parts.path + \
+        ('?' + url_parts.query if url_parts.query != '' else '')
+
+
+def get_upstream_url(path):
+    """inverse of `make_stand_in_url`, for the path part of a stand-in URL"""
+    (scheme, rest) = path.lstrip('/').split('/', 1)
+    return scheme + '://' + rest
+
+
+@contextlib.contextmanager
+def route_requests(server_url):
+    """Send every request made via the `requests` package to the stand-in server at `server_url` within this
+    context"""
+    original_send = requests.adapters.HTTPAdapter.send
+
+    def send(adapter, request, *args, **kwargs):
+        request = request.copy()
+        request.url = make_stand_in_url(server_url, request.url)
+        return original_send(adapter, request, *args, **kwargs)
+
+    requests.adapters.HTTPAdapter.send = send
+    try:
+        yield server_url
+    finally:
+        requests.adapters.HTTPAdapter.send = original_send
+
+
+class StandInServer:
+    def __init__(self, archive, port=0, latency=0.0, latency_jitter=0.0, error_rate=0.0, error_status=503, seed=None):
+        """
+        :param archive: the `FixtureArchive` whose responses are replayed
+        :param port: the local port to listen on (default: any free port)
+        :param latency: seconds to wait before each response
+        :param latency_jitter: up to this many seconds are added at random to `latency`
+        :param error_rate: the fraction of requests that get an injected error instead of the recorded response
+        :param error_status: the status code of the injected errors; ``None`` to drop the connection instead
+        :param seed: seed for the random latencies and errors, for reproducible runs
+        """
+        self.archive = archive
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.stats = {'requests': 0, 'replayed': 0, 'missing': 0, 'errors': 0}
+        self.stats_lock = threading.Lock()
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', port), StandInRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stand_in = self
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:' + str(self.httpd.server_address[1])
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def count(self, stat_name):
+        with self.stats_lock:
+            self.stats[stat_name] += 1
+
+    def draw(self):
+        """returns ``(latency, inject_error)`` for the next request"""
+        with self.random_lock:
+            return (self.latency + self.random.random() * self.latency_jitter,
+                    self.random.random() < self.error_rate)
+
+
+class StandInRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def handle_request(self, method):
+        stand_in = self.server.stand_in
+        stand_in.count('requests')
+        body = None
+        content_length = int(self.headers.get('Content-Length', 0))
+        if content_length > 0:
+            body = self.rfile.read(content_length)
+        (latency, inject_error) = stand_in.draw()
+        if latency > 0:
+            time.sleep(latency)
+        if inject_error:
+            stand_in.count('errors')
+            if stand_in.error_status is None:
+                self.close_connection = True
+                self.connection.close()
+                return
+            self.send_reply(stand_in.error_status, {}, b'injected error')
+            return
+        url = get_upstream_url(self.path)
+        fixture = stand_in.archive.lookup(method, url, body, self.headers)
+        if fixture is None:
+            stand_in.count('missing')
+            print('StandInServer: no recorded response for ' + method + ' ' + url, file=sys.stderr)
+            self.send_reply(404, {}, b'no recorded response')
+            return
+        stand_in.count('replayed')
+        self.send_reply(*fixture)
+
+    def send_reply(self, status_code, headers, content):
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replays recorded upstream API responses on a local port')
+    parser.add_argument('--archive', required=True, help='the fixture archive (gzipped JSON lines)')
+    parser.add_argument('--port', type=int, default=8765, help='the local port to listen on (default: 8765)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of latency added to each response')
+    parser.add_argument('--latency-jitter', dest='latency_jitter', type=float, default=0.0,
+                        help='up to this many more seconds of latency, at random')
+    parser.add_argument('--error-rate', dest='error_rate', type=float, default=0.0,
+                        help='fraction of requests that get an injected 503 response')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for the latencies and errors')
+    args = parser.parse_args()
+    server = StandInServer(FixtureArchive(args.archive), port=args.port, latency=args.latency,
+                           latency_jitter=args.latency_jitter, error_rate=args.error_rate, seed=args.seed)
+    print('replaying ' + str(len(server.archive)) + ' responses at ' + server.url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(server.stats)
@@ -0,0 +1,290 @@
+""" This module defines the class UpstreamStats, which records how KG expansion
+uses the upstream services (UniProt, Reactome, BioLink, DGIdb, MyGene, etc.).
+
+For each endpoint (the host and the first component of the URL path, e.g.,
+`reactome.org/ContentService`) it counts the calls, response cache hits,
+coalesced calls, retries, errors, status codes, and bytes received, and keeps
+a histogram of the call latencies. For each `expand_*` method of `BioNetExpander` it records
+the calls, the time spent, and the calls to each endpoint that the method made.
+
+`HTTPClient` records every request here; clients that do their own HTTP (the
+`mygene` client) are wrapped with `instrument_client`. `BioNetExpander` labels
+the calls with the current `expand_*` method via `context`.
+
+Usage:
+
+    stats = UpstreamStats.get_instance()
+    stats.start_periodic_summary(600)
+    ...
+    stats.stop_periodic_summary()
+    stats.write_report('upstream_stats.json')
+"""
+
+__author__ = 'Stephen Ramsey'
+__copyright__ = 'Oregon State University'
+__credits__ = ['Stephen Ramsey']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = ''
+__email__ = ''
+__status__ = 'Prototype'
+
+import json
+import time
+import bisect
+import threading
+import contextlib
+import collections
+import urllib.parse
+
+import CachedMethods
+
+
+class UpstreamStats:
+    # upper bounds (in seconds) of the latency histogram buckets; the last bucket is unbounded
+    LATENCY_BUCKETS_SEC = (0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0)
+
+    NO_CONTEXT = '(none)'
+
+    instance = None
+    instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.start_time = time.time()
+        self.endpoint_stats = dict()
+        self.context_stats = dict()
+        self.summary_thread = None
+        self.summary_stop_event = None
+        self.summary_interval_sec = None
+
+    @staticmethod
+    def get_instance():
+        """returns the process-wide `UpstreamStats`, creating it on first use"""
+        with UpstreamStats.instance_lock:
+            if UpstreamStats.instance is None:
+                UpstreamStats.instance = UpstreamStats()
+            return UpstreamStats.instance
+
+    @staticmethod
+    def set_instance(stats):
+        """replaces the process-wide `UpstreamStats` (e.g., to start counting afresh)"""
+        with UpstreamStats.instance_lock:
+            UpstreamStats.instance = stats
+
+    @staticmethod
+    def get_endpoint(url):
+        url_parts = urllib.parse.urlsplit(url)
+        path_parts = url_parts.path.strip('/').split('/', 1)
+        return url_parts.hostname + ('/' + path_parts[0] if path_parts[0] != '' else '')
+
+    @staticmethod
+    def make_endpoint_stats():
+        return {'calls': 0,
+                'cache_hits': 0,
+                'coalesced': 0,
+                'network_calls': 0,
+                'retries': 0,
+                'errors': 0,
+                'bytes': 0,
+                'latency_sec': 0.0,
+                'max_latency_sec': 0.0,
+                'latency_histogram': [0] * (len(UpstreamStats.LATENCY_BUCKETS_SEC) + 1),
+                'status_codes': collections.Counter()}
+
+    def get_context(self):
+        return getattr(self.local, 'context', UpstreamStats.NO_CONTEXT)
+
+    @contextlib.contextmanager
+    def context(self, name):
+        """attributes the upstream calls made by this thread within this context to `name` (e.g., an
+        `expand_*` method), and records the calls to, and the time spent in, `name` (inclusive of nested contexts)"""
+        previous_context = self.get_context()
+        self.local.context = name
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_sec = time.perf_counter() - start_time
+            self.local.context = previous_context
+            with self.lock:
+                context_stats = self.get_context_stats(name)
+                context_stats['calls'] += 1
+                context_stats['seconds'] += elapsed_sec
+
+    def get_context_stats(self, name):
+        context_stats = self.context_stats.get(name, None)
+        if context_stats is None:
+            context_stats = {'calls': 0, 'seconds': 0.0, 'endpoint_calls': collections.Counter()}
+            self.context_stats[name] = context_stats
+        return context_stats
+
+    def record(self, endpoint, latency_sec, cache_hit=False, coalesced=False, retries=0, error=False, status_code=None,
+               num_bytes=0):
+        """records one call to an upstream endpoint
+
+        :param endpoint: the endpoint name (see `get_endpoint`)
+        :param latency_sec: seconds from the start of the call to its result, including retries
+        :param cache_hit: whether the result came from a cache rather than the network
+        :param coalesced: whether the result was shared from an identical call that another thread had in flight
+        :param retries: number of times the call was retried
+        :param error: whether the call failed (an exception, or a retryable status code after the last retry)
+        :param status_code: the HTTP status code of the response, if any
+        :param num_bytes: the size of the response body received over the network
+        """
+        context = self.get_context()
+        with self.lock:
+            endpoint_stats = self.endpoint_stats.get(endpoint, None)
+            if endpoint_stats is None:
+                endpoint_stats = UpstreamStats.make_endpoint_stats()
+                self.endpoint_stats[endpoint] = endpoint_stats
+            endpoint_stats['calls'] += 1
+            if cache_hit:
+                endpoint_stats['cache_hits'] += 1
+            elif coalesced:
+                endpoint_stats['coalesced'] += 1
+            else:
+                endpoint_stats['network_calls'] += 1
+            endpoint_stats['retries'] += retries
+            if error:
+                endpoint_stats['errors'] += 1
+            endpoint_stats['bytes'] += num_bytes
+            endpoint_stats['latency_sec'] += latency_sec
+            endpoint_stats['max_latency_sec'] = max(endpoint_stats['max_latency_sec'], latency_sec)
+            endpoint_stats['latency_histogram'][bisect.bisect_left(UpstreamStats.LATENCY_BUCKETS_SEC,
+                                                                   latency_sec)] += 1
+            if status_code is not None:
+                endpoint_stats['status_codes'][status_code] += 1
+            self.get_context_stats(context)['endpoint_calls'][endpoint] += 1
+
+    def count_network_calls(self):
+        """returns the number of upstream calls so far that were not answered from a cache"""
+        with self.lock:
+            return sum(endpoint_stats['network_calls'] for endpoint_stats in self.endpoint_stats.values())
+
+    @staticmethod
+    def instrument_client(client, endpoint, before_call=None):
+        """returns a proxy for `client` (e.g., a `mygene.MyGeneInfo`) that records each of its method calls in the
+        process-wide `UpstreamStats`, under the endpoint ``endpoint + '/' + method_name``
+
+        :param before_call: a function of no arguments that is called before each method call (e.g., to wait for a
+        rate limiter, since the client does not send its requests through the `HTTPClient`)
+        """
+        return InstrumentedClient(client, endpoint, before_call)
+
+    def report(self):
+        """returns a JSON-serializable ``dict`` with all of the statistics"""
+        with self.lock:
+            endpoints = dict()
+            for endpoint, endpoint_stats in self.endpoint_stats.items():
+                endpoint_report = dict(endpoint_stats)
+                endpoint_report['latency_histogram'] = list(endpoint_stats['latency_histogram'])
+                endpoint_report['status_codes'] = {str(status_code): count for status_code, count in
+                                                   endpoint_stats['status_codes'].items()}
+                endpoint_report['cache_hit_ratio'] = endpoint_stats['cache_hits'] / endpoint_stats['calls']
+                endpoint_report['mean_latency_sec'] = endpoint_stats['latency_sec'] / endpoint_stats['calls']
+                endpoints[endpoint] = endpoint_report
+            contexts = {name: {'calls': context_stats['calls'],
+                               'seconds': context_stats['seconds'],
+                               'endpoint_calls': dict(context_stats['endpoint_calls'])}
+                        for name, context_stats in self.context_stats.items()}
+        cached_methods = dict()
+        for method in CachedMethods.cached_methods:
+            info = method.cache_info()
+            num_lookups = info.hits + info.misses
+            cached_methods[method.__qualname__] = {'hits': info.hits,
+                                                   'misses': info.misses,
+                                                   'hit_ratio': info.hits / num_lookups if num_lookups > 0 else None,
+                                                   'currsize': info.currsize}
+        return {'elapsed_sec': time.time() - self.start_time,
+                'latency_buckets_sec': list(UpstreamStats.LATENCY_BUCKETS_SEC),
+                'endpoints': endpoints,
+                'contexts': contexts,
+                'cached_methods': cached_methods}
+
+    def write_report(self, file_name):
+        with open(file_name, 'w') as report_file:
+            json.dump(self.report(), report_file, indent=2, sort_keys=True)
+
+    def summary(self, max_lines=10):
+        """returns a short human-readable summary: the endpoints and contexts that took the most time"""
+        report = self.report()
+        lines = ['upstream calls after ' + format(report['elapsed_sec'], '.0f') + ' s:']
+        for endpoint, endpoint_report in sorted(report['endpoints'].items(),
+                                                key=lambda item: -item[1]['latency_sec'])[:max_lines]:
+            lines.append('  ' + endpoint + ': ' + str(endpoint_report['calls']) + ' calls, ' +
+                         format(endpoint_report['latency_sec'], '.1f') + ' s, ' +
+                         format(endpoint_report['mean_latency_sec'], '.3f') + ' s/call, ' +
+                         format(100.0 * endpoint_report['cache_hit_ratio'], '.0f') + '% cached, ' +
+                         str(endpoint_report['coalesced']) + ' coalesced, ' +
+                         str(endpoint_report['retries']) + ' retries, ' + str(endpoint_report['errors']) + ' errors, ' +
+                         format(endpoint_report['bytes'] / 1e6, '.1f') + ' MB')
+        for name, context_report in sorted(report['contexts'].items(),
+                                           key=lambda item: -item[1]['seconds'])[:max_lines]:
+            if context_report['calls'] > 0:
+                lines.append('  ' + name + ': ' + str(context_report['calls']) + ' calls, ' +
+                             format(context_report['seconds'], '.1f') + ' s, ' +
+                             str(sum(context_report['endpoint_calls'].values())) + ' upstream calls')
+        return '\n'.join(lines)
+
+    def start_periodic_summary(self, interval_sec):
+        """prints the `summary` every `interval_sec` seconds from a background thread"""
+        self.summary_stop_event = threading.Event()
+        self.summary_interval_sec = interval_sec
+
+        def print_summaries(stop_event):
+            while not stop_event.wait(interval_sec):
+                print(self.summary())
+
+        self.summary_thread = threading.Thread(target=print_summaries, args=(self.summary_stop_event,), daemon=True)
+        self.summary_thread.start()
+
+    def stop_periodic_summary(self):
+        if self.summary_thread is not None:
+            self.summary_stop_event.set()
+            self.summary_thread.join()
+            self.summary_thread = None
+
+    @contextlib.contextmanager
+    def paused_periodic_summary(self):
+        """stops the thread of `start_periodic_summary`, if it is running, within this context and then restarts it;
+        fork worker processes within this context, since a child that is forked while that thread holds a lock (e.g.,
+        of `sys.stdout`) can never acquire the lock"""
+        interval_sec = self.summary_interval_sec if self.summary_thread is not None else None
+        self.stop_periodic_summary()
+        try:
+            yield
+        finally:
+            if interval_sec is not None:
+                self.start_periodic_summary(interval_sec)
+
+
+class InstrumentedClient:
+    """a proxy that records the method calls of an API client object in the process-wide `UpstreamStats`"""
+
+    def __init__(self, client, endpoint, before_call=None):
+        self.client = client
+        self.endpoint = endpoint
+        self.before_call = before_call
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+        endpoint = self.endpoint + '/' + name
+
+        def instrumented_method(*args, **kwargs):
+            if self.before_call is not None:
+                self.before_call()
+            stats = UpstreamStats.get_instance()
+            start_time = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception:
+                stats.record(endpoint, time.perf_counter() - start_time, error=True)
+                raise
+            stats.record(endpoint, time.perf_counter() - start_time)
+            return result
+
+        return instrumented_method
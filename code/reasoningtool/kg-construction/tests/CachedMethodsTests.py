@@ -0,0 +1,145 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+import CachedMethods
+
+
+class CachedMethodsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def tearDown(self):
+        CachedMethods.use_backend(CachedMethods.MemoryBackend())
+
+    def make_method(self, **kwargs):
+        calls = self.calls
+
+        @CachedMethods.register(**kwargs)
+        def lookup(ids, option=None):
+            calls.append(ids)
+            return len(ids)
+        return lookup
+
+    def test_unhashable_arguments(self):
+        lookup = self.make_method()
+        self.assertEqual(lookup(['a', 'b']), 2)
+        self.assertEqual(lookup(['a', 'b']), 2)
+        self.assertEqual(lookup({'b', 'a'}), 2)
+        self.assertEqual(lookup({'a', 'b'}), 2)
+        self.assertEqual(len(self.calls), 2)
+        info = lookup.cache_info()
+        self.assertEqual(info.hits, 2)
+        self.assertEqual(info.misses, 2)
+
+    def test_maxsize_evicts_least_recently_used(self):
+        lookup = self.make_method(maxsize=2)
+        lookup('a')
+        lookup('bb')
+        lookup('a')
+        lookup('ccc')
+        self.assertEqual(lookup.cache_info().evictions, 1)
+        self.assertEqual(lookup.cache_info().currsize, 2)
+        lookup('a')
+        self.assertEqual(self.calls, ['a', 'bb', 'ccc'])
+
+    def test_ttl(self):
+        lookup = self.make_method(ttl=0.05)
+        lookup('a')
+        time.sleep(0.1)
+        lookup('a')
+        self.assertEqual(self.calls, ['a', 'a'])
+
+    def test_empty_results_expire_sooner(self):
+        calls = self.calls
+
+        @CachedMethods.register(ttl=60, empty_ttl=0.05)
+        def lookup(symbol):
+            calls.append(symbol)
+            return set() if symbol.startswith('FAIL') else {symbol.lower()}
+
+        lookup('FAIL1')
+        lookup('HMOX1')
+        time.sleep(0.1)
+        lookup('FAIL1')
+        lookup('HMOX1')
+        self.assertEqual(calls, ['FAIL1', 'HMOX1', 'FAIL1'])
+
+    def test_self_requires_skip_self(self):
+        calls = self.calls
+
+        class Query:
+            @CachedMethods.register
+            def convert(self, symbol):
+                calls.append(symbol)
+                return symbol.lower()
+
+        # `self` has neither a stable repr nor one that reflects its state, so it cannot be part of the key
+        with self.assertRaises(TypeError):
+            Query().convert('HMOX1')
+        self.assertEqual(calls, [])
+
+    def test_sqlite_backend_is_shared(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'cache.sqlite')
+            CachedMethods.use_backend(CachedMethods.SqliteBackend(path))
+            lookup = self.make_method()
+            self.assertEqual(lookup(('x', 'y', 'z')), 3)
+            # a second process would open its own connection to the same file
+            CachedMethods.use_backend(CachedMethods.SqliteBackend(path))
+            self.assertEqual(lookup(('x', 'y', 'z')), 3)
+            self.assertEqual(len(self.calls), 1)
+            lookup.cache_clear()
+            self.assertEqual(lookup.cache_info().currsize, 0)
+
+    def test_sqlite_backend_access_time_resolution(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            backend = CachedMethods.SqliteBackend(os.path.join(tmpdir, 'cache.sqlite'))
+            backend.set('ns', 'k', 'v', None)
+            conn = backend._connect()
+            conn.execute('UPDATE cache SET accessed=1')
+            self.assertEqual(backend.get('ns', 'k', None), (True, 'v'))
+            accessed = conn.execute('SELECT accessed FROM cache').fetchone()[0]
+            self.assertGreater(accessed, 1)
+            # a recent access time is not rewritten on a hit
+            self.assertEqual(backend.get('ns', 'k', None), (True, 'v'))
+            self.assertEqual(conn.execute('SELECT accessed FROM cache').fetchone()[0], accessed)
+
+    def test_skip_self(self):
+        calls = self.calls
+
+        class Query:
+            @CachedMethods.register(skip_self=True)
+            def convert(self, symbol):
+                calls.append(symbol)
+                return symbol.lower()
+
+        self.assertEqual(Query().convert('HMOX1'), 'hmox1')
+        self.assertEqual(Query().convert('HMOX1'), 'hmox1')
+        self.assertEqual(calls, ['HMOX1'])
+
+    def test_cache_lookup_and_store(self):
+        calls = self.calls
+
+        class Query:
+            @CachedMethods.register(skip_self=True)
+            def convert(self, symbol):
+                calls.append(symbol)
+                return {symbol.lower()}
+
+        query = Query()
+        self.assertEqual(Query.convert.cache_lookup(query, 'HMOX1'), (False, None))
+        Query.convert.cache_store(set(), query, 'XYZZY')
+        self.assertEqual(Query.convert.cache_lookup(query, 'XYZZY'), (True, set()))
+        self.assertEqual(query.convert('XYZZY'), set())
+        self.assertEqual(calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
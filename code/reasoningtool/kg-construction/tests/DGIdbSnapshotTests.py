@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import http.server
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+from DGIdbSnapshot import DGIdbSnapshot
+
+INTERACTIONS_TSV = '\n'.join([
+    'gene_name\tgene_claim_name\tentrez_id\tinteraction_claim_source\tinteraction_types\tdrug_claim_name\t'
+    'drug_claim_primary_name\tdrug_name\tdrug_chembl_id\tPMIDs',
+    'PTGS1\tPTGS1\t5742\tDrugBank\tinhibitor\tDB00945\tAspirin\tASPIRIN\tCHEMBL25\t8148711',
+    'PTGS2\tPTGS2\t5743\tDrugBank\tinhibitor\tDB00945\tAspirin\tASPIRIN\tCHEMBL25\t',
+    '\tEGFR_CLAIM\t\tTTD\t\tgefitinib\tGefitinib\tGEFITINIB\tCHEMBL939\t'])
+
+
+class InteractionsRequestHandler(http.server.BaseHTTPRequestHandler):
+    ETAG = '"v1"'
+    num_downloads = 0
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match', None) == InteractionsRequestHandler.ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        InteractionsRequestHandler.num_downloads += 1
+        body = INTERACTIONS_TSV.encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', InteractionsRequestHandler.ETAG)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DGIdbSnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'dgidb.sqlite')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_load_and_lookup(self):
+        snapshot = DGIdbSnapshot(self.path)
+        num_rows = snapshot.load(INTERACTIONS_TSV.splitlines(), {'etag': '"v1"'}, batch_size=2)
+        self.assertEqual(num_rows, 3)
+        self.assertEqual(snapshot.get_metadata()['etag'], '"v1"')
+        batches = list(snapshot.iterate_rows(batch_size=2))
+        self.assertEqual([len(rows) for rows in batches], [2, 1])
+        self.assertEqual(batches[1][0]['gene_symbol'], 'EGFR_CLAIM')
+        self.assertEqual([row['gene_symbol'] for row in snapshot.get_rows_for_drug('CHEMBL25')], ['PTGS1', 'PTGS2'])
+        self.assertEqual(snapshot.get_rows_for_gene('PTGS1')[0]['PMIDs'], '8148711')
+        self.assertEqual(len(snapshot.get_rows_for_drug_name('GEFITINIB')), 1)
+        # a reload replaces the previous rows
+        snapshot.load(INTERACTIONS_TSV.splitlines()[:2])
+        self.assertEqual(len(snapshot.get_rows_for_drug('CHEMBL25')), 1)
+        self.assertNotIn('etag', snapshot.get_metadata())
+
+    def test_refresh_is_conditional(self):
+        server = http.server.HTTPServer(('127.0.0.1', 0), InteractionsRequestHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = 'http://127.0.0.1:' + str(server.server_address[1]) + '/data/interactions.tsv'
+            snapshot = DGIdbSnapshot(self.path, url=url)
+            self.assertTrue(snapshot.refresh())
+            # checked recently, so upstream is not asked again
+            self.assertFalse(snapshot.refresh())
+            # unchanged upstream
+            self.assertFalse(snapshot.refresh(force=True))
+            self.assertEqual(InteractionsRequestHandler.num_downloads, 1)
+            self.assertEqual(snapshot.get_metadata()['num_rows'], '3')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
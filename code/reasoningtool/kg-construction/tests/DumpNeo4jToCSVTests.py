@@ -0,0 +1,102 @@
+import unittest
+import os
+import re
+import sys
+import gzip
+import tempfile
+import threading
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+import DumpNeo4jToCSV
+
+# (label, UUID, name)
+NODES = [('protein' if i % 3 else 'disease', 'uuid' + str(i), 'node ' + str(i)) for i in range(25)]
+# (type, source UUID, target UUID, provided_by)
+RELS = [('regulates' if i % 2 else 'gene_assoc_with', 'uuid' + str(i), 'uuid' + str(i + 1), 'BioLink')
+        for i in range(24)]
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def run(self, query, parameters=None):
+        self.driver.queries.append(query)
+        if 'db.labels' in query:
+            return [{'label': label} for label in sorted(set(node[0] for node in NODES)) + ['Base']]
+        if 'db.relationshipTypes' in query:
+            return [{'relationshipType': rel_type} for rel_type in sorted(set(rel[0] for rel in RELS))]
+        name = re.search('`([^`]*)`', query).group(1)
+        if 'count(' in query:
+            return [{'count': len([row for row in NODES + RELS if row[0] == name]) + self.driver.num_missing}]
+        # a generator, like the driver's result, which yields the records as they are streamed
+        if '-[r' in query:
+            return ({'source_uuid': row[1], 'target_uuid': row[2], 'provided_by': row[3]}
+                    for row in RELS if row[0] == name)
+        return ({'uuid': row[1], 'name': row[2]} for row in NODES if row[0] == name)
+
+
+class FakeDriver:
+    def __init__(self, num_missing=0):
+        self.queries = []
+        self.num_missing = num_missing
+
+    def session(self):
+        return FakeSession(self)
+
+
+class DumpNeo4jToCSVTestCase(unittest.TestCase):
+
+    def test_paginated_export(self):
+        driver = FakeDriver()
+        with tempfile.TemporaryDirectory() as export_dir:
+            nodes_file_name = os.path.join(export_dir, 'nodes.csv.gz')
+            rels_file_name = os.path.join(export_dir, 'rels.tsv')
+            num_nodes = DumpNeo4jToCSV.make_nodes_file(driver, nodes_file_name, page_size=4, num_workers=2)
+            num_rels = DumpNeo4jToCSV.make_rels_file(driver, rels_file_name, separator='\t', page_size=4)
+            self.assertEqual(num_nodes, {'disease': 9, 'protein': 16})
+            self.assertEqual(num_rels, {'gene_assoc_with': 12, 'regulates': 12})
+            with gzip.open(nodes_file_name, 'rt') as nodes_file:
+                node_lines = nodes_file.read().splitlines()
+            self.assertEqual(len(node_lines), len(NODES))
+            self.assertIn('node,uuid3,disease,node 3', node_lines)
+            with open(rels_file_name) as rels_file:
+                rel_lines = rels_file.read().splitlines()
+            self.assertEqual(len(rel_lines), len(RELS))
+            self.assertIn('rel\tuuid1\tuuid2\tBioLink:regulates', rel_lines)
+            self.assertTrue(DumpNeo4jToCSV.verify_counts(driver, DumpNeo4jToCSV.NODES_COUNT_QUERY, num_nodes))
+            self.assertTrue(DumpNeo4jToCSV.verify_counts(driver, DumpNeo4jToCSV.RELS_COUNT_QUERY, num_rels))
+        # each partition is read with one query
+        self.assertEqual(len([query for query in driver.queries if '`protein`' in query and 'count(' not in query]), 1)
+
+    def test_partition_is_written_in_pages(self):
+        class RecordingWriter:
+            def __init__(self):
+                self.writes = []
+
+            def writerows(self, rows):
+                self.writes.append(len(rows))
+
+        writer = RecordingWriter()
+        num_rows = DumpNeo4jToCSV.export_partition(FakeDriver(), DumpNeo4jToCSV.NODES_QUERY % 'protein',
+                                                   lambda record: [record['uuid']], writer, threading.Lock(),
+                                                   page_size=5)
+        self.assertEqual(num_rows, 16)
+        self.assertEqual(writer.writes, [5, 5, 5, 1])
+
+    def test_count_mismatch(self):
+        driver = FakeDriver(num_missing=1)
+        self.assertFalse(DumpNeo4jToCSV.verify_counts(driver, DumpNeo4jToCSV.NODES_COUNT_QUERY,
+                                                      {'disease': 9, 'protein': 16}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import os
+import sys
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+from Orangeboard import Orangeboard
+from BioNetExpander import BioNetExpander
+from ExpansionBudget import ExpansionBudget
+from UpstreamStats import UpstreamStats
+
+
+def make_test_expander():
+    """returns a `BioNetExpander` whose proteins expand into a binary tree: protein n adds proteins 2n and 2n+1"""
+    ob = Orangeboard(debug=False)
+    ob.set_dict_reltype_dirs({'physically_interacts_with': False})
+    bne = BioNetExpander.__new__(BioNetExpander)
+    bne.orangeboard = ob
+    bne.num_workers = 1
+    bne.expanded_names = []
+
+    def expand_protein(node):
+        bne.expanded_names.append(node.name)
+        for child_number in (2 * int(node.name), 2 * int(node.name) + 1):
+            child_node = ob.add_node('protein', str(child_number), desc='')
+            ob.add_rel('physically_interacts_with', 'test', node, child_node)
+
+    bne.expand_protein = expand_protein
+    ob.add_node('protein', '1', seed_node_bool=True, desc='')
+    return bne
+
+
+class ExpansionBudgetTestCase(unittest.TestCase):
+
+    def test_max_seed_distance(self):
+        bne = make_test_expander()
+        self.assertIsNone(bne.expand_with_budget(ExpansionBudget(), max_seed_distance=2))
+        self.assertEqual(bne.expanded_names, ['1', '2', '3'])
+        self.assertEqual(bne.orangeboard.count_nodes(), 7)
+
+    def test_max_nodes(self):
+        bne = make_test_expander()
+        reason = bne.expand_with_budget(ExpansionBudget(max_nodes=4))
+        self.assertEqual(reason, 'node budget of 4 reached')
+        self.assertEqual(bne.expanded_names, ['1', '2'])
+
+    def test_max_api_calls(self):
+        UpstreamStats.set_instance(UpstreamStats())
+        try:
+            bne = make_test_expander()
+            expand_protein = bne.expand_protein
+
+            def expand_protein_with_api_call(node):
+                UpstreamStats.get_instance().record('reactome.org/ContentService', 0.1)
+                expand_protein(node)
+
+            bne.expand_protein = expand_protein_with_api_call
+            reason = bne.expand_with_budget(ExpansionBudget(max_api_calls=3))
+            self.assertEqual(reason, 'API call budget of 3 reached')
+            self.assertEqual(bne.expanded_names, ['1', '2', '3'])
+        finally:
+            UpstreamStats.set_instance(None)
+
+    def test_prefetch_batch_fits_the_api_call_budget(self):
+        UpstreamStats.set_instance(UpstreamStats())
+        try:
+            bne = make_test_expander()
+            bne.num_workers = 2
+            expand_protein = bne.expand_protein
+            prefetched_names = set()
+
+            def prefetch_nodes(nodes):
+                for node in nodes:
+                    UpstreamStats.get_instance().record('reactome.org/ContentService', 0.1)
+                    prefetched_names.add(node.name)
+
+            def expand_protein_with_api_call(node):
+                if node.name not in prefetched_names:
+                    UpstreamStats.get_instance().record('reactome.org/ContentService', 0.1)
+                expand_protein(node)
+
+            bne.prefetch_identifiers = lambda nodes: None
+            bne.prefetch_nodes = prefetch_nodes
+            bne.expand_protein = expand_protein_with_api_call
+            reason = bne.expand_with_budget(ExpansionBudget(max_api_calls=2))
+            self.assertEqual(reason, 'API call budget of 2 reached')
+            self.assertEqual(bne.expanded_names, ['1', '2'])
+            self.assertEqual(UpstreamStats.get_instance().count_network_calls(), 2)
+        finally:
+            UpstreamStats.set_instance(None)
+
+    def test_priority(self):
+        bne = make_test_expander()
+        # expand the highest-numbered protein first, i.e., depth-first down the right-hand side of the tree
+        bne.expand_with_budget(ExpansionBudget(), priority=lambda node, seed_distance: -int(node.name),
+                               max_seed_distance=3)
+        self.assertEqual(bne.expanded_names, ['1', '3', '7', '6', '2', '5', '4'])
+
+
+if __name__ == '__main__':
+    unittest.main()
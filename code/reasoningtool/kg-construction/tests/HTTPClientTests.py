@@ -0,0 +1,141 @@
+import unittest
+
+import os,sys
+import tempfile
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,parentdir)
+
+import requests
+import HTTPClient as HTTPClientModule
+from HTTPClient import HTTPClient
+from ResponseCache import ResponseCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers if headers is not None else {}
+        self.url = 'https://reactome.org/x'
+        self.encoding = 'utf-8'
+        self.content = b'{}'
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.requests = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.requests.append((method, url, timeout, kwargs))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class HTTPClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sleep = HTTPClientModule.time.sleep
+        self.wait_times = []
+        HTTPClientModule.time.sleep = self.wait_times.append
+
+    def tearDown(self):
+        HTTPClientModule.time.sleep = self.sleep
+
+    def make_client(self, outcomes, **kwargs):
+        client = HTTPClient(**kwargs)
+        session = FakeSession(outcomes)
+        client.get_session = lambda host: session
+        return client, session
+
+    def test_get(self):
+        client, session = self.make_client([FakeResponse(200)], connect_timeout=5)
+        res = client.get('https://www.uniprot.org/uniprot/P68871.xml', params={'a': 1}, timeout=60)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(session.requests, [('GET', 'https://www.uniprot.org/uniprot/P68871.xml', (5, 60),
+                                             {'params': {'a': 1}})])
+
+    def test_retry_status_code(self):
+        client, session = self.make_client([FakeResponse(503, {'Retry-After': '2'}), FakeResponse(404)])
+        self.assertEqual(client.post('https://reactome.org/x', data='q').status_code, 404)
+        self.assertEqual(len(session.requests), 2)
+        self.assertEqual(self.wait_times, [2.0])
+
+    def test_retry_connection_error(self):
+        client, session = self.make_client([requests.exceptions.ConnectionError(), FakeResponse(200)], backoff=1.0)
+        self.assertEqual(client.get('https://reactome.org/x').status_code, 200)
+        self.assertEqual(len(self.wait_times), 1)
+        self.assertTrue(0.5 <= self.wait_times[0] <= 1.0)
+
+    def test_retries_exhausted(self):
+        client, session = self.make_client([requests.exceptions.Timeout()] * 3, max_retries=2)
+        with self.assertRaises(requests.exceptions.Timeout):
+            client.get('https://reactome.org/x')
+        client, session = self.make_client([FakeResponse(500)] * 3, max_retries=2)
+        self.assertEqual(client.get('https://reactome.org/x').status_code, 500)
+
+    def test_response_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            response_cache = ResponseCache(os.path.join(tmpdir, 'responses.sqlite'))
+            client, session = self.make_client([FakeResponse(404), FakeResponse(200)], response_cache=response_cache)
+            self.assertEqual(client.get('https://reactome.org/x', params={'q': 1}).status_code, 404)
+            self.assertEqual(client.get('https://reactome.org/x', params={'q': 1}).status_code, 200)
+            res = client.get('https://reactome.org/x?q=1')
+            self.assertEqual(res.status_code, 200)
+            self.assertTrue(res.from_cache)
+            self.assertEqual(len(session.requests), 2)
+
+    def test_post_is_cached_only_on_request(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            response_cache = ResponseCache(os.path.join(tmpdir, 'responses.sqlite'))
+            client, session = self.make_client([FakeResponse(200)] * 3, response_cache=response_cache)
+            client.post('https://www.omim.org/login', data='user')
+            client.post('https://www.omim.org/login', data='user')
+            self.assertEqual(len(session.requests), 2)
+            client.post('https://www.uniprot.org/', data='query', cache=True)
+            self.assertTrue(client.post('https://www.uniprot.org/', data='query', cache=True).from_cache)
+            self.assertEqual(len(session.requests), 3)
+
+    def test_cached_requests_only(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            response_cache = ResponseCache(os.path.join(tmpdir, 'responses.sqlite'))
+            client, session = self.make_client([FakeResponse(200)] * 3, response_cache=response_cache)
+            with client.cached_requests_only():
+                self.assertEqual(client.get('https://reactome.org/x').status_code, 200)
+                with self.assertRaises(HTTPClientModule.UncachedRequestError):
+                    client.post('https://www.omim.org/login', data='user')
+                client.post('https://www.uniprot.org/', data='query', cache=True)
+            client.post('https://www.omim.org/login', data='user')
+            # only the request that is refused is not sent; it is sent once the context is left
+            self.assertEqual([request[1] for request in session.requests],
+                             ['https://reactome.org/x', 'https://www.uniprot.org/', 'https://www.omim.org/login'])
+
+    def test_throttle_requests(self):
+        client = HTTPClient()
+        acquired = []
+
+        class RecordingRateLimiter:
+            def __init__(self, name):
+                self.name = name
+
+            def acquire(self, url):
+                acquired.append((self.name, url))
+
+        client.throttle('https://reactome.org/x')
+        self.assertEqual(acquired, [])
+        outer, inner = RecordingRateLimiter('outer'), RecordingRateLimiter('inner')
+        with client.throttle_requests(outer):
+            with client.throttle_requests(inner):
+                client.throttle('https://reactome.org/x')
+            client.throttle('https://www.uniprot.org/y')
+        client.throttle('https://reactome.org/z')
+        self.assertEqual(acquired, [('outer', 'https://reactome.org/x'), ('inner', 'https://reactome.org/x'),
+                                    ('outer', 'https://www.uniprot.org/y')])
+        # the limiters are applied by the adapter of the client's own sessions, not to all `requests` traffic
+        self.assertIsInstance(client.get_session('reactome.org').get_adapter('https://reactome.org/x'),
+                              HTTPClientModule.ThrottlingHTTPAdapter)
+
+
+if __name__ == '__main__':
+    unittest.main()
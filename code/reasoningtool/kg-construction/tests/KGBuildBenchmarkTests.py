@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+import tempfile
+import collections
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+from BioNetExpander import BioNetExpander
+from KGBuildBenchmark import KGBuildBenchmark
+
+
+def make_result(elapsed_sec, label):
+    return {'timestamp': '2018-06-01T12:00:00',
+            'git_commit': 'abc1234',
+            'label': label,
+            'elapsed_sec': elapsed_sec,
+            'num_nodes': 1000,
+            'num_rels': 4000,
+            'nodes_per_sec': 1000 / elapsed_sec,
+            'rels_per_sec': 4000 / elapsed_sec,
+            'peak_rss_mb': 200.0,
+            'api_calls': 500,
+            'api_calls_per_node': 0.5,
+            'expand_method_sec': {'expand_protein': elapsed_sec / 2},
+            'expand_method_calls': {'expand_protein': 10}}
+
+
+class KGBuildBenchmarkTestCase(unittest.TestCase):
+
+    def test_save_and_load_results(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_name = os.path.join(tmpdir, 'results.jsonl')
+            self.assertEqual(KGBuildBenchmark.load_results(file_name), [])
+            for elapsed_sec, label in ((10.0, 'master'), (8.0, 'branch'), (9.0, 'master')):
+                KGBuildBenchmark.save_result(make_result(elapsed_sec, label), file_name)
+            results = KGBuildBenchmark.load_results(file_name)
+            self.assertEqual(len(results), 3)
+            self.assertEqual(KGBuildBenchmark.find_baseline(results)['elapsed_sec'], 9.0)
+            self.assertEqual(KGBuildBenchmark.find_baseline(results, 'branch')['elapsed_sec'], 8.0)
+            self.assertIsNone(KGBuildBenchmark.find_baseline(results, 'other'))
+
+    def test_compare(self):
+        lines = KGBuildBenchmark.compare(make_result(8.0, 'branch'), make_result(10.0, 'master'))
+        self.assertIn('  elapsed_sec: 10.000 -> 8.000 (-20.0%, better)', lines)
+        self.assertIn('  nodes_per_sec: 100.000 -> 125.000 (+25.0%, better)', lines)
+        self.assertIn('  num_nodes: 1000.000 -> 1000.000 (+0.0%)', lines)
+        self.assertIn('  expand_protein_sec: 5.000 -> 4.000 (-20.0%, better)', lines)
+
+    def test_time_expand_methods(self):
+        BioNetExpander.expand_test_type = lambda self, node: None
+        try:
+            expander = BioNetExpander.__new__(BioNetExpander)
+            other_expander = BioNetExpander.__new__(BioNetExpander)
+            times = collections.Counter()
+            calls = collections.Counter()
+            with KGBuildBenchmark.time_expand_methods(expander, times, calls):
+                expander.expand_test_type(None)
+                expander.expand_test_type(None)
+                other_expander.expand_test_type(None)
+            expander.expand_test_type(None)
+            self.assertEqual(calls, {'expand_test_type': 2})
+            self.assertIn('expand_test_type', times)
+        finally:
+            del BioNetExpander.expand_test_type
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import neo4j.exceptions
+
+import os,sys
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,parentdir)
+
+import Neo4jBulkWriter as Neo4jBulkWriterModule
+from Neo4jBulkWriter import Neo4jBulkWriter
+from Neo4jConnection import Neo4jConnection
+
+
+class FakeTransaction:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, parameters):
+        self.driver.queries.append(query)
+        if self.driver.num_failures > 0:
+            self.driver.num_failures -= 1
+            raise self.driver.failure('DeadlockDetected')
+        if 'num_deleted' in query:
+            kind = 'rels' if 'DELETE r' in query else 'nodes'
+            num_deleted = min(parameters['batch_size'], self.driver.num_remaining[kind])
+            self.driver.num_remaining[kind] -= num_deleted
+            return [{'num_deleted': num_deleted}]
+        self.driver.batches.append(parameters['rows'])
+        return [{'row': row} for row in parameters['rows']]
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def write_transaction(self, unit_of_work):
+        return unit_of_work(FakeTransaction(self.driver))
+
+
+class FakeDriver:
+    def __init__(self, num_failures=0, failure=neo4j.exceptions.TransientError):
+        self.num_failures = num_failures
+        self.failure = failure
+        self.batches = []
+        self.queries = []
+        self.num_remaining = {'rels': 0, 'nodes': 0}
+
+    def session(self):
+        return FakeSession(self)
+
+
+class Neo4jBulkWriterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sleep = Neo4jBulkWriterModule.time.sleep
+        Neo4jBulkWriterModule.time.sleep = lambda seconds: None
+
+    def tearDown(self):
+        Neo4jBulkWriterModule.time.sleep = self.sleep
+
+    def test_batches(self):
+        driver = FakeDriver()
+        writer = Neo4jBulkWriter(driver, batch_size=4, num_sessions=3)
+        records = writer.write('UNWIND $rows AS row RETURN row', list(range(10)))
+        self.assertEqual(sorted(len(batch) for batch in driver.batches), [2, 4, 4])
+        self.assertEqual(sorted(record['row'] for record in records), list(range(10)))
+
+    def test_empty(self):
+        driver = FakeDriver()
+        self.assertEqual(Neo4jBulkWriter(driver).write('UNWIND $rows AS row RETURN row', []), [])
+        self.assertEqual(driver.batches, [])
+
+    def test_retry(self):
+        driver = FakeDriver(num_failures=2)
+        writer = Neo4jBulkWriter(driver, batch_size=5, num_sessions=1, max_retries=2)
+        records = writer.write('UNWIND $rows AS row RETURN row', list(range(5)))
+        self.assertEqual(len(records), 5)
+
+    def test_retries_exhausted(self):
+        driver = FakeDriver(num_failures=3)
+        writer = Neo4jBulkWriter(driver, batch_size=5, num_sessions=1, max_retries=2)
+        with self.assertRaises(neo4j.exceptions.TransientError):
+            writer.write('UNWIND $rows AS row RETURN row', list(range(5)))
+
+    def test_permanent_error_is_not_retried(self):
+        driver = FakeDriver(num_failures=1, failure=neo4j.exceptions.ClientError)
+        writer = Neo4jBulkWriter(driver, batch_size=5, num_sessions=1, max_retries=2)
+        with self.assertRaises(neo4j.exceptions.ClientError):
+            writer.write('UNWIND $rows AS row RETURN row', list(range(5)))
+        self.assertEqual(len(driver.queries), 1)
+
+    def test_delete_nodes(self):
+        driver = FakeDriver(num_failures=1)
+        driver.num_remaining = {'rels': 25, 'nodes': 12}
+        writer = Neo4jBulkWriter(driver, batch_size=10)
+        self.assertEqual(writer.delete_nodes('(n:Base {seed_node_uuid: $uuid})', {'uuid': 'seed'}), (25, 12))
+        self.assertEqual(driver.num_remaining, {'rels': 0, 'nodes': 0})
+        # the relationships are deleted first, each batch in its own transaction
+        self.assertTrue(all('DELETE r' in query for query in driver.queries[:5]))
+        self.assertEqual(len(driver.queries), 1 + 4 + 3)
+
+    def test_neo4j_connection_update(self):
+        driver = FakeDriver(num_failures=1)
+        conn = Neo4jConnection.__new__(Neo4jConnection)
+        conn._writer = Neo4jBulkWriter(driver, batch_size=2, num_sessions=2)
+        nodes = [{'node_id': 'UniProtKB:P' + str(i), 'desc': 'protein ' + str(i)} for i in range(5)]
+        conn.update_protein_nodes_desc(nodes)
+        self.assertEqual(sorted(len(batch) for batch in driver.batches), [1, 2, 2])
+        self.assertEqual(driver.queries[-1], 'UNWIND $rows AS row MATCH (n:protein {id: row.node_id}) '
+                                             'SET n.description = row.desc')
+
+
+if __name__ == '__main__':
+    unittest.main()
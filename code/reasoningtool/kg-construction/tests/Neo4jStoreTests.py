@@ -0,0 +1,72 @@
+import unittest
+import os
+import sys
+import tempfile
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+from Neo4jStore import Neo4jStore
+
+
+class FakeSession:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def run(self, query):
+        return self
+
+    def consume(self):
+        pass
+
+
+class FakeDriver:
+    def __init__(self, num_failures):
+        # like neo4j-driver 1.7, creating a driver connects to Neo4j, which fails while Neo4j is starting
+        if FakeDriver.num_attempts < num_failures:
+            FakeDriver.num_attempts += 1
+            raise RuntimeError('ServiceUnavailable')
+
+    def session(self):
+        return FakeSession()
+
+
+class Neo4jStoreTestCase(unittest.TestCase):
+
+    def test_recreate(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            store_dir = os.path.join(data_dir, 'graph.db')
+            os.mkdir(store_dir)
+            open(os.path.join(store_dir, Neo4jStore.STORE_MARKER_FILE), 'w').close()
+            log_file_name = os.path.join(data_dir, 'neo4j.log')
+            store = Neo4jStore(store_dir, neo4j_command='sh -c \'echo $0 >> ' + log_file_name + '\'')
+            store.recreate()
+            self.assertFalse(os.path.exists(store_dir))
+            with open(log_file_name) as log_file:
+                self.assertEqual(log_file.read().split(), ['stop', 'start'])
+
+    def test_wait_until_available(self):
+        FakeDriver.num_attempts = 0
+        store = Neo4jStore('graph.db', start_timeout=5)
+        store.POLL_INTERVAL_SEC = 0.01
+        self.assertIsInstance(store.wait_until_available(lambda: FakeDriver(num_failures=3)), FakeDriver)
+        self.assertEqual(FakeDriver.num_attempts, 3)
+        # Neo4j never comes up
+        FakeDriver.num_attempts = 0
+        store.start_timeout = 0.05
+        with self.assertRaises(RuntimeError):
+            store.wait_until_available(lambda: FakeDriver(num_failures=1000))
+
+    def test_refuses_other_directories(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            store = Neo4jStore(data_dir, neo4j_command='false')
+            with self.assertRaises(ValueError):
+                store.recreate()
+            self.assertTrue(os.path.exists(data_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+import threading
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+from NodeUpdatePipeline import NodeUpdatePipeline
+from NodeFingerprintStore import NodeFingerprintStore
+
+
+class NodeUpdatePipelineTestCase(unittest.TestCase):
+
+    def test_batches_and_source_limits(self):
+        lock = threading.Lock()
+        num_in_flight = {'OMIM': 0, 'DOID': 0}
+        max_in_flight = {'OMIM': 0, 'DOID': 0}
+        batches = []
+
+        def fetch(node_id):
+            source = node_id.split(':')[0]
+            with lock:
+                num_in_flight[source] += 1
+                max_in_flight[source] = max(max_in_flight[source], num_in_flight[source])
+            time.sleep(0.002)
+            with lock:
+                num_in_flight[source] -= 1
+            if node_id == 'DOID:0':
+                return None
+            return {'node_id': node_id, 'desc': 'description of ' + node_id}
+
+        node_ids = ['OMIM:' + str(i) for i in range(20)] + ['DOID:' + str(i) for i in range(20)]
+        pipeline = NodeUpdatePipeline(fetch, batches.append, num_workers=6, batch_size=7, queue_size=3,
+                                      get_source=lambda node_id: node_id.split(':')[0], source_limits={'OMIM': 1})
+        self.assertEqual(pipeline.run(node_ids), 39)
+        self.assertTrue(all(len(batch) <= 7 for batch in batches))
+        self.assertEqual(sorted(node['node_id'] for batch in batches for node in batch),
+                         sorted(set(node_ids) - {'DOID:0'}))
+        self.assertEqual(max_in_flight['OMIM'], 1)
+
+    def test_restart_from_checkpoint(self):
+        batches = []
+
+        def fetch(node_id):
+            if node_id == 'N5':
+                raise ValueError('upstream error')
+            return {'node_id': node_id}
+
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            checkpoint_file = os.path.join(checkpoint_dir, 'update.checkpoint')
+            node_ids = ['N' + str(i) for i in range(10)]
+            pipeline = NodeUpdatePipeline(fetch, batches.append, num_workers=1, batch_size=2,
+                                          checkpoint_file=checkpoint_file)
+            with self.assertRaises(ValueError):
+                pipeline.run(node_ids)
+            written_node_ids = [node['node_id'] for batch in batches for node in batch]
+            self.assertEqual(written_node_ids, ['N0', 'N1', 'N2', 'N3', 'N4'])
+            batches.clear()
+            pipeline.fetch = lambda node_id: {'node_id': node_id}
+            self.assertEqual(pipeline.run(node_ids), 5)
+            self.assertEqual([node['node_id'] for batch in batches for node in batch], node_ids[5:])
+            self.assertFalse(os.path.exists(checkpoint_file))
+
+    def test_incremental_refresh(self):
+        descs = {'N1': 'first', 'N2': 'second', 'N3': 'third'}
+        fetched_node_ids = []
+        batches = []
+
+        def fetch(node_id):
+            fetched_node_ids.append(node_id)
+            return {'node_id': node_id, 'desc': descs[node_id]}
+
+        with tempfile.TemporaryDirectory() as fingerprint_dir:
+            store = NodeFingerprintStore(os.path.join(fingerprint_dir, 'fingerprints.sqlite'))
+            pipeline = NodeUpdatePipeline(fetch, batches.append, num_workers=2, batch_size=2,
+                                          fingerprint_store=store, fingerprint_namespace='update_desc')
+            self.assertEqual(pipeline.run(sorted(descs)), 3)
+            # only the node whose description changed is written
+            descs['N2'] = 'second, revised'
+            batches.clear()
+            self.assertEqual(pipeline.run(sorted(descs)), 1)
+            self.assertEqual(batches, [[{'node_id': 'N2', 'desc': 'second, revised'}]])
+            # nodes fetched within the last hour are not fetched again
+            fetched_node_ids.clear()
+            descs['N4'] = 'fourth'
+            pipeline.max_age = 3600
+            self.assertEqual(pipeline.run(sorted(descs)), 1)
+            self.assertEqual(fetched_node_ids, ['N4'])
+            self.assertEqual(set(store.get_fingerprints('update_desc')), {'N1', 'N2', 'N3', 'N4'})
+
+    def test_incremental_refresh_after_rebuild(self):
+        graph_ids = {'N1': 'uuid-1', 'N2': 'uuid-2'}
+        batches = []
+        with tempfile.TemporaryDirectory() as fingerprint_dir:
+            store = NodeFingerprintStore(os.path.join(fingerprint_dir, 'fingerprints.sqlite'))
+            pipeline = NodeUpdatePipeline(lambda node_id: {'node_id': node_id, 'desc': 'unchanged'}, batches.append,
+                                          num_workers=2, fingerprint_store=store, max_age=3600,
+                                          get_graph_id=graph_ids.get)
+            self.assertEqual(pipeline.run(['N1', 'N2']), 2)
+            self.assertEqual(pipeline.run(['N1', 'N2']), 0)
+            # the KG is rebuilt, which gives N2 a new UUID; it is written although it was fetched recently and its
+            # upstream data did not change
+            graph_ids['N2'] = 'uuid-2-rebuilt'
+            batches.clear()
+            self.assertEqual(pipeline.run(['N1', 'N2']), 1)
+            self.assertEqual(batches, [[{'node_id': 'N2', 'desc': 'unchanged'}]])
+
+
+if __name__ == '__main__':
+    unittest.main()
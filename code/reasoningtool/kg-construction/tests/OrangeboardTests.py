@@ -0,0 +1,169 @@
+import unittest
+import sys
+import os
+import tempfile
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,parentdir)
+
+from Orangeboard import Orangeboard
+
+
+def make_test_orangeboard():
+    ob = Orangeboard(debug=False)
+    ob.set_dict_reltype_dirs({'physically_interacts_with': False, 'participates_in': True})
+    prot1 = ob.add_node('protein', 'UniProtKB:P1', seed_node_bool=True, desc='GENE1')
+    prot2 = ob.add_node('protein', 'UniProtKB:P2', seed_node_bool=False, desc='GENE2')
+    pathway = ob.add_node('pathway', 'REACT:R-HSA-1', seed_node_bool=False, desc='a pathway')
+    prot1.set_extra_props({'symbol': 'GENE1', 'id': 'UniProtKB:P1'})
+    ob.add_rel('physically_interacts_with', 'reactome', prot1, prot2)
+    ob.add_rel('participates_in', 'reactome', prot2, pathway, prob=0.5)
+    return ob
+
+
+class OrangeboardTestCase(unittest.TestCase):
+
+    def test_undirected_rel_is_added_once(self):
+        ob = make_test_orangeboard()
+        prot1 = ob.get_node('protein', 'UniProtKB:P1')
+        prot2 = ob.get_node('protein', 'UniProtKB:P2')
+        rel = ob.add_rel('physically_interacts_with', 'reactome', prot2, prot1)
+        self.assertIs(rel, ob.get_rel('physically_interacts_with', prot1, prot2)[0])
+        self.assertEqual(ob.count_rels(), 2)
+
+    def test_directed_rels_are_distinct(self):
+        ob = make_test_orangeboard()
+        prot2 = ob.get_node('protein', 'UniProtKB:P2')
+        pathway = ob.get_node('pathway', 'REACT:R-HSA-1')
+        ob.add_rel('participates_in', 'reactome', pathway, prot2)
+        self.assertEqual(ob.count_rels(), 3)
+
+    def test_bytesize(self):
+        ob = make_test_orangeboard()
+        size = ob.bytesize()
+        ob.add_node('protein', 'UniProtKB:P3', desc='GENE3')
+        self.assertGreater(size, 0)
+        self.assertGreater(ob.bytesize(), size)
+
+    def test_set_node_uuids(self):
+        ob = make_test_orangeboard()
+        prot1 = ob.get_node('protein', 'UniProtKB:P1')
+        prot2 = ob.get_node('protein', 'UniProtKB:P2')
+        ob.set_node_uuids({('protein', 'UniProtKB:P1'): 'existing-uuid'})
+        self.assertEqual(prot1.uuid, 'existing-uuid')
+        self.assertEqual(prot2.get_props()['seed_node_uuid'], 'existing-uuid')
+        self.assertEqual(len(ob.get_all_nodes_for_seed_node_uuid('existing-uuid')), 3)
+        self.assertIsNotNone(ob.get_rel('physically_interacts_with', prot2, prot1)[0])
+
+    def test_export_neo4j_import_csv(self):
+        ob = make_test_orangeboard()
+        with tempfile.TemporaryDirectory() as output_dir:
+            command = ob.export_neo4j_import_csv(output_dir)
+            self.assertIn('--nodes=' + os.path.join(output_dir, 'nodes_protein.csv'), command)
+            with open(os.path.join(output_dir, 'nodes_protein.csv')) as nodes_file:
+                lines = nodes_file.read().splitlines()
+            self.assertEqual(len(lines), 3)
+            self.assertTrue(lines[0].startswith('"UUID:ID",'))
+            self.assertIn('"expanded:boolean"', lines[0])
+            with open(os.path.join(output_dir, 'rels_physically_interacts_with.csv')) as rels_file:
+                self.assertEqual(len(rels_file.read().splitlines()), 3)
+            with open(os.path.join(output_dir, 'rels_participates_in.csv')) as rels_file:
+                lines = rels_file.read().splitlines()
+            self.assertEqual(len(lines), 2)
+            self.assertIn('"probability:double"', lines[0])
+
+    def test_snapshot(self):
+        ob = make_test_orangeboard()
+        ob.neo4j_set_url('bolt://example:7687')
+        prot1 = ob.get_node('protein', 'UniProtKB:P1')
+        with tempfile.TemporaryDirectory() as output_dir:
+            file_name = os.path.join(output_dir, 'kg.pickle')
+            ob.save_snapshot(file_name, {'GENE1': prot1})
+            ob2 = Orangeboard(debug=False)
+            ob2.neo4j_set_url('bolt://other:7687')
+            extra_state = ob2.load_snapshot(file_name)
+        self.assertEqual(ob2.neo4j_url, 'bolt://other:7687')
+        self.assertEqual(ob2.count_nodes(), 3)
+        self.assertEqual(ob2.count_rels(), 2)
+        loaded_prot1 = ob2.get_node('protein', 'UniProtKB:P1')
+        self.assertEqual(loaded_prot1.uuid, prot1.uuid)
+        self.assertIs(extra_state['GENE1'], loaded_prot1)
+        self.assertIs(ob2.seed_node, loaded_prot1)
+        loaded_prot2 = ob2.get_node('protein', 'UniProtKB:P2')
+        self.assertIsNotNone(ob2.get_rel('physically_interacts_with', loaded_prot2, loaded_prot1)[0])
+        ob2.add_node('protein', 'UniProtKB:P3', desc='GENE3')
+        self.assertEqual(ob2.get_node('protein', 'UniProtKB:P3').node_id, 3)
+
+    def test_clear_from_seed_node(self):
+        ob = make_test_orangeboard()
+        prot1 = ob.get_node('protein', 'UniProtKB:P1')
+        drug = ob.add_node('chemical_substance', 'CHEMBL1', seed_node_bool=True, desc='a drug')
+        target = ob.add_node('protein', 'UniProtKB:P4', desc='GENE4')
+        ob.add_rel('physically_interacts_with', 'DGIdb', drug, target)
+        self.assertEqual(ob.count_nodes_by_nodetype_for_seed_node_uuid(prot1.uuid), {'protein': 2, 'pathway': 1})
+        self.assertEqual(ob.count_rels_for_seed_node_uuid(drug.uuid), 1)
+        ob.clear_from_seed_node(prot1)
+        self.assertEqual(ob.count_nodes(), 2)
+        self.assertEqual(ob.count_rels(), 1)
+        self.assertIsNone(ob.get_node('protein', 'UniProtKB:P1'))
+        self.assertIs(ob.get_node('protein', 'UniProtKB:P4'), target)
+        self.assertEqual(ob.get_all_rels_for_reltype('participates_in'), set())
+        self.assertEqual(ob.count_nodes_for_seed_node_uuid(prot1.uuid), 0)
+        ob.clear_all()
+        self.assertEqual(ob.count_nodes(), 0)
+        self.assertEqual(ob.count_rels(), 0)
+        self.assertEqual(ob.get_all_nodes_for_nodetype('protein'), set())
+
+    def test_merge(self):
+        ob = make_test_orangeboard()
+        shard = Orangeboard(debug=False)
+        shard.set_dict_reltype_dirs(ob.dict_reltype_dirs)
+        drug = shard.add_node('chemical_substance', 'CHEMBL1', seed_node_bool=True, desc='a drug')
+        shard_prot2 = shard.add_node('protein', 'UniProtKB:P2', desc='')
+        shard_prot2.expanded = True
+        shard_prot2.set_extra_props({'symbol': 'GENE2'})
+        shard_prot1 = shard.add_node('protein', 'UniProtKB:P1', desc='GENE1')
+        shard.add_rel('physically_interacts_with', 'DGIdb', drug, shard_prot2)
+        shard.add_rel('physically_interacts_with', 'biolink', shard_prot2, shard_prot1)
+        node_map = ob.merge(shard)
+        prot1 = ob.get_node('protein', 'UniProtKB:P1')
+        prot2 = ob.get_node('protein', 'UniProtKB:P2')
+        merged_drug = ob.get_node('chemical_substance', 'CHEMBL1')
+        self.assertIs(node_map[shard_prot2], prot2)
+        self.assertEqual((ob.count_nodes(), ob.count_rels()), (4, 3))
+        # the drug keeps its UUID and is the seed node of itself; P2 keeps its seed node and description
+        self.assertEqual(merged_drug.uuid, drug.uuid)
+        self.assertIs(merged_drug.seed_node, merged_drug)
+        self.assertIs(prot2.seed_node, prot1)
+        self.assertEqual(prot2.desc, 'GENE2')
+        self.assertTrue(prot2.expanded)
+        self.assertEqual(prot2.extra_props['symbol'], 'GENE2')
+        # the relationship that was already in the orangeboard wins
+        self.assertEqual(ob.get_rel('physically_interacts_with', prot1, prot2)[0].sourcedb, 'reactome')
+        new_rel = ob.get_rel('physically_interacts_with', prot2, merged_drug)[0]
+        self.assertIs(new_rel.seed_node, merged_drug)
+        self.assertEqual(ob.count_rels_for_seed_node_uuid(merged_drug.uuid), 1)
+        all_nodes = [node for nodes in ob.dict_seed_uuid_to_list_nodes.values() for node in nodes]
+        self.assertEqual(len(set(node.node_id for node in all_nodes)), 4)
+
+    def test_merge_keeps_seed_status(self):
+        ob = make_test_orangeboard()
+        shard = Orangeboard(debug=False)
+        shard.set_dict_reltype_dirs(ob.dict_reltype_dirs)
+        # P2 is not a seed node in `ob`, but is the seed node of the shard
+        shard_prot2 = shard.add_node('protein', 'UniProtKB:P2', seed_node_bool=True, desc='GENE2')
+        shard_prot3 = shard.add_node('protein', 'UniProtKB:P3', desc='GENE3')
+        shard.add_rel('physically_interacts_with', 'biolink', shard_prot2, shard_prot3)
+        ob.merge(shard)
+        prot1 = ob.get_node('protein', 'UniProtKB:P1')
+        prot2 = ob.get_node('protein', 'UniProtKB:P2')
+        prot3 = ob.get_node('protein', 'UniProtKB:P3')
+        self.assertIs(prot2.seed_node, prot2)
+        self.assertIs(prot3.seed_node, prot2)
+        self.assertEqual(set(ob.get_all_nodes_for_seed_node_uuid(prot2.uuid)), {prot2, prot3})
+        self.assertNotIn(prot2, ob.get_all_nodes_for_seed_node_uuid(prot1.uuid))
+        self.assertEqual(ob.count_nodes(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import json
+import requests
 
 import os,sys
 parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -20,8 +21,52 @@ def get_from_test_file(filename, key):
         return None
 
 
+class FakeMyGeneInfo:
+    def __init__(self, num_failures=0):
+        self.batches = []
+        self.num_failures = num_failures
+
+    def querymany(self, qterms, scopes, species, fields, verbose):
+        self.batches.append(list(qterms))
+        if self.num_failures > 0:
+            self.num_failures -= 1
+            raise requests.exceptions.HTTPError('503 Server Error')
+        hits = []
+        for qterm in qterms:
+            if qterm.startswith('NOTAGENE'):
+                hits.append({'query': qterm, 'notfound': True})
+            else:
+                hits.append({'query': qterm, 'uniprot': {'Swiss-Prot': ['P_' + qterm, 'Q_' + qterm]}})
+        return hits
+
+
 class QueryMyGeneTestCase(unittest.TestCase):
 
+    def test_convert_gene_symbols_to_uniprot_ids(self):
+        mg = QueryMyGene()
+        mg.mygene_obj = FakeMyGeneInfo()
+        QueryMyGene.convert_gene_symbol_to_uniprot_id.cache_clear()
+        symbols = ['BATCHGENE' + str(i) for i in range(QueryMyGene.QUERYMANY_CHUNK_SIZE + 1)] + ['NOTAGENE1']
+        res = mg.convert_gene_symbols_to_uniprot_ids(symbols)
+        self.assertEqual(len(mg.mygene_obj.batches), 2)
+        self.assertEqual(res['BATCHGENE0'], {'P_BATCHGENE0', 'Q_BATCHGENE0'})
+        self.assertEqual(res['NOTAGENE1'], set())
+        # the results, including the negative one, are cached for the single-identifier method too
+        self.assertEqual(mg.convert_gene_symbol_to_uniprot_id('NOTAGENE1'), set())
+        self.assertEqual(mg.convert_gene_symbols_to_uniprot_ids(['BATCHGENE1'])['BATCHGENE1'],
+                         {'P_BATCHGENE1', 'Q_BATCHGENE1'})
+        self.assertEqual(len(mg.mygene_obj.batches), 2)
+
+    def test_convert_failure_is_not_cached(self):
+        mg = QueryMyGene()
+        mg.mygene_obj = FakeMyGeneInfo(num_failures=1)
+        QueryMyGene.convert_gene_symbol_to_uniprot_id.cache_clear()
+        # a failed query is left out of the result, so it is not mistaken for "no mapping"
+        self.assertEqual(mg.convert_gene_symbols_to_uniprot_ids(['FAILGENE1']), dict())
+        self.assertEqual(mg.convert_gene_symbols_to_uniprot_ids(['FAILGENE1'])['FAILGENE1'],
+                         {'P_FAILGENE1', 'Q_FAILGENE1'})
+        self.assertEqual(len(mg.mygene_obj.batches), 2)
+
     def test_get_protein_entity(self):
         mg = QueryMyGene()
         extended_info_json = mg.get_protein_entity("UniProtKB:O60884")
@@ -0,0 +1,68 @@
+import unittest
+import os
+import sys
+import time
+import threading
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+from RequestCoalescer import RequestCoalescer
+
+
+class RequestCoalescerTestCase(unittest.TestCase):
+
+    def run_concurrently(self, coalescer, key, function, num_threads):
+        results = [None] * num_threads
+
+        def call(index):
+            try:
+                results[index] = coalescer.call(key, function)
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        # let the other threads join the call in flight before it completes
+        while coalescer.num_shared < num_threads - 1:
+            time.sleep(0.001)
+        return threads, results
+
+    def test_concurrent_calls_are_shared(self):
+        coalescer = RequestCoalescer()
+        release = threading.Event()
+        calls = []
+
+        def lookup():
+            calls.append(1)
+            release.wait()
+            return 'R-HSA-1'
+
+        threads, results = self.run_concurrently(coalescer, 'pathway', lookup, 4)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [(False, 'R-HSA-1')] + [(True, 'R-HSA-1')] * 3)
+        # nothing is remembered once the call is done
+        self.assertEqual(coalescer.call('pathway', lambda: 'R-HSA-2'), (False, 'R-HSA-2'))
+
+    def test_exception_is_shared(self):
+        coalescer = RequestCoalescer()
+        release = threading.Event()
+
+        def lookup():
+            release.wait()
+            raise ValueError('upstream error')
+
+        threads, results = self.run_concurrently(coalescer, 'pathway', lookup, 3)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(coalescer.pending_calls, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
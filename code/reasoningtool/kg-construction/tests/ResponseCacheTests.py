@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import tempfile
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+import requests
+import ResponseCache as ResponseCacheModule
+from ResponseCache import ResponseCache
+
+
+def make_response(url, content, status_code=200):
+    res = requests.Response()
+    res.status_code = status_code
+    res.url = url
+    res.headers = requests.structures.CaseInsensitiveDict({'Content-Type': 'application/json',
+                                                           'Content-Length': str(len(content))})
+    res.encoding = 'utf-8'
+    res._content = content
+    return res
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'responses.sqlite')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_make_key(self):
+        key = ResponseCache.make_key('get', 'HTTPS://Reactome.org/q?b=2&a=1')
+        self.assertEqual(key, ResponseCache.make_key('GET', 'https://reactome.org/q', params={'a': 1, 'b': 2}))
+        self.assertNotEqual(key, ResponseCache.make_key('GET', 'https://reactome.org/q?a=1&b=3'))
+        self.assertNotEqual(key, ResponseCache.make_key('POST', 'https://reactome.org/q?a=1&b=2'))
+        self.assertNotEqual(key, ResponseCache.make_key('GET', 'https://reactome.org/q?a=1&b=2',
+                                                        headers={'accept': 'application/json'}))
+        self.assertEqual(ResponseCache.make_key('POST', 'https://www.uniprot.org/', data={'from': 'ACC', 'to': 'ID'}),
+                         ResponseCache.make_key('POST', 'https://www.uniprot.org/', data={'to': 'ID', 'from': 'ACC'}))
+
+    def test_get_and_set(self):
+        cache = ResponseCache(self.path)
+        url = 'https://reactome.org/q'
+        self.assertIsNone(cache.get('k1', 'reactome.org'))
+        cache.set('k1', 'reactome.org', make_response(url, b'{"a": [1, 2]}'))
+        # a second process would open its own connection to the same file
+        res = ResponseCache(self.path).get('k1', 'reactome.org')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.url, url)
+        self.assertEqual(res.content, b'{"a": [1, 2]}')
+        self.assertEqual(res.headers['content-type'], 'application/json')
+        self.assertNotIn('Content-Length', res.headers)
+        self.assertTrue(res.from_cache)
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.stores, info.currsize), (0, 1, 1, 1))
+
+    def test_host_ttl(self):
+        cache = ResponseCache(self.path, default_ttl=None, host_ttls={'eutils.ncbi.nlm.nih.gov': 60})
+        cache.set('k1', 'eutils.ncbi.nlm.nih.gov', make_response('https://eutils.ncbi.nlm.nih.gov/q', b'x'))
+        cache.set('k2', 'reactome.org', make_response('https://reactome.org/q', b'y'))
+        time = ResponseCacheModule.time.time
+        ResponseCacheModule.time.time = lambda: time() + 120
+        try:
+            self.assertIsNone(cache.get('k1', 'eutils.ncbi.nlm.nih.gov'))
+            self.assertIsNotNone(cache.get('k2', 'reactome.org'))
+        finally:
+            ResponseCacheModule.time.time = time
+
+    def test_eviction(self):
+        cache = ResponseCache(self.path, max_bytes=1000)
+        cache.EVICTION_CHECK_INTERVAL = 1
+        for i in range(10):
+            cache.set('k' + str(i), 'reactome.org', make_response('https://reactome.org/q', os.urandom(300)))
+        info = cache.cache_info()
+        self.assertLessEqual(info.currbytes, 1000)
+        self.assertGreater(info.evictions, 0)
+        self.assertIsNotNone(cache.get('k9', 'reactome.org'))
+        self.assertIsNone(cache.get('k0', 'reactome.org'))
+
+
+if __name__ == '__main__':
+    unittest.main()
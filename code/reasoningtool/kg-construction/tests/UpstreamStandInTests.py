@@ -0,0 +1,72 @@
+import unittest
+import os
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+from UpstreamStandIn import FixtureArchive, StandInServer, make_stand_in_url, get_upstream_url
+
+
+class FakeResponse:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+
+class UpstreamStandInTestCase(unittest.TestCase):
+
+    def make_archive(self, path=None):
+        archive = FixtureArchive(path)
+        archive.add('GET', 'https://reactome.org/ContentService/data/query/R-HSA-1?b=2&a=1', None, {},
+                    FakeResponse(200, b'{"id": 1}', {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}))
+        archive.add('POST', 'https://mygene.info/v3/query', 'q=CFTR&scopes=symbol', {},
+                    FakeResponse(200, b'[{"_id": "1080"}]', {'Content-Type': 'application/json'}))
+        return archive
+
+    def test_stand_in_url(self):
+        url = 'https://reactome.org/ContentService/data/query/R-HSA-1?a=1'
+        stand_in_url = make_stand_in_url('http://127.0.0.1:8765/', url)
+        self.assertEqual(stand_in_url, 'http://127.0.0.1:8765/https/reactome.org/ContentService/data/query/R-HSA-1?a=1')
+        self.assertEqual(get_upstream_url(stand_in_url[len('http://127.0.0.1:8765'):]), url)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'fixtures.jsonl.gz')
+            self.make_archive(path).save()
+            archive = FixtureArchive(path)
+            self.assertEqual(len(archive), 2)
+            (status_code, headers, content) = archive.lookup('GET', 'https://reactome.org/ContentService/data/query/'
+                                                             'R-HSA-1?a=1&b=2', None, {})
+            self.assertEqual((status_code, content), (200, b'{"id": 1}'))
+            self.assertNotIn('Content-Encoding', headers)
+            self.assertIsNone(archive.lookup('GET', 'https://reactome.org/other', None, {}))
+
+    def test_replay(self):
+        with StandInServer(self.make_archive()) as server:
+            url = make_stand_in_url(server.url, 'https://reactome.org/ContentService/data/query/R-HSA-1?a=1&b=2')
+            with urllib.request.urlopen(url) as res:
+                self.assertEqual(res.read(), b'{"id": 1}')
+                self.assertEqual(res.headers['Content-Type'], 'application/json')
+            with urllib.request.urlopen(make_stand_in_url(server.url, 'https://mygene.info/v3/query'),
+                                        data=b'q=CFTR&scopes=symbol') as res:
+                self.assertEqual(res.read(), b'[{"_id": "1080"}]')
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(make_stand_in_url(server.url, 'https://reactome.org/other'))
+            self.assertEqual(context.exception.code, 404)
+        self.assertEqual(server.stats, {'requests': 3, 'replayed': 2, 'missing': 1, 'errors': 0})
+
+    def test_error_injection(self):
+        with StandInServer(self.make_archive(), error_rate=1.0, error_status=503) as server:
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(make_stand_in_url(server.url, 'https://reactome.org/other'))
+            self.assertEqual(context.exception.code, 503)
+        self.assertEqual(server.stats['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+
+parentdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parentdir)
+
+from UpstreamStats import UpstreamStats
+
+
+class FakeClient:
+    def query(self, q):
+        if q == 'fail':
+            raise ValueError(q)
+        return {'hits': []}
+
+
+class UpstreamStatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = UpstreamStats()
+        UpstreamStats.set_instance(self.stats)
+
+    def tearDown(self):
+        UpstreamStats.set_instance(None)
+
+    def test_get_endpoint(self):
+        self.assertEqual(UpstreamStats.get_endpoint('https://reactome.org/ContentService/data/query/R-HSA-1'),
+                         'reactome.org/ContentService')
+        self.assertEqual(UpstreamStats.get_endpoint('https://www.uniprot.org/'), 'www.uniprot.org')
+
+    def test_record(self):
+        with self.stats.context('expand_protein'):
+            self.stats.record('reactome.org/ContentService', 0.2, retries=1, status_code=200, num_bytes=1000)
+            self.stats.record('reactome.org/ContentService', 0.001, cache_hit=True, status_code=200)
+            with self.stats.context('expand_gene_ontology'):
+                self.stats.record('www.ebi.ac.uk/ols', 5.0, error=True, status_code=503)
+        report = self.stats.report()
+        reactome = report['endpoints']['reactome.org/ContentService']
+        self.assertEqual((reactome['calls'], reactome['cache_hits'], reactome['network_calls'], reactome['retries'],
+                          reactome['errors'], reactome['bytes']), (2, 1, 1, 1, 0, 1000))
+        self.assertEqual(reactome['cache_hit_ratio'], 0.5)
+        self.assertEqual(reactome['status_codes'], {'200': 2})
+        self.assertEqual(reactome['latency_histogram'], [1, 0, 0, 1, 0, 0, 0, 0, 0])
+        self.assertEqual(report['endpoints']['www.ebi.ac.uk/ols']['errors'], 1)
+        self.assertEqual(report['contexts']['expand_protein']['endpoint_calls'], {'reactome.org/ContentService': 2})
+        self.assertEqual(report['contexts']['expand_gene_ontology']['endpoint_calls'], {'www.ebi.ac.uk/ols': 1})
+        self.assertEqual(report['contexts']['expand_protein']['calls'], 1)
+        self.assertIn('reactome.org/ContentService: 2 calls', self.stats.summary())
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_name = os.path.join(tmpdir, 'report.json')
+            self.stats.write_report(file_name)
+            with open(file_name, 'r') as report_file:
+                self.assertEqual(json.load(report_file)['endpoints']['www.ebi.ac.uk/ols']['calls'], 1)
+
+    def test_instrument_client(self):
+        client = UpstreamStats.instrument_client(FakeClient(), 'mygene.info')
+        self.assertEqual(client.query('CFTR'), {'hits': []})
+        with self.assertRaises(ValueError):
+            client.query('fail')
+        endpoint_report = self.stats.report()['endpoints']['mygene.info/query']
+        self.assertEqual((endpoint_report['calls'], endpoint_report['errors']), (2, 1))
+
+    def test_paused_periodic_summary(self):
+        self.stats.start_periodic_summary(3600)
+        with self.stats.paused_periodic_summary():
+            self.assertIsNone(self.stats.summary_thread)
+        self.assertTrue(self.stats.summary_thread.is_alive())
+        self.stats.stop_periodic_summary()
+        with self.stats.paused_periodic_summary():
+            pass
+        self.assertIsNone(self.stats.summary_thread)
+
+    def test_instrument_client_before_call(self):
+        before_calls = []
+        client = UpstreamStats.instrument_client(FakeClient(), 'mygene.info',
+                                                 before_call=lambda: before_calls.append(True))
+        client.query('CFTR')
+        self.assertEqual(before_calls, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()